@@ -2,10 +2,13 @@ from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy import text
 
 from alembic import context
+from app.config import settings
 from app.core.db import Base  # adjust this based on your project
-from app.models.ride import Ride  # so Alembic sees the Ride model
+# Import every model so autogenerate sees all tables
+from app.models import complaint, earnings, emergency, feedback, idempotency, payment, rating, refresh_token, ride, ride_event, user  # noqa: F401
 target_metadata = Base.metadata
 
 # this is the Alembic Config object, which provides
@@ -17,6 +20,15 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# The app's DATABASE_URL wins over the placeholder in alembic.ini
+if settings.DATABASE_URL:
+    config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
+
+# Every container runs `alembic upgrade head` before it starts serving; on
+# Postgres the upgrade takes this advisory lock, so replicas starting together
+# migrate one at a time and the later ones find the schema already at head
+MIGRATION_LOCK_ID = 8_240_001
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
@@ -72,6 +84,8 @@ def run_migrations_online() -> None:
         )
 
         with context.begin_transaction():
+            if connection.dialect.name == "postgresql":
+                connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
             context.run_migrations()
 
 
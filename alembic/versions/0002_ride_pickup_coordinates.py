@@ -0,0 +1,31 @@
+"""ride pickup coordinates
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:31:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("rides", sa.Column("pickup_lat", sa.Float(), nullable=True))
+    op.add_column("rides", sa.Column("pickup_lng", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("rides") as batch_op:
+        batch_op.drop_column("pickup_lng")
+        batch_op.drop_column("pickup_lat")
@@ -0,0 +1,50 @@
+"""indexes for the hot query shapes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:32:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_rides_user_id_timestamp", "rides", ["user_id", "timestamp", "id"])
+    op.create_index("ix_rides_driver_id_status", "rides", ["driver_id", "status"])
+    op.create_index("ix_rides_status_timestamp", "rides", ["status", "timestamp", "id"])
+    op.create_index("ix_rides_timestamp_id", "rides", ["timestamp", "id"])
+    op.create_index(
+        "ix_rides_requested",
+        "rides",
+        ["timestamp", "id"],
+        postgresql_where=sa.text("status = 'requested'"),
+        sqlite_where=sa.text("status = 'requested'"),
+    )
+    op.create_index("ix_payments_ride_id", "payments", ["ride_id"])
+    op.create_index("ix_payments_recipient_id_status", "payments", ["recipient_id", "status"])
+    op.create_index("ix_emergency_contacts_user_id", "emergency_contacts", ["user_id"])
+    op.create_index("ix_feedback_ride_id", "feedback", ["ride_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_feedback_ride_id", table_name="feedback")
+    op.drop_index("ix_emergency_contacts_user_id", table_name="emergency_contacts")
+    op.drop_index("ix_payments_recipient_id_status", table_name="payments")
+    op.drop_index("ix_payments_ride_id", table_name="payments")
+    op.drop_index("ix_rides_requested", table_name="rides")
+    op.drop_index("ix_rides_timestamp_id", table_name="rides")
+    op.drop_index("ix_rides_status_timestamp", table_name="rides")
+    op.drop_index("ix_rides_driver_id_status", table_name="rides")
+    op.drop_index("ix_rides_user_id_timestamp", table_name="rides")
@@ -0,0 +1,38 @@
+"""at most one active ride per driver
+
+Fails if a driver already holds several accepted/ongoing rides; resolve
+those rows before upgrading.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:40:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ux_rides_driver_active",
+        "rides",
+        ["driver_id"],
+        unique=True,
+        postgresql_where=sa.text("status IN ('accepted', 'ongoing')"),
+        sqlite_where=sa.text("status IN ('accepted', 'ongoing')"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ux_rides_driver_active", table_name="rides")
@@ -0,0 +1,53 @@
+"""driver earnings ledger and payment paid_at
+
+Totals are backfilled from existing paid payments. Those rows have no
+paid_at, so day/week/month rollups only cover payouts made after upgrading.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 13:05:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("payments", sa.Column("paid_at", sa.DateTime(), nullable=True))
+    op.create_table(
+        "driver_earnings",
+        sa.Column("driver_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("total_amount", sa.Float(), nullable=False),
+        sa.Column("payment_count", sa.Integer(), nullable=False),
+        sa.Column("last_paid_at", sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        "driver_earnings_rollups",
+        sa.Column("driver_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("period", sa.String(), primary_key=True),
+        sa.Column("period_start", sa.Date(), primary_key=True),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("payment_count", sa.Integer(), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO driver_earnings (driver_id, total_amount, payment_count) "
+        "SELECT recipient_id, COALESCE(SUM(amount), 0), COUNT(*) FROM payments "
+        "WHERE status = 'paid' AND recipient_id IS NOT NULL GROUP BY recipient_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("driver_earnings_rollups")
+    op.drop_table("driver_earnings")
+    op.drop_column("payments", "paid_at")
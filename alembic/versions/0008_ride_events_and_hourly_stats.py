@@ -0,0 +1,67 @@
+"""ride event log and hourly ride stats
+
+Only transitions made after upgrading are logged; rides that already exist
+have no events and do not show up in the hourly stats.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 15:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "ride_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("ride_id", sa.Integer(), sa.ForeignKey("rides.id"), nullable=False),
+        sa.Column("event", sa.String(), nullable=False),
+        sa.Column("driver_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("fare", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_ride_events_ride_id", "ride_events", ["ride_id"])
+    op.create_table(
+        "ride_stats_hourly",
+        sa.Column("hour", sa.DateTime(), primary_key=True),
+        sa.Column("requests", sa.Integer(), nullable=False),
+        sa.Column("accepts", sa.Integer(), nullable=False),
+        sa.Column("starts", sa.Integer(), nullable=False),
+        sa.Column("completions", sa.Integer(), nullable=False),
+        sa.Column("cancels", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+        sa.Column("accept_wait_seconds", sa.Float(), nullable=False),
+    )
+    op.create_table(
+        "ride_accept_waits_hourly",
+        sa.Column("hour", sa.DateTime(), primary_key=True),
+        sa.Column("le_seconds", sa.Integer(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "rollup_watermarks",
+        sa.Column("name", sa.String(length=64), primary_key=True),
+        sa.Column("last_event_id", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("rollup_watermarks")
+    op.drop_table("ride_accept_waits_hourly")
+    op.drop_table("ride_stats_hourly")
+    op.drop_index("ix_ride_events_ride_id", table_name="ride_events")
+    op.drop_table("ride_events")
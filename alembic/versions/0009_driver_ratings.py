@@ -0,0 +1,52 @@
+"""driver rating aggregates
+
+Counts, sums and the 1-5 histogram are backfilled from existing feedback.
+The recent-ratings window starts empty: feedback rows carry no timestamp to
+order them by.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 15:50:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "driver_ratings",
+        sa.Column("driver_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("rating_count", sa.Integer(), nullable=False),
+        sa.Column("rating_sum", sa.Integer(), nullable=False),
+        sa.Column("stars_1", sa.Integer(), nullable=False),
+        sa.Column("stars_2", sa.Integer(), nullable=False),
+        sa.Column("stars_3", sa.Integer(), nullable=False),
+        sa.Column("stars_4", sa.Integer(), nullable=False),
+        sa.Column("stars_5", sa.Integer(), nullable=False),
+        sa.Column("recent", sa.String(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.execute(
+        "INSERT INTO driver_ratings (driver_id, rating_count, rating_sum, "
+        "stars_1, stars_2, stars_3, stars_4, stars_5, recent) "
+        "SELECT r.driver_id, COUNT(*), SUM(f.rating), "
+        + ", ".join(f"SUM(CASE WHEN f.rating = {star} THEN 1 ELSE 0 END)" for star in range(1, 6))
+        + ", '' FROM feedback f JOIN rides r ON r.id = f.ride_id "
+        "WHERE r.driver_id IS NOT NULL GROUP BY r.driver_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("driver_ratings")
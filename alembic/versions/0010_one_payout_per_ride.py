@@ -0,0 +1,38 @@
+"""at most one paid payout per ride
+
+Fails if a ride already has several paid payouts; resolve those rows before
+upgrading.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 16:40:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ux_payments_ride_payout",
+        "payments",
+        ["ride_id"],
+        unique=True,
+        postgresql_where=sa.text("recipient_id IS NOT NULL AND status = 'paid'"),
+        sqlite_where=sa.text("recipient_id IS NOT NULL AND status = 'paid'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ux_payments_ride_payout", table_name="payments")
@@ -0,0 +1,33 @@
+"""one feedback per ride
+
+Makes ix_feedback_ride_id unique. Fails if a ride already has several
+feedback rows; resolve those rows (and the driver_ratings they were counted
+into) before upgrading.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 17:20:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index("ix_feedback_ride_id", table_name="feedback")
+    op.create_index("ix_feedback_ride_id", "feedback", ["ride_id"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_feedback_ride_id", table_name="feedback")
+    op.create_index("ix_feedback_ride_id", "feedback", ["ride_id"])
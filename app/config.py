@@ -7,5 +7,100 @@ class Settings:
     SECRET_KEY = os.getenv("SECRET_KEY")
     ALGORITHM = os.getenv("ALGORITHM")
     ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+    # Authenticated-user cache; AUTH_ROLE_CLAIMS puts is_driver/is_approved in the token itself
+    AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+    AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+    AUTH_ROLE_CLAIMS = os.getenv("AUTH_ROLE_CLAIMS", "false").lower() in ("1", "true", "yes")
+    # Refresh tokens rotate on every use; recently revoked ones are also remembered in memory
+    REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+    REFRESH_REVOCATION_CACHE_SIZE = int(os.getenv("REFRESH_REVOCATION_CACHE_SIZE", "100000"))
+
+    # bcrypt cost; stored hashes with a different cost are rehashed on the next login
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    # Dedicated threads for password hashing and how many requests may wait for one before a 429
+    PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_QUEUE_SIZE = int(os.getenv("PASSWORD_QUEUE_SIZE", "32"))
+
+    # Token buckets on the ride status polling endpoints, per user (per IP without a token).
+    # RATE_LIMIT_BACKEND: "memory" (per worker) or "module:Class" for a store shared by all workers
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    RATE_LIMIT_STATUS_PER_SECOND = float(os.getenv("RATE_LIMIT_STATUS_PER_SECOND", "2"))
+    RATE_LIMIT_STATUS_BURST = int(os.getenv("RATE_LIMIT_STATUS_BURST", "10"))
+    # Ride status reads are cached briefly; a transition drops the entry at once in the worker
+    # that made it, other workers may serve the old status until the TTL runs out
+    RIDE_STATUS_CACHE_TTL_SECONDS = float(os.getenv("RIDE_STATUS_CACHE_TTL_SECONDS", "2"))
+    RIDE_STATUS_CACHE_SIZE = int(os.getenv("RIDE_STATUS_CACHE_SIZE", "10000"))
+    # Unfinished rides and each driver's active ride, used to validate transitions without a read;
+    # an entry left behind by a ride finished on another worker lasts at most the TTL
+    RIDE_STATE_CACHE_SIZE = int(os.getenv("RIDE_STATE_CACHE_SIZE", "100000"))
+    RIDE_STATE_CACHE_TTL_SECONDS = float(os.getenv("RIDE_STATE_CACHE_TTL_SECONDS", "600"))
+
+    # Ride event fan-out across workers: "" (in-process), "postgres", or "module:Class"
+    EVENT_BACKEND = os.getenv("EVENT_BACKEND", "")
+    # Worker processes per server; uvicorn reads the same variable as its --workers default
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+    # Push dispatch: offer each open ride to the nearest idle driver for a limited time.
+    # The scheduler keeps its state in memory, so enable it on a single worker;
+    # startup fails if it is enabled with WEB_CONCURRENCY above 1.
+    DISPATCH_ENABLED = os.getenv("DISPATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+    DISPATCH_OFFER_TIMEOUT_SECONDS = float(os.getenv("DISPATCH_OFFER_TIMEOUT_SECONDS", "15"))
+    DISPATCH_TICK_SECONDS = float(os.getenv("DISPATCH_TICK_SECONDS", "0.5"))
+    DISPATCH_RADIUS_KM = float(os.getenv("DISPATCH_RADIUS_KM", "10"))
+    # How many km closer a driver one star lower must be to get the offer first; 0 dispatches by distance only
+    DISPATCH_KM_PER_STAR = float(os.getenv("DISPATCH_KM_PER_STAR", "0"))
+
+    # Driver ratings: size of the recent window, and the prior that new drivers' scores start from
+    RATING_RECENT_WINDOW = int(os.getenv("RATING_RECENT_WINDOW", "20"))
+    RATING_PRIOR_MEAN = float(os.getenv("RATING_PRIOR_MEAN", "4.0"))
+    RATING_PRIOR_WEIGHT = float(os.getenv("RATING_PRIOR_WEIGHT", "5"))
+
+    # Use an async engine (asyncpg / aiosqlite) instead of running the sync engine in the threadpool
+    DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+    # Prometheus /metrics and per-request DB query accounting
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    METRICS_N_PLUS_ONE_THRESHOLD = int(os.getenv("METRICS_N_PLUS_ONE_THRESHOLD", "20"))
+
+    # Hourly ride stats folded from ride_events; 0 turns the background job off
+    RIDE_STATS_INTERVAL_SECONDS = float(os.getenv("RIDE_STATS_INTERVAL_SECONDS", "60"))
+    # Events younger than this are left for the next run (they may commit out of id order)
+    RIDE_STATS_LAG_SECONDS = float(os.getenv("RIDE_STATS_LAG_SECONDS", "30"))
+    # Open requests younger than this are re-read on every matching sync, in case one committed out of id order
+    MATCHING_SYNC_LAG_SECONDS = float(os.getenv("MATCHING_SYNC_LAG_SECONDS", "10"))
+
+    # Read replicas for read-only endpoints: comma-separated URLs in the same form as DATABASE_URL.
+    # A client that wrote reads from the primary for REPLICA_STICKY_SECONDS so it sees its own writes;
+    # a replica that fails is skipped for REPLICA_RETRY_SECONDS and its reads go to the primary
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+    REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+
+    # Connection pool (ignored for SQLite)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    # Server-side statement timeout in milliseconds, 0 disables it (Postgres only)
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+    # Startup warmup, run once the server accepts connections; /health/ready answers 503 until it is done.
+    # Opens this many pool connections and quotes the most recent distinct routes into the fare cache.
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+    WARMUP_DB_CONNECTIONS = int(os.getenv("WARMUP_DB_CONNECTIONS", str(DB_POOL_SIZE)))
+    WARMUP_FARE_ROUTES = int(os.getenv("WARMUP_FARE_ROUTES", "1000"))
+
+    # Fare engine
+    GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(os.path.dirname(__file__), "data", "gazetteer.csv"))
+    FARE_BASE = float(os.getenv("FARE_BASE", "50"))
+    FARE_PER_KM = float(os.getenv("FARE_PER_KM", "10"))
+    FARE_MINIMUM = float(os.getenv("FARE_MINIMUM", "0"))
+    FARE_DEFAULT_DISTANCE_KM = float(os.getenv("FARE_DEFAULT_DISTANCE_KM", "5"))
+    FARE_ROAD_FACTOR = float(os.getenv("FARE_ROAD_FACTOR", "1.3"))
+    FARE_CACHE_SIZE = int(os.getenv("FARE_CACHE_SIZE", "10000"))
+    FARE_CACHE_TTL_SECONDS = int(os.getenv("FARE_CACHE_TTL_SECONDS", "3600"))
 
 settings = Settings()
@@ -1,9 +1,13 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from fastapi import HTTPException, status
 from jose import jwt
 from passlib.context import CryptContext
 from app.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Any hash whose cost differs from BCRYPT_ROUNDS reports needs_update
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 def verify_password(plain, hashed):
     return pwd_context.verify(plain, hashed)
@@ -11,8 +15,60 @@ def verify_password(plain, hashed):
 def hash_password(password):
     return pwd_context.hash(password)
 
+def verify_and_update(plain, hashed):
+    """(valid, new_hash); new_hash is set when the stored hash should be replaced."""
+    return pwd_context.verify_and_update(plain, hashed)
+
+
+class PasswordWorkers:
+    """
+    Bounded thread pool for bcrypt (which releases the GIL while hashing).
+
+    Password work never occupies the shared threadpool that serves sync DB
+    calls, and once workers + queue_size calls are in flight new ones are
+    rejected with 429 instead of piling up behind a login storm.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.max_pending = workers + queue_size
+        self.pending = 0
+        self._executor = None
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many sign-ins in progress. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_workers = PasswordWorkers(settings.PASSWORD_WORKERS, settings.PASSWORD_QUEUE_SIZE)
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def role_claims(user) -> dict:
+    """
+    Claims that let get_current_user skip the users lookup when AUTH_ROLE_CLAIMS is on.
+    They are frozen at issue time, so e.g. a driver approval applies from the next login.
+    """
+    if not settings.AUTH_ROLE_CLAIMS:
+        return {}
+    return {"drv": bool(user.is_driver), "apr": bool(user.is_approved), "email": user.email}
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ttl seconds."""
+
+    def __init__(self, maxsize: int, ttl: float, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at <= self._timer():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, self._timer() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            return default if entry is _MISSING else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class LoadingCache:
+    """
+    Short-lived cache in front of an async loader, for hot keys read by many
+    clients at once.
+
+    Concurrent misses for the same key share one load (single flight)
+    instead of each hitting the database. invalidate() drops the cached
+    value and detaches any load already running, so a read that started
+    before a write can't put the old value back. The loader returns None
+    for a missing key; None is not cached.
+    """
+
+    def __init__(self, load, maxsize: int, ttl: float):
+        self.load = load
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight = {}
+
+    async def get(self, key):
+        value = self.cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.load(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # One caller going away must not cancel the load the others wait for
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._inflight.get(key) is not task:
+            return  # invalidated while loading
+        del self._inflight[key]
+        if not task.cancelled() and task.exception() is None and task.result() is not None:
+            self.cache.set(key, task.result())
+
+    def invalidate(self, key):
+        self.cache.pop(key)
+        self._inflight.pop(key, None)
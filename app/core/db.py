@@ -1,10 +1,349 @@
-from sqlalchemy import create_engine
+import asyncio
+import contextlib
+import threading
+import time
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import CursorResult
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+class PoolMetrics:
+    """Counters for connection checkouts and time spent waiting for a free connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.waits, 6) if self.waits else 0.0,
+                "timeouts": self.timeouts,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class _TimedCheckoutMixin:
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            pool_metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return conn
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if url.startswith("sqlite"):
+        # SQLite picks its own pool class; size/overflow do not apply.
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if settings.DB_STATEMENT_TIMEOUT_MS and url.startswith("postgresql"):
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+def _track_pool(pool_engine):
+    @event.listens_for(pool_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        pool_metrics.count("connects")
+
+    @event.listens_for(pool_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_metrics.count("checkouts")
+
+    @event.listens_for(pool_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        pool_metrics.count("checkins")
+
+
+# Objects stay readable after commit without another round-trip; handlers
+# call refresh() explicitly when they need server-generated values.
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 Base = declarative_base()
+
+if settings.DB_ASYNC:
+    ASYNC_DATABASE_URL = to_async_url(SQLALCHEMY_DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    _track_pool(async_engine.sync_engine)
+else:
+    async_engine = None
+    AsyncSessionLocal = None
+    _track_pool(engine)
+
+
+def _pool_capacity(pool):
+    if isinstance(pool, QueuePool) and pool._max_overflow >= 0:
+        return pool.size() + pool._max_overflow
+    return None
+
+
+class ThreadedSession:
+    """
+    Wraps a sync Session behind the AsyncSession API.
+
+    Every DB call runs in the threadpool, so handlers are written once against
+    the async API and still work on the sync engine (e.g. SQLite without
+    aiosqlite) when DB_ASYNC is off.
+
+    A worker thread must never block on pool checkout: the sessions holding
+    the connections would then wait for a free thread to commit and release
+    them, and the process stalls until pool_timeout. Sessions therefore take
+    a slot, sized to the pool, on the event loop before the first DB call of
+    each transaction and give it back on commit, rollback or close. Each
+    pool (the primary's, a replica's) has its own slots. Waiting for a slot
+    is bounded by DB_POOL_TIMEOUT and fails like a pool checkout would.
+    """
+
+    _slots = {}
+
+    def __init__(self, session):
+        self.sync_session = session
+        self._has_slot = False
+        self._slot = None
+
+    def _slot_semaphore(self):
+        pool = self.sync_session.get_bind().pool
+        if pool not in self._slots:
+            capacity = _pool_capacity(pool)
+            self._slots[pool] = asyncio.Semaphore(capacity) if capacity else False
+        return self._slots[pool]
+
+    @property
+    def info(self):
+        return self.sync_session.info
+
+    @property
+    def bind(self):
+        return self.sync_session.bind
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        if not self._has_slot:
+            slots = self._slot_semaphore()
+            if slots:
+                try:
+                    await asyncio.wait_for(slots.acquire(), settings.DB_POOL_TIMEOUT)
+                except asyncio.TimeoutError:
+                    raise exc.TimeoutError(
+                        f"No free connection slot for the pool, timed out after {settings.DB_POOL_TIMEOUT}s"
+                    ) from None
+            self._slot = slots
+            self._has_slot = True
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def execute(self, statement, params=None, **kwargs):
+        def _execute(session):
+            result = session.execute(statement, params, **kwargs)
+            # Buffer rows while still on the worker thread that owns the cursor.
+            if isinstance(result, CursorResult) and not result.returns_rows:
+                return result
+            return result.freeze()()
+        return await self.run_sync(_execute)
+
+    async def stream(self, statement, params=None, **kwargs):
+        """Server-side cursor, like AsyncSession.stream; rows are fetched in the threadpool on demand."""
+        result = await self.run_sync(lambda s: s.execute(
+            statement, params, execution_options={"stream_results": True}, **kwargs))
+        return ThreadedStreamResult(result)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return await self.run_sync(lambda s: s.scalar(statement, params, **kwargs))
+
+    async def scalars(self, statement, params=None, **kwargs):
+        return (await self.execute(statement, params, **kwargs)).scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        return await self.run_sync(lambda s: s.get(entity, ident, **kwargs))
+
+    async def delete(self, instance):
+        await self.run_sync(lambda s: s.delete(instance))
+
+    async def flush(self, objects=None):
+        await self.run_sync(lambda s: s.flush(objects))
+
+    async def refresh(self, instance, attribute_names=None):
+        await self.run_sync(lambda s: s.refresh(instance, attribute_names))
+
+    async def commit(self):
+        try:
+            await self.run_sync(lambda s: s.commit())
+        finally:
+            self._release_slot()
+
+    async def rollback(self):
+        try:
+            await self.run_sync(lambda s: s.rollback())
+        finally:
+            self._release_slot()
+
+    async def close(self):
+        if not self._has_slot:
+            # No transaction open, so no connection to hand back
+            self.sync_session.close()
+            return
+        try:
+            await run_in_threadpool(self.sync_session.close)
+        finally:
+            self._release_slot()
+
+    def _release_slot(self):
+        # The connection went back to the pool with the transaction
+        if self._has_slot:
+            self._has_slot = False
+            if self._slot:
+                self._slot.release()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class ThreadedStreamResult:
+    """The part of AsyncResult that streaming consumers use."""
+
+    def __init__(self, result):
+        self._result = result
+
+    def keys(self):
+        return self._result.keys()
+
+    async def partitions(self, size: int):
+        while True:
+            rows = await run_in_threadpool(self._result.fetchmany, size)
+            if not rows:
+                return
+            yield rows
+
+
+def new_session():
+    """Open a session for the configured mode; use as `async with new_session() as db`."""
+    if AsyncSessionLocal is not None:
+        return AsyncSessionLocal()
+    return ThreadedSession(SessionLocal())
+
+
+async def get_db():
+    """Request-scoped session; shared by get_current_user and the handler of the same request."""
+    async with new_session() as db:
+        yield db
+
+
+async def prime_pool(count: int) -> int:
+    """
+    Open up to count pooled connections at once and hand them back, so the
+    first requests after startup don't pay for connecting. Returns how many
+    were opened.
+    """
+    pool_engine = async_engine if async_engine is not None else engine
+    if isinstance(pool_engine.pool, QueuePool):
+        count = min(count, pool_engine.pool.size())
+    if async_engine is not None:
+        async with contextlib.AsyncExitStack() as stack:
+            conns = [await stack.enter_async_context(async_engine.connect()) for _ in range(count)]
+            await asyncio.gather(*(conn.exec_driver_sql("SELECT 1") for conn in conns))
+        return len(conns)
+
+    def _open():
+        with contextlib.ExitStack() as stack:
+            conns = [stack.enter_context(engine.connect()) for _ in range(count)]
+            for conn in conns:
+                conn.exec_driver_sql("SELECT 1")
+        return len(conns)
+    return await run_in_threadpool(_open)
+
+
+def dialect_insert(db):
+    """insert() of the session's dialect, which has on_conflict_do_update for upserts."""
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"upsert is not implemented for {dialect}")
+
+
+def pool_stats() -> dict:
+    pool = async_engine.pool if async_engine is not None else engine.pool
+    stats = pool_metrics.snapshot()
+    stats["status"] = pool.status()
+    for name in ("size", "checkedout", "overflow", "checkedin"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    return stats
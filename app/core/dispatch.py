@@ -0,0 +1,231 @@
+import asyncio
+import heapq
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.events import broker, driver_channel
+from app.core.geo import GeoIndex
+from app.models.ride import Ride, OPEN_REQUEST
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OpenRide:
+    ride_id: int
+    lat: float
+    lng: float
+    requested_at: float
+    declined: set = field(default_factory=set)
+    offers: int = 0
+
+
+@dataclass
+class Offer:
+    ride_id: int
+    driver_id: int
+    distance_km: float
+    expires_at: float
+
+
+def offer_event(offer: Offer, now: float) -> dict:
+    return {
+        "event": "offer",
+        "ride_id": offer.ride_id,
+        "distance_km": round(offer.distance_km, 3),
+        "expires_in": round(max(offer.expires_at - now, 0), 1),
+    }
+
+
+class DispatchScheduler:
+    """
+    Push-based dispatch.
+
+    Open rides wait in a priority queue, longest waiting first. On every
+    tick each ride without an outstanding offer is offered to the nearest
+    idle driver that has not already passed on it. An offer that is
+    declined or not answered within offer_timeout goes to the next driver.
+    A driver holds at most one offer at a time.
+
+    tick() and the methods that feed it are plain bookkeeping against an
+    injectable clock, so the simulation harness drives the same code in
+    virtual time. start() runs tick() in the background and pushes offers
+    to each driver's broker channel. The DB stays the authority on who gets
+    a ride: accepting an offer still goes through the atomic accept.
+
+    With km_per_star set, the nearest few candidates are ranked by distance
+    minus km_per_star times their rating score, so a better-rated driver
+    slightly farther away is offered the ride first.
+    """
+
+    # Candidates looked at per ride when ranking by rating
+    RANKED_CANDIDATES = 8
+
+    def __init__(self, offer_timeout: float, radius_km: float, clock=time.monotonic, km_per_star: float = 0.0):
+        self.offer_timeout = offer_timeout
+        self.radius_km = radius_km
+        self.clock = clock
+        self.km_per_star = km_per_star
+        self.ratings = {}  # driver_id -> rating score, for available drivers
+        self.rides = {}
+        self._queue = []  # (requested_at, ride_id); stale entries are skipped when popped
+        self.idle = GeoIndex()
+        self.positions = {}
+        self.offers = {}  # ride_id -> Offer
+        self.offers_by_driver = {}  # driver_id -> Offer
+        self._task = None
+
+    # -- state fed by the ride endpoints --------------------------------------
+
+    def add_ride(self, ride_id: int, lat: float, lng: float, requested_at: float = None):
+        if ride_id in self.rides:
+            return
+        ride = OpenRide(ride_id, lat, lng, self.clock() if requested_at is None else requested_at)
+        self.rides[ride_id] = ride
+        heapq.heappush(self._queue, (ride.requested_at, ride_id))
+
+    def remove_ride(self, ride_id: int):
+        """Ride accepted or cancelled; a driver holding its offer goes back to idle."""
+        offer = self.offers.get(ride_id)
+        self.rides.pop(ride_id, None)
+        if offer is not None:
+            self._withdraw(offer)
+
+    def driver_available(self, driver_id: int, lat: float, lng: float, rating: float = None):
+        self.positions[driver_id] = (lat, lng)
+        if rating is not None:
+            self.ratings[driver_id] = rating
+        if driver_id not in self.offers_by_driver:
+            self.idle.upsert(driver_id, lat, lng)
+
+    def driver_unavailable(self, driver_id: int):
+        offer = self.offers_by_driver.get(driver_id)
+        if offer is not None:
+            self._withdraw(offer, driver_idle=False)
+        self.idle.remove(driver_id)
+        self.positions.pop(driver_id, None)
+        self.ratings.pop(driver_id, None)
+
+    def update_rating(self, driver_id: int, rating: float):
+        if driver_id in self.positions:
+            self.ratings[driver_id] = rating
+
+    def accept(self, ride_id: int, driver_id: int):
+        """driver_id took ride_id (through an offer or the pull endpoint); neither is dispatched again."""
+        self.remove_ride(ride_id)
+        self.driver_unavailable(driver_id)
+
+    def decline(self, ride_id: int, driver_id: int) -> bool:
+        offer = self.offers.get(ride_id)
+        if offer is None or offer.driver_id != driver_id:
+            return False
+        self._withdraw(offer)
+        return True
+
+    def offer_for(self, ride_id: int, driver_id: int):
+        offer = self.offers.get(ride_id)
+        return offer if offer is not None and offer.driver_id == driver_id else None
+
+    # -- scheduling -----------------------------------------------------------
+
+    def _withdraw(self, offer: Offer, driver_idle: bool = True):
+        del self.offers[offer.ride_id]
+        del self.offers_by_driver[offer.driver_id]
+        ride = self.rides.get(offer.ride_id)
+        if ride is not None:
+            ride.declined.add(offer.driver_id)
+            heapq.heappush(self._queue, (ride.requested_at, ride.ride_id))
+        position = self.positions.get(offer.driver_id)
+        if driver_idle and position is not None:
+            self.idle.upsert(offer.driver_id, *position)
+
+    def _candidate(self, ride: OpenRide):
+        # Ask for enough neighbours to get past the drivers who already passed
+        k = len(ride.declined) + (self.RANKED_CANDIDATES if self.km_per_star else 1)
+        best = None
+        for driver_id, distance in self.idle.nearest(ride.lat, ride.lng, self.radius_km, k):
+            if driver_id in ride.declined:
+                continue
+            if not self.km_per_star:
+                return driver_id, distance
+            cost = distance - self.km_per_star * self.ratings.get(driver_id, settings.RATING_PRIOR_MEAN)
+            if best is None or cost < best[0]:
+                best = (cost, driver_id, distance)
+        return best[1:] if best is not None else None
+
+    def tick(self):
+        """Expire overdue offers, then make new ones. Returns (new_offers, expired_offers)."""
+        now = self.clock()
+        expired = [offer for offer in self.offers.values() if offer.expires_at <= now]
+        for offer in expired:
+            self._withdraw(offer)
+
+        made, waiting = [], []
+        while self._queue and len(self.idle):
+            requested_at, ride_id = heapq.heappop(self._queue)
+            ride = self.rides.get(ride_id)
+            if ride is None or ride_id in self.offers:
+                continue
+            candidate = self._candidate(ride)
+            if candidate is None:
+                waiting.append((requested_at, ride_id))
+                continue
+            driver_id, distance = candidate
+            self.idle.remove(driver_id)
+            offer = Offer(ride_id, driver_id, distance, now + self.offer_timeout)
+            self.offers[ride_id] = offer
+            self.offers_by_driver[driver_id] = offer
+            ride.offers += 1
+            made.append(offer)
+        for entry in waiting:
+            heapq.heappush(self._queue, entry)
+        return made, expired
+
+    # -- background loop --------------------------------------------------------
+
+    async def load(self, db: AsyncSession):
+        """Queue rides that were already open before this process started."""
+        now, utcnow = self.clock(), datetime.utcnow()
+        rides = (await db.execute(select(Ride.id, Ride.pickup_lat, Ride.pickup_lng, Ride.timestamp).where(
+            OPEN_REQUEST, Ride.pickup_lat.isnot(None), Ride.pickup_lng.isnot(None)))).all()
+        for ride in rides:
+            waited = (utcnow - ride.timestamp).total_seconds() if ride.timestamp else 0.0
+            self.add_ride(ride.id, ride.pickup_lat, ride.pickup_lng, requested_at=now - waited)
+
+    async def step(self):
+        made, expired = self.tick()
+        now = self.clock()
+        for offer in expired:
+            await broker.publish(driver_channel(offer.driver_id), {"event": "offer_expired", "ride_id": offer.ride_id})
+        for offer in made:
+            await broker.publish(driver_channel(offer.driver_id), offer_event(offer, now))
+
+    async def _run(self, tick_seconds: float):
+        while True:
+            try:
+                await self.step()
+            except Exception:
+                logger.exception("dispatch tick failed")
+            await asyncio.sleep(tick_seconds)
+
+    def start(self, tick_seconds: float = settings.DISPATCH_TICK_SECONDS):
+        self._task = asyncio.create_task(self._run(tick_seconds))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+dispatcher = DispatchScheduler(settings.DISPATCH_OFFER_TIMEOUT_SECONDS, settings.DISPATCH_RADIUS_KM,
+                               km_per_star=settings.DISPATCH_KM_PER_STAR)
@@ -0,0 +1,69 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import dialect_insert
+from app.models.earnings import DriverEarnings, DriverEarningsRollup
+
+PERIODS = ("day", "week", "month")
+
+
+def period_start(period: str, day: date) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+
+# Rows per multi-row upsert; keeps bind parameters under SQLite's limit
+UPSERT_CHUNK = 1000
+
+
+async def record_payout(db: AsyncSession, driver_id: int, amount: float, paid_at: datetime):
+    """
+    Add a paid payout to the driver's running total and day/week/month
+    rollups. Runs inside the caller's transaction; the caller commits together
+    with the Payment row so the ledger never disagrees with payments.
+    """
+    await record_payouts(db, [(driver_id, amount, paid_at)])
+
+
+async def record_payouts(db: AsyncSession, payouts):
+    """record_payout for many (driver_id, amount, paid_at) at once: one upsert per ledger row touched."""
+    totals, rollups = {}, {}
+    for driver_id, amount, paid_at in payouts:
+        total = totals.setdefault(driver_id, {"driver_id": driver_id, "total_amount": 0.0, "payment_count": 0,
+                                              "last_paid_at": paid_at})
+        total["total_amount"] += amount
+        total["payment_count"] += 1
+        total["last_paid_at"] = max(total["last_paid_at"], paid_at)
+        for period in PERIODS:
+            key = (driver_id, period, period_start(period, paid_at.date()))
+            rollup = rollups.setdefault(key, {"driver_id": driver_id, "period": period, "period_start": key[2],
+                                              "amount": 0.0, "payment_count": 0})
+            rollup["amount"] += amount
+            rollup["payment_count"] += 1
+
+    insert = dialect_insert(db)
+    totals, rollups = list(totals.values()), list(rollups.values())
+    for i in range(0, len(totals), UPSERT_CHUNK):
+        stmt = insert(DriverEarnings).values(totals[i:i + UPSERT_CHUNK])
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[DriverEarnings.driver_id],
+            set_={
+                "total_amount": DriverEarnings.total_amount + stmt.excluded.total_amount,
+                "payment_count": DriverEarnings.payment_count + stmt.excluded.payment_count,
+                "last_paid_at": stmt.excluded.last_paid_at,
+            },
+        ))
+    for i in range(0, len(rollups), UPSERT_CHUNK):
+        stmt = insert(DriverEarningsRollup).values(rollups[i:i + UPSERT_CHUNK])
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[DriverEarningsRollup.driver_id, DriverEarningsRollup.period,
+                            DriverEarningsRollup.period_start],
+            set_={
+                "amount": DriverEarningsRollup.amount + stmt.excluded.amount,
+                "payment_count": DriverEarningsRollup.payment_count + stmt.excluded.payment_count,
+            },
+        ))
@@ -0,0 +1,149 @@
+import asyncio
+import importlib
+import json
+from collections import defaultdict
+
+from app.config import settings
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def ride_channel(ride_id: int) -> str:
+    return f"ride:{ride_id}"
+
+
+def driver_channel(driver_id: int) -> str:
+    return f"driver:{driver_id}"
+
+
+class Subscription:
+    def __init__(self, broker: "EventBroker", channel: str):
+        self.broker = broker
+        self.channel = channel
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def put(self, message: dict):
+        # A slow consumer only ever needs the latest state; drop the oldest.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float = None):
+        """Next message, or None if nothing arrives within timeout."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class EventBackend:
+    """
+    Cross-worker transport. publish() sends to every worker, including this
+    one; start() receives a deliver(channel, message) callback to call for
+    every message that arrives.
+    """
+
+    async def start(self, deliver):
+        raise NotImplementedError
+
+    async def publish(self, channel: str, message: dict):
+        raise NotImplementedError
+
+    async def stop(self):
+        pass
+
+
+class PostgresNotifyBackend(EventBackend):
+    """Shares events between workers over Postgres LISTEN/NOTIFY (asyncpg)."""
+
+    PG_CHANNEL = "ride_events"
+
+    def __init__(self, dsn: str = None):
+        self.dsn = (dsn or settings.DATABASE_URL).replace("postgresql+asyncpg://", "postgresql://").replace(
+            "postgresql+psycopg2://", "postgresql://")
+        self._listener = None
+        self._publisher = None
+
+    async def start(self, deliver):
+        import asyncpg
+
+        def on_notify(connection, pid, pg_channel, payload):
+            data = json.loads(payload)
+            deliver(data["channel"], data["message"])
+
+        self._listener = await asyncpg.connect(self.dsn)
+        self._publisher = await asyncpg.create_pool(self.dsn, min_size=1, max_size=4)
+        await self._listener.add_listener(self.PG_CHANNEL, on_notify)
+
+    async def publish(self, channel: str, message: dict):
+        payload = json.dumps({"channel": channel, "message": message}, default=str)
+        await self._publisher.execute("SELECT pg_notify($1, $2)", self.PG_CHANNEL, payload)
+
+    async def stop(self):
+        if self._listener is not None:
+            await self._listener.close()
+        if self._publisher is not None:
+            await self._publisher.close()
+
+
+BACKENDS = {"postgres": PostgresNotifyBackend}
+
+
+def load_backend(name: str):
+    """'' for in-process only, a name from BACKENDS, or 'package.module:ClassName'."""
+    if not name:
+        return None
+    if name in BACKENDS:
+        return BACKENDS[name]()
+    module_name, _, class_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+class EventBroker:
+    """In-process fan-out to subscribers, optionally bridged across workers by a backend."""
+
+    def __init__(self, backend: EventBackend = None):
+        self.backend = backend
+        self._subscribers = defaultdict(set)
+
+    async def start(self):
+        if self.backend is not None:
+            await self.backend.start(self.deliver)
+
+    async def stop(self):
+        if self.backend is not None:
+            await self.backend.stop()
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel)
+        self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.channel)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.channel]
+
+    def deliver(self, channel: str, message: dict):
+        for subscription in list(self._subscribers.get(channel, ())):
+            subscription.put(message)
+
+    async def publish(self, channel: str, message: dict):
+        if self.backend is not None:
+            await self.backend.publish(channel, message)
+        else:
+            self.deliver(channel, message)
+
+
+broker = EventBroker(load_backend(settings.EVENT_BACKEND))
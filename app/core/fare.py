@@ -0,0 +1,140 @@
+import csv
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.config import settings
+from app.core.cache import TTLCache
+from app.core.geo import EARTH_RADIUS_KM, haversine_km
+
+
+def normalize_place(name: str) -> str:
+    return " ".join(name.lower().replace(",", " ").split())
+
+
+class Gazetteer:
+    """Offline place-name -> (lat, lng) lookup loaded from a CSV file (name,lat,lng)."""
+
+    def __init__(self, places=None):
+        self._places = dict(places or {})
+
+    @classmethod
+    def from_csv(cls, path: str) -> "Gazetteer":
+        places = {}
+        if path and os.path.exists(path):
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    places[normalize_place(row["name"])] = (float(row["lat"]), float(row["lng"]))
+        return cls(places)
+
+    def __len__(self):
+        return len(self._places)
+
+    def get(self, normalized_name: str):
+        return self._places.get(normalized_name)
+
+    def geocode(self, name: str):
+        return self._places.get(normalize_place(name))
+
+
+class HaversineDistance:
+    """Great-circle distance scaled by a detour factor to approximate road distance."""
+
+    def __init__(self, road_factor: float = 1.0):
+        self.road_factor = road_factor
+
+    def distance_km(self, origin, destination) -> float:
+        return haversine_km(*origin, *destination) * self.road_factor
+
+    def distance_km_many(self, origins, destinations):
+        lat1, lng1 = np.radians(origins[:, 0]), np.radians(origins[:, 1])
+        lat2, lng2 = np.radians(destinations[:, 0]), np.radians(destinations[:, 1])
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a)) * self.road_factor
+
+
+@dataclass(frozen=True)
+class Tariff:
+    base_fare: float = 50.0
+    per_km_rate: float = 10.0
+    minimum_fare: float = 0.0
+    # Used when either location is not in the gazetteer
+    default_distance_km: float = 5.0
+
+    def price(self, distance_km: float) -> float:
+        return round(max(self.base_fare + self.per_km_rate * distance_km, self.minimum_fare), 2)
+
+
+class FareEngine:
+    """
+    Quotes fares from location strings.
+
+    The distance provider is pluggable: anything with distance_km(origin,
+    destination) and distance_km_many(origins, destinations) works, e.g. a
+    local road graph instead of straight-line distance.
+    """
+
+    def __init__(self, gazetteer: Gazetteer, distance, tariff: Tariff, cache: TTLCache):
+        self.gazetteer = gazetteer
+        self.distance = distance
+        self.tariff = tariff
+        self.cache = cache
+
+    def geocode(self, name: str):
+        return self.gazetteer.geocode(name)
+
+    def distance_km(self, pickup: str, drop: str) -> float:
+        origin, destination = self.geocode(pickup), self.geocode(drop)
+        if origin is None or destination is None:
+            return self.tariff.default_distance_km
+        return self.distance.distance_km(origin, destination)
+
+    def quote(self, pickup: str, drop: str) -> float:
+        key = (normalize_place(pickup), normalize_place(drop))
+        fare = self.cache.get(key)
+        if fare is None:
+            fare = self.tariff.price(self.distance_km(pickup, drop))
+            self.cache.set(key, fare)
+        return fare
+
+    def quote_many(self, pairs):
+        """Quote a list of (pickup, drop) pairs with one vectorized distance call."""
+        keys = [(normalize_place(pickup), normalize_place(drop)) for pickup, drop in pairs]
+        fares = {}
+        origins, destinations, pending = [], [], []
+        for key in dict.fromkeys(keys):
+            fare = self.cache.get(key)
+            if fare is not None:
+                fares[key] = fare
+                continue
+            origin, destination = self.gazetteer.get(key[0]), self.gazetteer.get(key[1])
+            if origin is None or destination is None:
+                fares[key] = self.tariff.price(self.tariff.default_distance_km)
+                self.cache.set(key, fares[key])
+                continue
+            origins.append(origin)
+            destinations.append(destination)
+            pending.append(key)
+
+        if pending:
+            distances = self.distance.distance_km_many(np.array(origins), np.array(destinations))
+            t = self.tariff
+            prices = np.round(np.maximum(t.base_fare + t.per_km_rate * distances, t.minimum_fare), 2)
+            for key, price in zip(pending, prices.tolist()):
+                fares[key] = price
+                self.cache.set(key, price)
+        return [fares[key] for key in keys]
+
+
+fare_engine = FareEngine(
+    gazetteer=Gazetteer.from_csv(settings.GAZETTEER_PATH),
+    distance=HaversineDistance(road_factor=settings.FARE_ROAD_FACTOR),
+    tariff=Tariff(
+        base_fare=settings.FARE_BASE,
+        per_km_rate=settings.FARE_PER_KM,
+        minimum_fare=settings.FARE_MINIMUM,
+        default_distance_km=settings.FARE_DEFAULT_DISTANCE_KM,
+    ),
+    cache=TTLCache(maxsize=settings.FARE_CACHE_SIZE, ttl=settings.FARE_CACHE_TTL_SECONDS),
+)
@@ -0,0 +1,102 @@
+import math
+import threading
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class GeoIndex:
+    """
+    In-memory grid index of points keyed by id.
+
+    Points are bucketed into fixed-size lat/lng cells, so a radius query only
+    looks at the cells around the query point instead of every stored point.
+    """
+
+    def __init__(self, cell_size_deg: float = 0.005):
+        self.cell_size_deg = cell_size_deg
+        self._cells = {}
+        self._points = {}
+        self._lock = threading.Lock()
+
+    def _cell(self, lat: float, lng: float):
+        return (math.floor(lat / self.cell_size_deg), math.floor(lng / self.cell_size_deg))
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, key):
+        return key in self._points
+
+    def get(self, key):
+        return self._points.get(key)
+
+    def upsert(self, key, lat: float, lng: float):
+        with self._lock:
+            self._discard(key)
+            self._points[key] = (lat, lng)
+            self._cells.setdefault(self._cell(lat, lng), set()).add(key)
+
+    def remove(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key):
+        point = self._points.pop(key, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._cells[cell]
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._points.clear()
+
+    def nearest(self, lat: float, lng: float, radius_km: float, k: int):
+        """Return up to k (key, distance_km) pairs within radius_km, nearest first."""
+        # Width of one cell in km at this latitude; the smaller of the two
+        # dimensions keeps the ring bound conservative.
+        cell_km = self.cell_size_deg * KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+        max_ring = int(math.ceil(radius_km / cell_km))
+        cx, cy = self._cell(lat, lng)
+        found = []
+        with self._lock:
+            for ring in range(max_ring + 1):
+                for cell in _ring_cells(cx, cy, ring):
+                    for key in self._cells.get(cell, ()):
+                        plat, plng = self._points[key]
+                        distance = haversine_km(lat, lng, plat, plng)
+                        if distance <= radius_km:
+                            found.append((key, distance))
+                # Everything not yet visited is at least ring * cell_km away.
+                if len(found) >= k:
+                    found.sort(key=lambda item: item[1])
+                    if found[k - 1][1] <= ring * cell_km:
+                        break
+        found.sort(key=lambda item: item[1])
+        return found[:k]
+
+
+def _ring_cells(cx: int, cy: int, ring: int):
+    if ring == 0:
+        yield (cx, cy)
+        return
+    for dx in range(-ring, ring + 1):
+        yield (cx + dx, cy - ring)
+        yield (cx + dx, cy + ring)
+    for dy in range(-ring + 1, ring):
+        yield (cx - ring, cy + dy)
+        yield (cx + ring, cy + dy)
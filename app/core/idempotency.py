@@ -0,0 +1,48 @@
+import hashlib
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.idempotency import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+def fingerprint(body: BaseModel) -> str:
+    return hashlib.sha256(body.model_dump_json().encode()).hexdigest()
+
+
+async def replay(db: AsyncSession, scope: str, key: Optional[str], request_hash: str):
+    """Stored response for a key already used on this endpoint, or None for a new key."""
+    if key is None:
+        return None
+    stored = await db.get(IdempotencyKey, (key, scope))
+    if stored is None:
+        return None
+    if stored.request_hash != request_hash:
+        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} was already used with a different request.")
+    return stored.response
+
+
+async def commit_once(db: AsyncSession, scope: str, key: Optional[str], request_hash: str, response: dict) -> dict:
+    """
+    Commit the caller's work together with the key, so the work and its
+    recorded response land or fail as one. If a concurrent retry with the
+    same key committed first, roll back and return that response instead.
+    """
+    if key is not None:
+        db.add(IdempotencyKey(key=key, scope=scope, request_hash=request_hash, response=response,
+                              created_at=datetime.utcnow()))
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        stored = await replay(db, scope, key, request_hash)
+        if stored is None:
+            raise
+        return stored
+    return response
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.geo import GeoIndex
+from app.core.pagination import columns_for
+from app.models.ride import Ride, OPEN_REQUEST
+from app.schemas.user import RideOut
+
+DEFAULT_RADIUS_KM = 10.0
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class MatchingEngine:
+    """
+    Keeps open ride requests and driver positions in spatial indexes.
+
+    The DB stays the source of truth: new requests made by other workers are
+    picked up incrementally by id, and candidates are re-checked against the
+    DB before they are returned, so stale entries are dropped lazily.
+
+    Ride ids are handed out at insert but become visible at commit, so a ride
+    can appear below the watermark. Each sync also re-reads the open requests
+    younger than lag_seconds, which picks up a ride that committed late.
+    """
+
+    def __init__(self, lag_seconds: float = settings.MATCHING_SYNC_LAG_SECONDS):
+        self.open_rides = GeoIndex()
+        self.drivers = GeoIndex()
+        self.lag_seconds = lag_seconds
+        self._last_seen_id = 0
+
+    def add_ride(self, ride: Ride):
+        if ride.pickup_lat is None or ride.pickup_lng is None:
+            return
+        self.open_rides.upsert(ride.id, ride.pickup_lat, ride.pickup_lng)
+
+    def remove_ride(self, ride_id: int):
+        self.open_rides.remove(ride_id)
+
+    def update_driver(self, driver_id: int, lat: float, lng: float):
+        self.drivers.upsert(driver_id, lat, lng)
+
+    def driver_position(self, driver_id: int):
+        return self.drivers.get(driver_id)
+
+    async def sync(self, db: AsyncSession, now: datetime = None):
+        # Rides past the last one seen (primary key range), plus the recent
+        # ones (ix_rides_status_timestamp) in case one committed out of id order.
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=self.lag_seconds)
+        new_rides = (await db.scalars(select(Ride).where(
+            or_(Ride.id > self._last_seen_id, Ride.timestamp >= cutoff),
+            OPEN_REQUEST,
+            Ride.pickup_lat.isnot(None),
+        ))).all()
+        for ride in new_rides:
+            self.add_ride(ride)
+            self._last_seen_id = max(self._last_seen_id, ride.id)
+
+    async def nearest_rides(self, db: AsyncSession, lat: float, lng: float,
+                      radius_km: float = DEFAULT_RADIUS_KM, limit: int = DEFAULT_LIMIT, read_db: AsyncSession = None):
+        # Sync from the primary: a lagging replica could let the watermark skip a ride for good.
+        # The candidates themselves may come from read_db (a replica).
+        await self.sync(db)
+        rides = {}
+        while True:
+            candidates = self.open_rides.nearest(lat, lng, radius_km, limit)
+            unchecked = [ride_id for ride_id, _ in candidates if ride_id not in rides]
+            if not unchecked:
+                break
+            found = await self._open_requests(db, read_db, unchecked)
+            rides.update(found)
+            if len(found) == len(unchecked):
+                break
+            for ride_id in unchecked:
+                if ride_id not in found:
+                    # Accepted or cancelled elsewhere since it was indexed; the
+                    # next round fills its place from further index hits.
+                    self.remove_ride(ride_id)
+        return [rides[ride_id] for ride_id, _ in candidates]
+
+    @staticmethod
+    async def _open_requests(db: AsyncSession, read_db: AsyncSession, ids) -> dict:
+        def query(ride_ids):
+            return select(*columns_for(Ride, RideOut)).where(Ride.id.in_(ride_ids), Ride.status == "requested")
+
+        found = {ride.id: ride for ride in (await (read_db or db).execute(query(ids))).all()}
+        missing = [ride_id for ride_id in ids if ride_id not in found]
+        if missing and read_db is not None and read_db is not db:
+            # A lagging replica may not have the ride yet; only the primary can say it is gone
+            found.update({ride.id: ride for ride in (await db.execute(query(missing))).all()})
+        return found
+
+matching_engine = MatchingEngine()
@@ -0,0 +1,239 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.core.db import async_engine, engine, pool_stats
+from app.core.replicas import replica_router
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] += amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self.label_names, key, value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # per-bucket counts (last slot is +Inf), sum, count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        names = self.label_names + ("le",)
+        out = []
+        with self._lock:
+            for key, (counts, total, count) in self._series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    out.append((self.name + "_bucket", names, key + (le,), cumulative))
+                out.append((self.name + "_sum", self.label_names, key, total))
+                out.append((self.name + "_count", self.label_names, key, count))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self, extra=()) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in list(self.metrics) + list(extra):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, label_names, label_values, value in metric.samples():
+                lines.append(f"{name}{_labels(label_names, label_values)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route template", ("method", "route", "status")))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests currently being served"))
+request_queries = registry.register(Histogram(
+    "http_request_db_queries", "Database queries issued per request", ("method", "route"), QUERY_COUNT_BUCKETS))
+request_db_seconds = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in database queries per request", ("method", "route")))
+n_plus_one = registry.register(Counter(
+    "http_request_n_plus_one_total",
+    f"Requests that issued more than METRICS_N_PLUS_ONE_THRESHOLD ({settings.METRICS_N_PLUS_ONE_THRESHOLD}) queries",
+    ("method", "route")))
+db_queries = registry.register(Counter("db_queries_total", "Database queries, inside requests or not"))
+db_seconds = registry.register(Counter("db_query_seconds_total", "Time spent in database queries"))
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# The stats object is shared by reference, so queries run in the threadpool
+# (which copies the context) still add to the request that started them.
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+def _instrument_queries(sync_engine):
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        db_queries.inc()
+        db_seconds.inc(amount=elapsed)
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+
+_instrument_queries(async_engine.sync_engine if async_engine is not None else engine)
+for replica in replica_router.replicas:
+    _instrument_queries(replica.sync_engine)
+
+
+class Snapshot:
+    """Single unlabelled gauge whose value is read at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, value: float):
+        self.name, self.help, self.value = name, help, value
+
+    def samples(self):
+        return [(self.name, (), (), self.value)]
+
+
+def pool_gauges():
+    return [
+        Snapshot(f"db_pool_{key}", f"Connection pool {key.replace('_', ' ')} (see /admin/admin/pool_stats)", value)
+        for key, value in pool_stats().items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    ]
+
+
+def route_template(scope) -> str:
+    """Route template of the matched endpoint, e.g. /rides/{ride_id}/events."""
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return "unmatched"
+    # Recent FastAPI reports the path as declared on the APIRouter, without
+    # the include_router prefix. Our prefixes are static, so take the missing
+    # leading segments from the concrete path.
+    path_parts = scope["path"].split("/")
+    template_parts = template.split("/")
+    if len(path_parts) > len(template_parts):
+        return "/".join(path_parts[:len(path_parts) - len(template_parts) + 1]) + template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request by route template (so /rides/5 and /rides/6 are
+    one series), counts its DB queries and DB time, and flags requests that
+    look like N+1 query loops.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        http_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_flight.dec()
+            current_request.reset(token)
+            route = route_template(scope)
+            method = scope["method"]
+            http_requests.observe(elapsed, method, route, status)
+            request_queries.observe(stats.queries, method, route)
+            request_db_seconds.observe(stats.db_seconds, method, route)
+            if stats.queries > settings.METRICS_N_PLUS_ONE_THRESHOLD:
+                n_plus_one.inc(method, route)
+                logger.warning("%s %s issued %d queries (%.1f ms in DB); possible N+1",
+                               method, route, stats.queries, stats.db_seconds * 1000)
+
+
+def render_metrics() -> str:
+    return registry.render(extra=pool_gauges())
@@ -0,0 +1,74 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """Query parameters shared by every paginated listing."""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} response header"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def columns_for(model, schema):
+    """Columns of model that the response schema actually serializes."""
+    return [getattr(model, name) for name in schema.model_fields if hasattr(model, name)]
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, keys):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(values) != len(keys):
+            raise ValueError
+        return [
+            datetime.fromisoformat(v) if key.type.python_type is datetime else v
+            for key, v in zip(keys, values)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+def _after(keys, values, descending):
+    # (k1, k2) > (v1, v2) spelled out so it works on every backend
+    conditions = []
+    for i, (key, value) in enumerate(zip(keys, values)):
+        step = key < value if descending else key > value
+        conditions.append(and_(*[k == v for k, v in zip(keys[:i], values[:i])], step))
+    return or_(*conditions)
+
+
+async def fetch_page(db: AsyncSession, stmt, keys, page: PageParams, response: Response = None, descending=True):
+    """
+    Run a column select with keyset pagination on keys (the last key must be
+    unique, e.g. id) and return plain dicts. The cursor for the next page is
+    set on the X-Next-Cursor header when more rows remain.
+    """
+    if page.cursor:
+        stmt = stmt.where(_after(keys, decode_cursor(page.cursor, keys), descending))
+    stmt = stmt.order_by(*(key.desc() if descending else key.asc() for key in keys)).limit(page.limit + 1)
+    rows = [dict(row) for row in (await db.execute(stmt)).mappings().all()]
+
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        if response is not None:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor([rows[-1][key.key] for key in keys])
+    return rows
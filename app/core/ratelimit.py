@@ -0,0 +1,61 @@
+import importlib
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import settings
+
+
+class RateLimitBackend:
+    """
+    Token-bucket store. take() refills the key's bucket at rate tokens per
+    second up to burst and takes one token. It returns 0 if a token was
+    taken, otherwise the seconds until one will be available.
+
+    A shared store (e.g. Redis, doing the refill-and-take in one Lua script)
+    makes the limits hold across workers; plug one in with
+    RATE_LIMIT_BACKEND="package.module:ClassName".
+    """
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Buckets in this process only; with several workers a client gets up to workers x the limit."""
+
+    def __init__(self, max_keys: int = settings.RATE_LIMIT_MAX_KEYS, timer=time.monotonic):
+        self.max_keys = max_keys
+        self._timer = timer
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at), least recently used first
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        now = self._timer()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            # An evicted client simply starts again with a full bucket
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+BACKENDS = {"memory": MemoryRateLimitBackend}
+
+
+def load_backend(name: str) -> RateLimitBackend:
+    """A name from BACKENDS or 'package.module:ClassName'."""
+    if name in BACKENDS:
+        return BACKENDS[name]()
+    module_name, _, class_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+rate_limiter = load_backend(settings.RATE_LIMIT_BACKEND)
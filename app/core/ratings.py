@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from sqlalchemy import case, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.db import dialect_insert
+from app.models.rating import DriverRating
+
+STARS = (1, 2, 3, 4, 5)
+
+
+async def record_rating(db: AsyncSession, driver_id: int, rating: int) -> float:
+    """
+    Add one rating to the driver's aggregates and return the new rating
+    score. Runs inside the caller's transaction; commit it together with
+    the Feedback row.
+    """
+    insert = dialect_insert(db)
+    stmt = insert(DriverRating).values(
+        driver_id=driver_id, rating_count=1, rating_sum=rating, recent=str(rating), updated_at=datetime.utcnow(),
+        **{f"stars_{star}": int(star == rating) for star in STARS},
+    )
+    recent = DriverRating.recent + stmt.excluded.recent
+    window = settings.RATING_RECENT_WINDOW
+    row = (await db.execute(stmt.on_conflict_do_update(
+        index_elements=[DriverRating.driver_id],
+        set_={
+            "rating_count": DriverRating.rating_count + 1,
+            "rating_sum": DriverRating.rating_sum + rating,
+            f"stars_{rating}": getattr(DriverRating, f"stars_{rating}") + 1,
+            # Keep the last `window` digits; spelled with CASE because a
+            # negative substr start means different things in SQLite and Postgres
+            "recent": case((func.length(recent) > window, func.substr(recent, func.length(recent) - window + 1)),
+                           else_=recent),
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ).returning(DriverRating.rating_count, DriverRating.rating_sum))).one()
+    return rating_score(row.rating_count, row.rating_sum)
+
+
+def rating_score(rating_count: int, rating_sum: int) -> float:
+    """Average pulled towards RATING_PRIOR_MEAN while a driver has few ratings; use this to rank drivers."""
+    weight = settings.RATING_PRIOR_WEIGHT
+    return (rating_sum + settings.RATING_PRIOR_MEAN * weight) / (rating_count + weight)
+
+
+def rating_summary(row: DriverRating = None) -> dict:
+    """Aggregates as returned by the API; row is None for a driver nobody has rated yet."""
+    if row is None:
+        return {"count": 0, "average": None, "score": round(rating_score(0, 0), 3),
+                "histogram": {star: 0 for star in STARS}, "recent": [], "recent_average": None}
+    recent = [int(digit) for digit in row.recent]
+    return {
+        "count": row.rating_count,
+        "average": round(row.rating_sum / row.rating_count, 3) if row.rating_count else None,
+        "score": round(rating_score(row.rating_count, row.rating_sum), 3),
+        "histogram": {star: getattr(row, f"stars_{star}") for star in STARS},
+        "recent": recent,
+        "recent_average": round(sum(recent) / len(recent), 3) if recent else None,
+    }
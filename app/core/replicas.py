@@ -0,0 +1,255 @@
+import contextvars
+import logging
+import math
+import time
+
+from fastapi import Depends
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+
+from app.config import settings
+from app.core.db import ThreadedSession, engine_options, get_db, new_session, to_async_url
+
+logger = logging.getLogger(__name__)
+
+# Unix time of the client's last write; the client carries it, so any worker or pod can honour it
+LAST_WRITE_COOKIE = "last_write"
+
+
+class RequestWrites:
+    """Per-request flags: read from the primary, and whether a commit wrote."""
+
+    __slots__ = ("sticky", "wrote")
+
+    def __init__(self, sticky: bool):
+        self.sticky = sticky
+        self.wrote = False
+
+
+# Set by ReadYourWritesMiddleware
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+class Replica:
+    """One read replica: its own engine and pool, same options as the primary."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.down_until = 0.0
+        if settings.DB_ASYNC:
+            async_url = to_async_url(url)
+            self.async_engine = create_async_engine(async_url, **engine_options(async_url, is_async=True))
+            self.sync_engine = self.async_engine.sync_engine
+            self._sessions = async_sessionmaker(self.async_engine, class_=AsyncSession, autoflush=False,
+                                                expire_on_commit=False)
+        else:
+            self.async_engine = None
+            self.sync_engine = create_engine(url, **engine_options(url))
+            self._sessions = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False,
+                                          bind=self.sync_engine)
+
+    def session(self):
+        if self.async_engine is not None:
+            return self._sessions()
+        return ThreadedSession(self._sessions())
+
+
+class ReplicaRouter:
+    """
+    Picks where a read-only handler runs: the replicas in turn, except for a
+    sticky request (its client wrote within the last sticky_seconds, so it
+    reads from the primary to see its own writes) or when every replica is
+    marked down.
+    """
+
+    def __init__(self, urls, sticky_seconds: float, retry_seconds: float, timer=time.monotonic, clock=time.time):
+        self.replicas = [Replica(url) for url in urls]
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self._timer = timer
+        self._clock = clock
+        self._next = 0
+
+    def last_write_stamp(self) -> str:
+        return f"{self._clock():.3f}"
+
+    def recent_write(self, stamp) -> bool:
+        """Whether a last-write stamp sent back by a client is younger than sticky_seconds."""
+        try:
+            age = self._clock() - float(stamp)
+        except (TypeError, ValueError):
+            return False
+        # The same margin the other way, for pods whose clocks run slightly apart
+        return -self.sticky_seconds < age < self.sticky_seconds
+
+    def pick(self, sticky: bool = False):
+        if not self.replicas or sticky:
+            return None
+        now = self._timer()
+        for step in range(len(self.replicas)):
+            replica = self.replicas[(self._next + step) % len(self.replicas)]
+            if replica.down_until <= now:
+                self._next = (self._next + step + 1) % len(self.replicas)
+                return replica
+        return None
+
+    def mark_down(self, replica: Replica):
+        replica.down_until = self._timer() + self.retry_seconds
+        logger.warning("read replica %s failed, using the primary for %ss",
+                       replica.sync_engine.url.render_as_string(hide_password=True), self.retry_seconds)
+
+
+replica_router = ReplicaRouter(settings.DATABASE_REPLICA_URLS, settings.REPLICA_STICKY_SECONDS,
+                               settings.REPLICA_RETRY_SECONDS)
+
+
+def replica_failed(exc: Exception) -> bool:
+    # Connection refused, server gone, missing database file and the like;
+    # asyncpg raises OSError from connect without a DBAPI wrapper
+    return (isinstance(exc, (OSError, OperationalError, InterfaceError))
+            or getattr(exc, "connection_invalidated", False))
+
+
+class ReadSession:
+    """
+    Session on a replica for read-only handlers. If the replica fails, it is
+    marked down and the statement is retried on the primary (the given
+    session, else a new one), which serves the rest of the request.
+    """
+
+    _RETRIED = {"execute", "scalar", "scalars", "get", "stream"}
+
+    def __init__(self, replica: Replica, primary=None):
+        self._replica = replica
+        self._session = replica.session()
+        self._primary = primary
+        self._on_primary = False
+
+    def __getattr__(self, name):
+        attr = getattr(self._session, name)
+        if name not in self._RETRIED:
+            return attr
+
+        async def call(*args, **kwargs):
+            try:
+                return await getattr(self._session, name)(*args, **kwargs)
+            except (DBAPIError, OSError) as exc:
+                if self._on_primary or not replica_failed(exc):
+                    raise
+            await self._fall_back()
+            return await getattr(self._session, name)(*args, **kwargs)
+        return call
+
+    async def _fall_back(self):
+        replica_router.mark_down(self._replica)
+        try:
+            await self._session.close()
+        except Exception:
+            logger.debug("closing the failed replica session raised", exc_info=True)
+        self._session = self._primary if self._primary is not None else new_session()
+        self._on_primary = True
+
+    async def close(self):
+        # A primary session passed in belongs to the request and is closed with it
+        if self._session is not self._primary:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+def sticky_request() -> bool:
+    state = current_request.get()
+    return state is not None and state.sticky
+
+
+def read_session():
+    """Session for reads that may lag the primary slightly; use as `async with read_session() as db`."""
+    replica = replica_router.pick(sticky_request())
+    if replica is None:
+        return new_session()
+    return ReadSession(replica)
+
+
+async def get_read_db(db=Depends(get_db)):
+    """
+    Request-scoped session for read-only handlers: a replica when one is
+    picked, else the request's primary session. Never a second primary
+    session, which could wait on a pool slot the request itself holds.
+    """
+    replica = replica_router.pick(sticky_request())
+    if replica is None:
+        yield db
+        return
+    async with ReadSession(replica, primary=db) as read_db:
+        yield read_db
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pure ASGI middleware for read-your-writes across workers and pods. A
+    response whose request committed a write sets the last_write cookie;
+    a request carrying one younger than REPLICA_STICKY_SECONDS reads from
+    the primary. Only installed when replicas are configured.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        connection = HTTPConnection(scope)
+        state = RequestWrites(replica_router.recent_write(connection.cookies.get(LAST_WRITE_COOKIE)))
+
+        async def send_with_stamp(message):
+            # Writes committed after the response started (a streamed body) can't set it
+            if message["type"] == "http.response.start" and state.wrote and replica_router.sticky_seconds > 0:
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{LAST_WRITE_COOKIE}={replica_router.last_write_stamp()}; "
+                    f"Max-Age={math.ceil(replica_router.sticky_seconds)}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        token = current_request.set(state)
+        try:
+            await self.app(scope, receive, send_with_stamp if scope["type"] == "http" else send)
+        finally:
+            current_request.reset(token)
+
+
+def _track_writes():
+    # Session events fire for both modes: ThreadedSession and AsyncSession
+    # wrap a sync Session, and the threadpool copies current_request along
+    @event.listens_for(Session, "after_flush")
+    def _after_flush(session, flush_context):
+        session.info["wrote"] = True
+
+    @event.listens_for(Session, "do_orm_execute")
+    def _on_execute(orm_execute_state):
+        if not orm_execute_state.is_select:
+            orm_execute_state.session.info["wrote"] = True
+
+    @event.listens_for(Session, "after_commit")
+    def _after_commit(session):
+        state = current_request.get()
+        if session.info.pop("wrote", False) and state is not None:
+            # The rest of this request reads its own write too
+            state.wrote = state.sticky = True
+
+    @event.listens_for(Session, "after_rollback")
+    def _after_rollback(session):
+        session.info.pop("wrote", None)
+
+
+if replica_router.replicas:
+    _track_writes()
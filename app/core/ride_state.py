@@ -0,0 +1,95 @@
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.cache import TTLCache
+from app.models.ride import Ride
+
+ACTIVE_STATUSES = ("requested", "accepted", "ongoing")
+# Statuses only move forward; both terminal statuses rank last
+STATUS_RANK = {"requested": 0, "accepted": 1, "ongoing": 2, "completed": 3, "cancelled": 3}
+STATE_COLUMNS = (Ride.id, Ride.user_id, Ride.driver_id, Ride.status, Ride.fare)
+
+
+class RideState(NamedTuple):
+    id: int
+    user_id: int
+    driver_id: Optional[int]
+    status: str
+    fare: float
+
+
+class RideStateStore:
+    """
+    Write-through copy of the rides that are not finished yet and of each
+    driver's active ride, so the lifecycle endpoints validate a transition
+    without reading the ride first.
+
+    The DB stays the source of truth. Entries are written after a commit and
+    rebuilt at startup, so they can lag behind a write made by another worker
+    but never run ahead of the DB: callers refuse from memory only what a
+    lagging entry can't get wrong, and the write itself is a conditional
+    UPDATE that re-checks the status. A ride finished on another worker
+    leaves its entry here until it expires after ttl seconds or is evicted
+    (maxsize); a missing entry only means the DB answers instead.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.rides = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.active_by_driver = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, ride_id: int) -> Optional[RideState]:
+        return self.rides.get(ride_id)
+
+    def active_ride(self, driver_id: int) -> Optional[int]:
+        return self.active_by_driver.get(driver_id)
+
+    def apply(self, ride):
+        """Record a committed state of ride (anything with the STATE_COLUMNS attributes)."""
+        known = self.rides.get(ride.id)
+        if known is not None:
+            if STATUS_RANK[known.status] > STATUS_RANK[ride.status]:
+                return
+            if known.driver_id is not None and self.active_by_driver.get(known.driver_id) == ride.id:
+                self.active_by_driver.pop(known.driver_id)
+        if ride.status not in ACTIVE_STATUSES:
+            self.rides.pop(ride.id)
+            return
+        self.rides.set(ride.id, RideState(ride.id, ride.user_id, ride.driver_id, ride.status, ride.fare))
+        if ride.driver_id is not None:
+            self.active_by_driver.set(ride.driver_id, ride.id)
+
+    def forget(self, ride_id: int):
+        known = self.rides.pop(ride_id)
+        if known is not None and known.driver_id is not None and self.active_by_driver.get(known.driver_id) == ride_id:
+            self.active_by_driver.pop(known.driver_id)
+
+    async def load(self, db: AsyncSession) -> int:
+        """Rebuild from the DB; returns how many rides are active."""
+        rows = (await db.execute(select(*STATE_COLUMNS).where(Ride.status.in_(ACTIVE_STATUSES)))).all()
+        self.rides.clear()
+        self.active_by_driver.clear()
+        for row in rows:
+            self.apply(row)
+        return len(self.rides)
+
+
+async def advance_ride(db: AsyncSession, ride_id: int, expected, *conditions, **values):
+    """
+    Move ride_id out of one of the expected statuses with a single conditional
+    UPDATE. Returns the new state, or None if the ride is missing, in another
+    status or fails one of the conditions.
+    """
+    stmt = (
+        update(Ride)
+        .where(Ride.id == ride_id, Ride.status.in_(expected), *conditions)
+        .values(**values)
+        .returning(*STATE_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    return (await db.execute(stmt)).first()
+
+
+ride_states = RideStateStore(settings.RIDE_STATE_CACHE_SIZE, settings.RIDE_STATE_CACHE_TTL_SECONDS)
@@ -0,0 +1,213 @@
+import asyncio
+import bisect
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.db import dialect_insert, new_session
+from app.models.ride import Ride
+from app.models.ride_event import RideAcceptWaitHourly, RideEvent, RideStatsHourly, RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = "ride_stats_hourly"
+EVENT_COLUMNS = {
+    "requested": "requests",
+    "accepted": "accepts",
+    "ongoing": "starts",
+    "completed": "completions",
+    "cancelled": "cancels",
+}
+# Request-to-accept histogram bounds in seconds; medians are interpolated inside a
+# bucket, and waits beyond the last bound land in it
+ACCEPT_WAIT_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300, 600, 900, 1800, 3600, 86400)
+BATCH_SIZE = 5000
+
+
+def record_ride_event(db: AsyncSession, ride_id: int, event: str, driver_id: int = None, fare: float = None):
+    """Add the event to the caller's transaction so it commits (or not) with the status change."""
+    db.add(RideEvent(ride_id=ride_id, event=event, driver_id=driver_id, fare=fare, created_at=datetime.utcnow()))
+
+
+def hour_of(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def wait_bucket(seconds: float) -> int:
+    return ACCEPT_WAIT_BUCKETS[min(bisect.bisect_left(ACCEPT_WAIT_BUCKETS, seconds), len(ACCEPT_WAIT_BUCKETS) - 1)]
+
+
+def median_from_buckets(counts: dict):
+    """Median of a {le_seconds: count} histogram, interpolated inside its bucket."""
+    total = sum(counts.values())
+    if not total:
+        return None
+    rank, seen, lower = total / 2, 0, 0
+    for le in sorted(counts):
+        count = counts[le]
+        if count and seen + count >= rank:
+            return round(lower + (le - lower) * (rank - seen) / count, 1)
+        seen += count
+        lower = le
+    return None
+
+
+async def _claim(db: AsyncSession, watermark, last_id: int, new_id: int, now: datetime) -> bool:
+    # Advance the watermark first: a second worker folding the same batch
+    # matches no row (or hits the primary key) and rolls back its work.
+    if watermark is None:
+        db.add(RollupWatermark(name=WATERMARK, last_event_id=new_id, updated_at=now))
+        try:
+            await db.flush()
+        except IntegrityError:
+            return False
+        return True
+    result = await db.execute(
+        update(RollupWatermark)
+        .where(RollupWatermark.name == WATERMARK, RollupWatermark.last_event_id == last_id)
+        .values(last_event_id=new_id, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+async def aggregate_batch(db: AsyncSession, lag_seconds: float = settings.RIDE_STATS_LAG_SECONDS,
+                          batch_size: int = BATCH_SIZE, now: datetime = None) -> int:
+    """
+    Fold the next batch of events past the watermark into the hourly rollups
+    and commit. Returns how many events were folded; 0 when caught up or when
+    another worker took the batch.
+
+    Event ids are handed out at insert but become visible at commit, so the
+    batch stops at the first event younger than lag_seconds: a lower id may
+    still be in flight behind it and would be skipped by the watermark.
+    """
+    now = now or datetime.utcnow()
+    watermark = await db.get(RollupWatermark, WATERMARK)
+    last_id = watermark.last_event_id if watermark else 0
+    rows = (await db.execute(
+        select(RideEvent.id, RideEvent.event, RideEvent.fare, RideEvent.created_at, Ride.timestamp)
+        .join(Ride, Ride.id == RideEvent.ride_id)
+        .where(RideEvent.id > last_id)
+        .order_by(RideEvent.id)
+        .limit(batch_size)
+    )).all()
+    cutoff = now - timedelta(seconds=lag_seconds)
+    events = []
+    for row in rows:
+        if row.created_at >= cutoff:
+            break
+        events.append(row)
+    if not events or not await _claim(db, watermark, last_id, events[-1].id, now):
+        await db.rollback()
+        return 0
+
+    stats, waits = {}, {}
+    for event in events:
+        hour = hour_of(event.created_at)
+        row = stats.setdefault(hour, {"hour": hour, "requests": 0, "accepts": 0, "starts": 0, "completions": 0,
+                                      "cancels": 0, "revenue": 0.0, "accept_wait_seconds": 0.0})
+        column = EVENT_COLUMNS.get(event.event)
+        if column is None:
+            continue
+        row[column] += 1
+        if event.event == "completed":
+            row["revenue"] += event.fare or 0.0
+        elif event.event == "accepted" and event.timestamp is not None:
+            wait = max((event.created_at - event.timestamp).total_seconds(), 0.0)
+            row["accept_wait_seconds"] += wait
+            key = (hour, wait_bucket(wait))
+            waits[key] = waits.get(key, 0) + 1
+
+    insert = dialect_insert(db)
+    stmt = insert(RideStatsHourly).values(list(stats.values()))
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[RideStatsHourly.hour],
+        set_={name: getattr(RideStatsHourly, name) + stmt.excluded[name]
+              for name in ("requests", "accepts", "starts", "completions", "cancels", "revenue",
+                           "accept_wait_seconds")},
+    ))
+    if waits:
+        stmt = insert(RideAcceptWaitHourly).values(
+            [{"hour": hour, "le_seconds": le, "count": count} for (hour, le), count in waits.items()])
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[RideAcceptWaitHourly.hour, RideAcceptWaitHourly.le_seconds],
+            set_={"count": RideAcceptWaitHourly.count + stmt.excluded.count},
+        ))
+    await db.commit()
+    return len(events)
+
+
+async def catch_up(db: AsyncSession, **kwargs) -> int:
+    """Fold batches until no full batch is left; returns the number of events folded."""
+    batch_size = kwargs.setdefault("batch_size", BATCH_SIZE)
+    total = 0
+    while True:
+        folded = await aggregate_batch(db, **kwargs)
+        total += folded
+        if folded < batch_size:
+            return total
+
+
+async def hourly_stats(db: AsyncSession, date_from: datetime, date_to: datetime):
+    """Rollup rows for the hours in [date_from, date_to), with cancel rate and accept-time averages."""
+    window = (RideStatsHourly.hour >= hour_of(date_from), RideStatsHourly.hour < date_to)
+    rows = (await db.execute(select(RideStatsHourly).where(*window).order_by(RideStatsHourly.hour))).scalars().all()
+    buckets = {}
+    for hour, le, count in (await db.execute(
+        select(RideAcceptWaitHourly.hour, RideAcceptWaitHourly.le_seconds, RideAcceptWaitHourly.count)
+        .where(RideAcceptWaitHourly.hour >= hour_of(date_from), RideAcceptWaitHourly.hour < date_to)
+    )).all():
+        buckets.setdefault(hour, {})[le] = count
+    return [
+        {
+            "hour": row.hour,
+            "requests": row.requests,
+            "accepts": row.accepts,
+            "starts": row.starts,
+            "completions": row.completions,
+            "cancels": row.cancels,
+            "cancel_rate": round(row.cancels / row.requests, 4) if row.requests else None,
+            "revenue": row.revenue,
+            "avg_accept_seconds": round(row.accept_wait_seconds / row.accepts, 1) if row.accepts else None,
+            "median_accept_seconds": median_from_buckets(buckets.get(row.hour, {})),
+        }
+        for row in rows
+    ]
+
+
+class RideStatsJob:
+    """Background loop folding new ride events into the hourly rollups; safe to run in every worker."""
+
+    def __init__(self):
+        self._task = None
+
+    async def _run(self, interval_seconds: float):
+        while True:
+            try:
+                async with new_session() as db:
+                    folded = await catch_up(db)
+                if folded:
+                    logger.info("folded %d ride events into hourly stats", folded)
+            except Exception:
+                logger.exception("ride stats aggregation failed")
+            await asyncio.sleep(interval_seconds)
+
+    def start(self, interval_seconds: float = settings.RIDE_STATS_INTERVAL_SECONDS):
+        self._task = asyncio.create_task(self._run(interval_seconds))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+ride_stats_job = RideStatsJob()
@@ -0,0 +1,125 @@
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, exists, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import dialect_insert
+from app.core.earnings import record_payouts
+from app.models.payment import Payment
+from app.models.ride import Ride
+
+# Payment state machine. A payment row is either a charge (the customer pays
+# for a ride, recipient_id is NULL) or a payout (the platform pays the
+# driver, recipient_id is the driver):
+#
+#     charge:  pending --make_payment--> paid
+#     payout:  inserted as paid by the admin payout endpoints, once per ride
+#              (the partial unique index ux_payments_ride_payout)
+#
+# complete_ride opens the ride's charge. Leaving "pending" is a single
+# conditional UPDATE ... RETURNING, so concurrent or retried requests can't
+# pay a row twice.
+
+
+def open_charge(db: AsyncSession, ride_id: int, amount: float):
+    """Add the pending charge for a completed ride to the caller's transaction."""
+    db.add(Payment(ride_id=ride_id, amount=amount, method="cash", status="pending"))
+
+
+def settle_statement(ride_id: int, user_id: int, method: str, paid_at: datetime):
+    # Ownership and ride state are checked inside the UPDATE, so the happy
+    # path is one round trip
+    return (
+        update(Payment)
+        .where(
+            Payment.ride_id == ride_id,
+            Payment.recipient_id.is_(None),
+            Payment.status == "pending",
+            Payment.amount > 0,
+            exists().where(Ride.id == Payment.ride_id, Ride.user_id == user_id, Ride.status == "completed"),
+        )
+        .values(status="paid", method=method, paid_at=paid_at)
+        .returning(Payment.id, Payment.ride_id, Payment.amount, Payment.method, Payment.status, Payment.paid_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def settle_charge(db: AsyncSession, ride_id: int, user_id: int, method: str):
+    """pending -> paid for the customer's charge on ride_id; None if nothing was pending for them."""
+    return (await db.execute(settle_statement(ride_id, user_id, method, datetime.utcnow()))).first()
+
+
+async def charge_error(db: AsyncSession, ride_id: int, user_id: int) -> HTTPException:
+    """Why settle_charge found nothing; only runs on the failure path."""
+    row = (await db.execute(
+        select(Ride.user_id, Ride.status, Payment.status.label("payment_status"), Payment.amount)
+        .outerjoin(Payment, and_(Payment.ride_id == Ride.id, Payment.recipient_id.is_(None)))
+        .where(Ride.id == ride_id)
+    )).first()
+    if row is None or row.status != "completed":
+        return HTTPException(status_code=400, detail="Payment can only be made after ride completion.")
+    if row.user_id != user_id:
+        return HTTPException(status_code=403, detail="You are not authorized to make payment for this ride.")
+    if row.payment_status is None:
+        return HTTPException(status_code=400, detail="No pending payment found for this ride.")
+    if row.payment_status == "paid":
+        return HTTPException(status_code=409, detail="Payment has already been completed for this ride.")
+    if not row.amount:
+        return HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                             detail="Ride fare not set. Cannot process payment.")
+    return HTTPException(status_code=400, detail=f"Payment is {row.payment_status}.")
+
+
+async def pay_out(db: AsyncSession, payouts):
+    """
+    Pay drivers for rides: payouts are objects with ride_id, driver_id,
+    amount and method. Returns one result per payout, with status paid,
+    invalid_ride (not that driver's ride), duplicate (same ride earlier in
+    the batch) or already_paid. Paid rows are inserted in one statement and
+    added to the earnings ledger; the caller commits. A ride paid by a
+    concurrent call after the check is skipped by the unique index and
+    reported as already_paid.
+    """
+    ride_ids = {p.ride_id for p in payouts}
+    ride_drivers = dict((await db.execute(select(Ride.id, Ride.driver_id).where(Ride.id.in_(ride_ids)))).all())
+    already_paid = set((await db.execute(
+        select(Payment.ride_id).where(Payment.ride_id.in_(ride_ids), Payment.recipient_id.isnot(None),
+                                      Payment.status == "paid")
+    )).scalars().all())
+
+    paid_at = datetime.utcnow()
+    results, rows, seen = [], [], set()
+    for p in payouts:
+        result = {"ride_id": p.ride_id, "driver_id": p.driver_id}
+        if ride_drivers.get(p.ride_id) != p.driver_id:
+            result["status"] = "invalid_ride"
+        elif p.ride_id in seen:
+            result["status"] = "duplicate"
+        elif p.ride_id in already_paid:
+            result["status"] = "already_paid"
+        else:
+            seen.add(p.ride_id)
+            result["status"] = "paid"
+            rows.append({"ride_id": p.ride_id, "recipient_id": p.driver_id, "amount": p.amount,
+                         "method": p.method, "status": "paid", "paid_at": paid_at})
+        results.append(result)
+
+    if rows:
+        # ride_id is unique in rows, so ids are matched back by it
+        stmt = dialect_insert(db)(Payment).on_conflict_do_nothing(
+            index_elements=[Payment.ride_id],
+            index_where=text("recipient_id IS NOT NULL AND status = 'paid'"),
+        )
+        payment_ids = dict((await db.execute(
+            stmt.returning(Payment.ride_id, Payment.id), rows
+        )).all())
+        for result in results:
+            if result["status"] == "paid":
+                if result["ride_id"] in payment_ids:
+                    result["payment_id"] = payment_ids[result["ride_id"]]
+                else:
+                    result["status"] = "already_paid"
+        rows = [row for row in rows if row["ride_id"] in payment_ids]
+        await record_payouts(db, [(row["recipient_id"], row["amount"], paid_at) for row in rows])
+    return results, sum(row["amount"] for row in rows)
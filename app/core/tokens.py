@@ -0,0 +1,103 @@
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.cache import TTLCache
+from app.models.refresh_token import RefreshToken
+
+# token_hash -> family_id of refresh tokens already rotated or revoked. Lets
+# replayed tokens be rejected (and their family revoked) without waiting on
+# the rotation UPDATE; the refresh_tokens table stays the source of truth.
+revoked_tokens = TTLCache(
+    maxsize=settings.REFRESH_REVOCATION_CACHE_SIZE,
+    ttl=settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400,
+)
+
+
+def remember_revoked(db: AsyncSession, token_hash: str, family_id: str):
+    # Cached only once the revocation commits: a rotation that rolls back
+    # never happened, and its retry must not look like a replay
+    db.info.setdefault("revoked_tokens", []).append((token_hash, family_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_revoked(session):
+    for token_hash, family_id in session.info.pop("revoked_tokens", ()):
+        revoked_tokens.set(token_hash, family_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_revoked(session):
+    session.info.pop("revoked_tokens", None)
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(db: AsyncSession, user_id: int, family_id: Optional[str] = None) -> str:
+    """Add a new refresh token to the session and return its plain value; the caller commits."""
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=hash_token(token),
+        family_id=family_id or secrets.token_hex(16),
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token
+
+
+async def revoke_family(db: AsyncSession, family_id: str):
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str):
+    """
+    Spend a refresh token: (user_id, new_token) or None if it is unknown,
+    expired or already spent. Spending is one conditional UPDATE on the
+    unique token_hash index, so two concurrent refreshes cannot both win.
+    Presenting a spent token again revokes its whole family, since either
+    the client or an attacker is replaying it. The caller commits.
+    """
+    token_hash = hash_token(token)
+    now = datetime.utcnow()
+
+    family_id = revoked_tokens.get(token_hash)
+    if family_id is None:
+        spent = (await db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.token_hash == token_hash, RefreshToken.revoked_at.is_(None),
+                   RefreshToken.expires_at > now)
+            .values(revoked_at=now)
+            .returning(RefreshToken.user_id, RefreshToken.family_id)
+            .execution_options(synchronize_session=False)
+        )).first()
+        if spent is not None:
+            remember_revoked(db, token_hash, spent.family_id)
+            return spent.user_id, issue_refresh_token(db, spent.user_id, spent.family_id)
+        family_id = await db.scalar(select(RefreshToken.family_id).where(
+            RefreshToken.token_hash == token_hash, RefreshToken.revoked_at.is_not(None)))
+
+    if family_id is not None:
+        await revoke_family(db, family_id)
+    return None
+
+
+async def revoke_refresh_token(db: AsyncSession, token: str):
+    """Logout: revoke the token and every other token of its login. The caller commits."""
+    token_hash = hash_token(token)
+    family_id = await db.scalar(select(RefreshToken.family_id).where(RefreshToken.token_hash == token_hash))
+    if family_id is not None:
+        remember_revoked(db, token_hash, family_id)
+        await revoke_family(db, family_id)
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import time
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.core.db import new_session, prime_pool
+from app.core.fare import fare_engine
+from app.core.matching import matching_engine
+from app.core.ride_state import ride_states
+from app.models.ride import Ride
+
+logger = logging.getLogger(__name__)
+
+RETRY_SECONDS = 5
+# Rides scanned per route wanted; popular routes repeat, so most of the scan is duplicates
+RIDES_PER_ROUTE = 5
+
+
+async def prime_fare_cache(db, routes: int) -> int:
+    """Quote the most recent distinct routes so repeat quotes are cache hits; returns how many."""
+    if routes <= 0:
+        return 0
+    rows = (await db.execute(
+        select(Ride.pickup_location, Ride.drop_location).order_by(Ride.id.desc()).limit(routes * RIDES_PER_ROUTE)
+    )).all()
+    pairs = list(dict.fromkeys(tuple(row) for row in rows))[:routes]
+    fare_engine.quote_many(pairs)
+    return len(pairs)
+
+
+class Warmup:
+    """
+    Startup work that runs once the server is accepting connections, so
+    liveness answers at once while /health/ready reports 503 until the pool
+    is open and the in-memory indexes, ride states and caches are filled.
+    Retries until the database is reachable.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.seconds = None
+        self._task = None
+
+    async def run(self):
+        start = time.perf_counter()
+        while True:
+            try:
+                connections = await prime_pool(settings.WARMUP_DB_CONNECTIONS)
+                async with new_session() as db:
+                    await matching_engine.sync(db)
+                    active_rides = await ride_states.load(db)
+                    routes = await prime_fare_cache(db, settings.WARMUP_FARE_ROUTES)
+                break
+            except Exception:
+                logger.exception("warmup failed, retrying in %ss", RETRY_SECONDS)
+                await asyncio.sleep(RETRY_SECONDS)
+        self.seconds = time.perf_counter() - start
+        self.ready = True
+        logger.info("warmup done in %.2fs: %d connections, %d open rides indexed, %d active rides, %d fare routes",
+                    self.seconds, connections, len(matching_engine.open_rides), active_rides, routes)
+
+    def start(self):
+        if not settings.WARMUP_ENABLED:
+            self.ready = True
+            return
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        # Fail readiness first so no new traffic is routed here while shutting down
+        self.ready = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+warmup = Warmup()
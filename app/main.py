@@ -1,16 +1,45 @@
 # app/main.py
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request, Form, Depends, HTTPException, status
-from app.core.db import engine
-from app.models.user import Base
+from app.config import settings
+from app.core.auth import password_workers
+from app.core.db import new_session
+from app.core.dispatch import dispatcher
+from app.core.events import broker
+from app.core.ride_stats import ride_stats_job
+from app.core.warmup import warmup
 # Import the new user router
-from app.routers import auth, ride, admin, complaint, emergency, feedback, earnings, payment, user # ADD 'user' here
+from app.routers import auth, ride, admin, complaint, emergency, feedback, earnings, health, payment, user # ADD 'user' here
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 
-# Create all tables in the database
-Base.metadata.create_all(bind=engine)
+# The schema is managed by Alembic: run `alembic upgrade head` before starting the app.
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.DISPATCH_ENABLED and settings.WEB_CONCURRENCY > 1:
+        # Each worker would queue only the rides and drivers it saw itself
+        raise RuntimeError("DISPATCH_ENABLED needs a single worker process (WEB_CONCURRENCY=1): "
+                           "the dispatch queue, idle drivers and offers live in one process's memory")
+    await broker.start()
+    if settings.DISPATCH_ENABLED:
+        async with new_session() as db:
+            await dispatcher.load(db)
+        dispatcher.start()
+    if settings.RIDE_STATS_INTERVAL_SECONDS > 0:
+        ride_stats_job.start()
+    # Runs while the server already answers /health/live; /health/ready waits for it
+    warmup.start()
+    yield
+    await warmup.stop()
+    await ride_stats_job.stop()
+    await dispatcher.stop()
+    await broker.stop()
+    password_workers.shutdown()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://127.0.0.1:5500", # Common for Live Server VS Code extension
@@ -19,6 +48,14 @@ origins = [
     # Add the actual URL where your frontend will be served if it's different
 ]
 
+if settings.METRICS_ENABLED:
+    from app.core.metrics import MetricsMiddleware
+    app.add_middleware(MetricsMiddleware)
+
+if settings.DATABASE_REPLICA_URLS:
+    from app.core.replicas import ReadYourWritesMiddleware
+    app.add_middleware(ReadYourWritesMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -29,6 +66,7 @@ app.add_middleware(
 
 
 # Include the API routers
+app.include_router(health.router, tags=["health"])
 app.include_router(auth.router)
 app.include_router(ride.router, prefix="/rides", tags=["rides"])
 app.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -39,4 +77,7 @@ app.include_router(complaint.router, tags=["complaints"])
 app.include_router(payment.router, tags=["payments"])
 # ADD the new user router
 app.include_router(user.router, prefix="/users", tags=["users"])
+if settings.METRICS_ENABLED:
+    from app.routers import metrics
+    app.include_router(metrics.router, tags=["metrics"])
 
@@ -0,0 +1,24 @@
+# models/earnings.py
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, Date, DateTime
+from app.core.db import Base
+
+
+class DriverEarnings(Base):
+    """Running payout totals per driver, updated in the same transaction as each paid payout."""
+    __tablename__ = "driver_earnings"
+
+    driver_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_amount = Column(Float, nullable=False, default=0)
+    payment_count = Column(Integer, nullable=False, default=0)
+    last_paid_at = Column(DateTime)
+
+
+class DriverEarningsRollup(Base):
+    """Payout totals per driver per day/week/month bucket."""
+    __tablename__ = "driver_earnings_rollups"
+
+    driver_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    period = Column(String, primary_key=True)  # day, week, month
+    period_start = Column(Date, primary_key=True)  # weeks start on Monday
+    amount = Column(Float, nullable=False, default=0)
+    payment_count = Column(Integer, nullable=False, default=0)
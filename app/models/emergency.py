@@ -6,6 +6,6 @@ class EmergencyContact(Base):
     __tablename__ = "emergency_contacts"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     name = Column(String, nullable=False)
     phone = Column(String, nullable=False)
@@ -6,6 +6,6 @@ class Feedback(Base):
     __tablename__ = "feedback"
 
     id = Column(Integer, primary_key=True, index=True)
-    ride_id = Column(Integer, ForeignKey("rides.id"))
+    ride_id = Column(Integer, ForeignKey("rides.id"), unique=True, index=True)
     rating = Column(Integer, nullable=False)  # 1 to 5
     comment = Column(String)
@@ -0,0 +1,14 @@
+# models/idempotency.py
+from sqlalchemy import Column, String, DateTime, JSON
+from app.core.db import Base
+
+
+class IdempotencyKey(Base):
+    """Response of a completed request, replayed when a client retries with the same Idempotency-Key."""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    scope = Column(String(64), primary_key=True)  # endpoint the key was used on
+    request_hash = Column(String(64), nullable=False)
+    response = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False)
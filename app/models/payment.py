@@ -1,12 +1,26 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, Index, DateTime, text
 from app.core.db import Base
 
 class Payment(Base):
     __tablename__ = "payments"
 
     id = Column(Integer, primary_key=True, index=True)
-    ride_id = Column(Integer, ForeignKey("rides.id"))
+    ride_id = Column(Integer, ForeignKey("rides.id"), index=True)
     recipient_id = Column(Integer, ForeignKey("users.id"))  # New field
     amount = Column(Float)
     method = Column(String)  # e.g., cash, UPI, card
     status = Column(String)  # e.g., pending, paid
+    paid_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Driver earnings: paid payouts per recipient
+        Index("ix_payments_recipient_id_status", "recipient_id", "status"),
+        # A ride is paid out to its driver at most once
+        Index(
+            "ux_payments_ride_payout",
+            "ride_id",
+            unique=True,
+            postgresql_where=text("recipient_id IS NOT NULL AND status = 'paid'"),
+            sqlite_where=text("recipient_id IS NOT NULL AND status = 'paid'"),
+        ),
+    )
@@ -0,0 +1,21 @@
+# models/rating.py
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from app.core.db import Base
+
+
+class DriverRating(Base):
+    """Running rating aggregates per driver, updated in the same transaction as each feedback row."""
+    __tablename__ = "driver_ratings"
+
+    driver_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    rating_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    # Histogram of 1-5 star ratings
+    stars_1 = Column(Integer, nullable=False, default=0)
+    stars_2 = Column(Integer, nullable=False, default=0)
+    stars_3 = Column(Integer, nullable=False, default=0)
+    stars_4 = Column(Integer, nullable=False, default=0)
+    stars_5 = Column(Integer, nullable=False, default=0)
+    # Latest ratings as digits, oldest first, capped at RATING_RECENT_WINDOW
+    recent = Column(String, nullable=False, default="")
+    updated_at = Column(DateTime)
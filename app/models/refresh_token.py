@@ -0,0 +1,14 @@
+# models/refresh_token.py
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from app.core.db import Base
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)  # sha256 hex; the token itself is never stored
+    family_id = Column(String(32), nullable=False, index=True)  # every rotation of one login shares this
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)  # set when rotated, logged out or reused
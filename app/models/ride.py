@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, DateTime, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum, DateTime, Float, Index, literal, text
 from sqlalchemy.orm import relationship
 from app.core.db import Base
 
@@ -13,9 +13,43 @@ class Ride(Base):
     driver_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     pickup_location = Column(String, nullable=False)
     drop_location = Column(String, nullable=False)
+    pickup_lat = Column(Float, nullable=True)
+    pickup_lng = Column(Float, nullable=True)
     status = Column(String, default="requested")
     fare = Column(Float, default=0.0)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="rides", foreign_keys=[user_id])
     driver = relationship("User", back_populates="assigned_rides", foreign_keys=[driver_id])
+
+    __table_args__ = (
+        # Customer ride history, newest first
+        Index("ix_rides_user_id_timestamp", "user_id", "timestamp", "id"),
+        # Active-ride check in accept_ride and driver ride history
+        Index("ix_rides_driver_id_status", "driver_id", "status"),
+        # A driver has at most one accepted/ongoing ride
+        Index(
+            "ux_rides_driver_active",
+            "driver_id",
+            unique=True,
+            postgresql_where=text("status IN ('accepted', 'ongoing')"),
+            sqlite_where=text("status IN ('accepted', 'ongoing')"),
+        ),
+        # Admin listing filtered by status, newest first
+        Index("ix_rides_status_timestamp", "status", "timestamp", "id"),
+        # Admin listing and exports in time order
+        Index("ix_rides_timestamp_id", "timestamp", "id"),
+        # Open requests only; stays small however large rides grows
+        Index(
+            "ix_rides_requested",
+            "timestamp",
+            "id",
+            postgresql_where=text("status = 'requested'"),
+            sqlite_where=text("status = 'requested'"),
+        ),
+    )
+
+
+# Rendered inline rather than bound so the planner can match the partial index
+# ix_rides_requested (SQLite and Postgres generic plans can't see bound values).
+OPEN_REQUEST = Ride.status == literal("requested", literal_execute=True)
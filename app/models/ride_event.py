@@ -0,0 +1,47 @@
+# models/ride_event.py
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime
+from app.core.db import Base
+
+
+class RideEvent(Base):
+    """Append-only log of ride transitions, written in the same transaction as the status change."""
+    __tablename__ = "ride_events"
+
+    id = Column(Integer, primary_key=True)  # rollups consume events in id order
+    ride_id = Column(Integer, ForeignKey("rides.id"), nullable=False, index=True)
+    event = Column(String, nullable=False)  # requested, accepted, ongoing, completed, cancelled
+    driver_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    fare = Column(Float, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+
+
+class RideStatsHourly(Base):
+    """Ride event counts and revenue per hour, maintained from ride_events."""
+    __tablename__ = "ride_stats_hourly"
+
+    hour = Column(DateTime, primary_key=True)
+    requests = Column(Integer, nullable=False, default=0)
+    accepts = Column(Integer, nullable=False, default=0)
+    starts = Column(Integer, nullable=False, default=0)
+    completions = Column(Integer, nullable=False, default=0)
+    cancels = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    accept_wait_seconds = Column(Float, nullable=False, default=0)  # sum over accepts
+
+
+class RideAcceptWaitHourly(Base):
+    """Histogram of request-to-accept time per hour; medians are read off the buckets."""
+    __tablename__ = "ride_accept_waits_hourly"
+
+    hour = Column(DateTime, primary_key=True)
+    le_seconds = Column(Integer, primary_key=True)  # bucket upper bound
+    count = Column(Integer, nullable=False, default=0)
+
+
+class RollupWatermark(Base):
+    """Last ride_events id folded into a rollup."""
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(64), primary_key=True)
+    last_event_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
@@ -1,15 +1,26 @@
-from typing import List
+from datetime import datetime, timedelta
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from app.core.db import SessionLocal # your session dependency
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.db import get_db, pool_stats # your session dependency
+from app.core.export import EXPORT_FORMATS, export_response
+from app.core.idempotency import IDEMPOTENCY_HEADER, commit_once, fingerprint, replay
+from app.core.pagination import PageParams, columns_for, fetch_page
+from app.core.replicas import get_read_db
+from app.core.ride_stats import catch_up, hourly_stats
+from app.core.settlement import pay_out
 from app.models.complaint import Complaint
 from app.models.payment import Payment
 from app.models.ride import Ride
 from app.models.user import User  # your SQLAlchemy model
-from app.schemas.user import UserOut, RideOut, PaymentOut  # pydantic model for response
-from dependencies.auth import get_current_user
+from app.schemas.user import UserOut, RideOut, PaymentOut, ComplaintOut  # pydantic model for response
+from app.schemas.user import (
+    BulkApprovalOut, BulkPayoutOut, DriverPaymentOut, MessageOut, PoolStatsOut, RideStatsHourOut, RideStatsRefreshOut
+)
+from dependencies.auth import get_current_user, invalidate_principal
 
 router = APIRouter()
 
@@ -22,45 +33,44 @@ class AdminApprovalRequest(BaseModel):
     driver_id : int
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-@router.post("/admin/approve_driver")
-def approve_driver(request: AdminApprovalRequest, db: Session = Depends(get_db)):
+@router.post("/admin/approve_driver", response_model=MessageOut)
+async def approve_driver(request: AdminApprovalRequest, db: AsyncSession = Depends(get_db)):
     # Check if the admin email is correct
     if request.admin_email != ADMIN_EMAIL:
         raise HTTPException(status_code=403, detail="Unauthorized: Only admin can approve drivers.")
 
     # Check if driver exists
-    driver = db.query(User).filter(User.id == request.driver_id, User.is_driver == True).first()
+    driver = await db.scalar(select(User).where(User.id == request.driver_id, User.is_driver == True))
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found.")
 
     # Approve the driver
     driver.is_approved = True
-    db.commit()
+    await db.commit()
+    invalidate_principal(driver.id)
 
     return {"message": f"Driver with ID {request.driver_id} has been approved."}
 # routers/users.py (or wherever you keep your user routes)
 
 
 @router.get("/users/drivers", response_model=List[UserOut])
-def get_all_drivers(admin_email: str = Query(...), db: Session = Depends(get_db)):
+async def get_all_drivers(response: Response, admin_email: str = Query(...), is_approved: Optional[bool] = Query(None),
+                          page: PageParams = Depends(), db: AsyncSession = Depends(get_read_db)):
     if admin_email != ADMIN_EMAIL:
         raise HTTPException(status_code=403, detail="Unauthorized")
-    return db.query(User).filter(User.is_driver == True).all()
+    stmt = select(*columns_for(User, UserOut)).where(User.is_driver == True)
+    if is_approved is not None:
+        stmt = stmt.where(User.is_approved == is_approved)
+    return await fetch_page(db, stmt, [User.id], page, response, descending=False)
 
 
 @router.get("/users/customers", response_model=List[UserOut])
-def get_customers(admin_email: str = Query(...), db: Session = Depends(get_db)):
+async def get_customers(response: Response, admin_email: str = Query(...), page: PageParams = Depends(),
+                        db: AsyncSession = Depends(get_read_db)):
     if admin_email != ADMIN_EMAIL:
         raise HTTPException(status_code=403, detail="Unauthorized")
-    customers = db.query(User).filter(User.is_driver == False).all()
+    stmt = select(*columns_for(User, UserOut)).where(User.is_driver == False)
+    customers = await fetch_page(db, stmt, [User.id], page, response, descending=False)
     return customers
 
 
@@ -70,54 +80,281 @@ class AdminPaymentCreate(BaseModel):
     amount: float
     method: str  # e.g., bank_transfer, UPI
 
-@router.post("/admin/pay_driver")
-def pay_driver(data: AdminPaymentCreate, db: Session = Depends(get_db)):
-    ride = db.query(Ride).filter(Ride.id == data.ride_id).first()
-    if not ride or ride.driver_id != data.driver_id:
+@router.post("/admin/pay_driver", response_model=DriverPaymentOut)
+async def pay_driver(
+    data: AdminPaymentCreate,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    db: AsyncSession = Depends(get_db)
+):
+    request_hash = fingerprint(data)
+    stored = await replay(db, "pay_driver", idempotency_key, request_hash)
+    if stored is not None:
+        return stored
+
+    (result,), _ = await pay_out(db, [data])
+    if result["status"] == "invalid_ride":
         raise HTTPException(status_code=400, detail="Invalid ride or driver.")
+    if result["status"] == "already_paid":
+        raise HTTPException(status_code=409, detail="This ride has already been paid out.")
 
-    payment = Payment(
-        ride_id=data.ride_id,
-        recipient_id=data.driver_id,
-        amount=data.amount,
-        method=data.method,
-        status="paid"
-    )
-    db.add(payment)
-    db.commit()
-    db.refresh(payment)
-
-    return {
+    response = {
         "message": "Payment to driver successful.",
-        "payment_id": payment.id,
-        "status": payment.status
+        "payment_id": result["payment_id"],
+        "status": result["status"]
     }
+    return await commit_once(db, "pay_driver", idempotency_key, request_hash, response)
+
+MAX_BULK_ITEMS = 5000
 
-@router.get("/admin/complaints")
-def view_complaints(request: AdminApprovalRequest,db: Session = Depends(get_db)):
+
+class BulkApprovalRequest(BaseModel):
+    admin_email: str
+    driver_ids: List[int]
+
+@router.post("/admin/approve_drivers", response_model=BulkApprovalOut)
+async def approve_drivers(
+    request: BulkApprovalRequest,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    db: AsyncSession = Depends(get_db)
+):
+    if request.admin_email != ADMIN_EMAIL:
+        raise HTTPException(status_code=403, detail="Unauthorized: Only admin can approve drivers.")
+    if len(request.driver_ids) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} drivers per request.")
+
+    request_hash = fingerprint(request)
+    stored = await replay(db, "approve_drivers", idempotency_key, request_hash)
+    if stored is not None:
+        return stored
+
+    # One UPDATE for the whole batch; ids that aren't drivers simply don't come back
+    approved = set((await db.execute(
+        update(User)
+        .where(User.id.in_(request.driver_ids), User.is_driver == True)
+        .values(is_approved=True)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )).scalars().all())
+    response = {
+        "approved": len(approved),
+        "results": [
+            {"driver_id": driver_id, "status": "approved" if driver_id in approved else "not_found"}
+            for driver_id in request.driver_ids
+        ],
+    }
+    response = await commit_once(db, "approve_drivers", idempotency_key, request_hash, response)
+    for driver_id in approved:
+        invalidate_principal(driver_id)
+    return response
+
+
+class BulkPayout(BaseModel):
+    ride_id: int
+    driver_id: int
+    amount: float
+    method: str
+
+class BulkPaymentRequest(BaseModel):
+    admin_email: str
+    payouts: List[BulkPayout]
+
+@router.post("/admin/pay_drivers", response_model=BulkPayoutOut, response_model_exclude_none=True)
+async def pay_drivers(
+    request: BulkPaymentRequest,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Settle many rides in one transaction. Each payout is checked like
+    pay_driver; a ride that already has a paid payout to that driver, or
+    appears twice in the batch, is reported instead of paid again.
+    """
+    if request.admin_email != ADMIN_EMAIL:
+        raise HTTPException(status_code=403, detail="Unauthorized: Only admin can pay drivers.")
+    if len(request.payouts) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} payouts per request.")
+
+    request_hash = fingerprint(request)
+    stored = await replay(db, "pay_drivers", idempotency_key, request_hash)
+    if stored is not None:
+        return stored
+
+    results, total_amount = await pay_out(db, request.payouts)
+    response = {
+        "paid": sum(result["status"] == "paid" for result in results),
+        "total_amount": total_amount,
+        "results": results,
+    }
+    return await commit_once(db, "pay_drivers", idempotency_key, request_hash, response)
+
+
+@router.get("/admin/complaints", response_model=List[ComplaintOut])
+async def view_complaints(request: AdminApprovalRequest, response: Response, status: Optional[str] = Query(None),
+                          page: PageParams = Depends(), db: AsyncSession = Depends(get_read_db)):
     # Check if the admin email is correct
     if request.admin_email != ADMIN_EMAIL:
         raise HTTPException(status_code=403, detail="Unauthorized: Only admin can approve drivers.")
-    complaints = db.query(Complaint).all()
+    stmt = select(*columns_for(Complaint, ComplaintOut))
+    if status:
+        stmt = stmt.where(Complaint.status == status)
+    complaints = await fetch_page(db, stmt, [Complaint.id], page, response)
     return complaints
 
 
+def users_query(is_driver: Optional[bool]):
+    stmt = select(*columns_for(User, UserOut))
+    if is_driver is not None:
+        stmt = stmt.where(User.is_driver == is_driver)
+    return stmt
+
+
+def rides_query(status: Optional[str], driver_id: Optional[int], user_id: Optional[int],
+                date_from: Optional[datetime], date_to: Optional[datetime]):
+    stmt = select(*columns_for(Ride, RideOut))
+    if status:
+        stmt = stmt.where(Ride.status == status)
+    if driver_id is not None:
+        stmt = stmt.where(Ride.driver_id == driver_id)
+    if user_id is not None:
+        stmt = stmt.where(Ride.user_id == user_id)
+    if date_from:
+        stmt = stmt.where(Ride.timestamp >= date_from)
+    if date_to:
+        stmt = stmt.where(Ride.timestamp < date_to)
+    return stmt
+
+
+def payments_query(status: Optional[str], driver_id: Optional[int], ride_id: Optional[int],
+                   date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    stmt = select(*columns_for(Payment, PaymentOut))
+    if status:
+        stmt = stmt.where(Payment.status == status)
+    if driver_id is not None:
+        stmt = stmt.where(Payment.recipient_id == driver_id)
+    if ride_id is not None:
+        stmt = stmt.where(Payment.ride_id == ride_id)
+    if date_from:
+        stmt = stmt.where(Payment.paid_at >= date_from)
+    if date_to:
+        stmt = stmt.where(Payment.paid_at < date_to)
+    return stmt
+
+
 @router.get("/admin/all_users", response_model=List[UserOut])
-def get_all_users(admin_email: str = Query(...), db: Session = Depends(get_db)):
+async def get_all_users(response: Response, admin_email: str = Query(...), is_driver: Optional[bool] = Query(None),
+                        page: PageParams = Depends(), db: AsyncSession = Depends(get_read_db)):
     if admin_email != ADMIN_EMAIL:
         raise HTTPException(status_code=403, detail="Unauthorized")
-    return db.query(User).all()
+    return await fetch_page(db, users_query(is_driver), [User.id], page, response, descending=False)
 
 
 @router.get("/admin/all_rides", response_model=List[RideOut])
-def get_all_rides(admin_email: str = Query(...), db: Session = Depends(get_db)):
+async def get_all_rides(
+    response: Response,
+    admin_email: str = Query(...),
+    status: Optional[str] = Query(None),
+    driver_id: Optional[int] = Query(None),
+    user_id: Optional[int] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db)
+):
     if admin_email != ADMIN_EMAIL:
         raise HTTPException(status_code=403, detail="Unauthorized")
-    return db.query(Ride).all()
+    stmt = rides_query(status, driver_id, user_id, date_from, date_to)
+    return await fetch_page(db, stmt, [Ride.timestamp, Ride.id], page, response)
 
 
 @router.get("/admin/all_payments", response_model=List[PaymentOut])
-def get_all_payments(admin_email: str = Query(...), db: Session = Depends(get_db)):
+async def get_all_payments(
+    response: Response,
+    admin_email: str = Query(...),
+    status: Optional[str] = Query(None),
+    driver_id: Optional[int] = Query(None),
+    ride_id: Optional[int] = Query(None),
+    date_from: Optional[datetime] = Query(None, description="Filters on paid_at"),
+    date_to: Optional[datetime] = Query(None),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db)
+):
+    if admin_email != ADMIN_EMAIL:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    # The date range only narrows the rows; pages still follow Payment.id, so a
+    # cursor stays valid as long as the same filters are sent with it
+    stmt = payments_query(status, driver_id, ride_id, date_from, date_to)
+    return await fetch_page(db, stmt, [Payment.id], page, response)
+
+
+EXPORT_FORMAT = Query("ndjson", pattern=f"^({'|'.join(EXPORT_FORMATS)})$")
+
+
+@router.get("/admin/export/users")
+async def export_users(admin_email: str = Query(...), is_driver: Optional[bool] = Query(None),
+                       format: str = EXPORT_FORMAT):
+    if admin_email != ADMIN_EMAIL:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    return export_response(users_query(is_driver).order_by(User.id), format, "users")
+
+
+@router.get("/admin/export/rides")
+async def export_rides(
+    admin_email: str = Query(...),
+    status: Optional[str] = Query(None),
+    driver_id: Optional[int] = Query(None),
+    user_id: Optional[int] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    format: str = EXPORT_FORMAT
+):
+    """All matching rides, oldest first, streamed as NDJSON or CSV."""
+    if admin_email != ADMIN_EMAIL:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    stmt = rides_query(status, driver_id, user_id, date_from, date_to).order_by(Ride.timestamp, Ride.id)
+    return export_response(stmt, format, "rides")
+
+
+@router.get("/admin/export/payments")
+async def export_payments(
+    admin_email: str = Query(...),
+    status: Optional[str] = Query(None),
+    driver_id: Optional[int] = Query(None),
+    ride_id: Optional[int] = Query(None),
+    date_from: Optional[datetime] = Query(None, description="Filters on paid_at"),
+    date_to: Optional[datetime] = Query(None),
+    format: str = EXPORT_FORMAT
+):
+    if admin_email != ADMIN_EMAIL:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    stmt = payments_query(status, driver_id, ride_id, date_from, date_to).order_by(Payment.id)
+    return export_response(stmt, format, "payments")
+
+
+@router.get("/admin/ride_stats", response_model=List[RideStatsHourOut])
+async def get_ride_stats(
+    admin_email: str = Query(...),
+    date_from: Optional[datetime] = Query(None, description="Defaults to 24 hours before date_to"),
+    date_to: Optional[datetime] = Query(None, description="Defaults to now"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Hourly requests, accepts, completions, cancels, accept times and revenue from the precomputed rollups."""
+    if admin_email != ADMIN_EMAIL:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    date_to = date_to or datetime.utcnow()
+    date_from = date_from or date_to - timedelta(hours=24)
+    return await hourly_stats(db, date_from, date_to)
+
+
+@router.post("/admin/ride_stats/refresh", response_model=RideStatsRefreshOut)
+async def refresh_ride_stats(admin_email: str = Query(...), db: AsyncSession = Depends(get_db)):
+    """Fold pending ride events now instead of waiting for the background job."""
+    if admin_email != ADMIN_EMAIL:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    return {"events": await catch_up(db)}
+
+
+@router.get("/admin/pool_stats", response_model=PoolStatsOut)
+async def get_pool_stats(admin_email: str = Query(...)):
     if admin_email != ADMIN_EMAIL:
         raise HTTPException(status_code=403, detail="Unauthorized")
-    return db.query(Payment).all()
\ No newline at end of file
+    return pool_stats()
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.core.db import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.core.db import get_db
 from app.models.user import User
-from app.schemas.user import UserCreate, Token
-from app.core.auth import verify_password, hash_password, create_access_token
+from app.schemas.user import UserCreate, Token, RefreshRequest, MessageOut
+from app.core.auth import hash_password, verify_and_update, create_access_token, role_claims, password_workers
+from app.core.tokens import issue_refresh_token, rotate_refresh_token, revoke_refresh_token
+from dependencies.auth import Principal, principal_cache
 
 router = APIRouter(
     prefix="/auth", # THIS IS THE CRUCIAL CHANGE
@@ -13,22 +17,15 @@ router = APIRouter(
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # 🟢 Register a new user (only phone number and password)
 @router.post("/register", response_model=Token)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.phone == user.phone or User.email==user.email).first()
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    existing_user = await db.scalar(select(User).where(User.phone == user.phone or User.email==user.email))
     if existing_user:
         raise HTTPException(status_code=400, detail="Phone number already registered")
 
-    hashed_password = hash_password(user.password)
+    # bcrypt is CPU-bound; keep it off the event loop and the shared threadpool
+    hashed_password = await password_workers.run(hash_password, user.password)
 
     new_user = User(
         phone=user.phone,
@@ -39,37 +36,84 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         email=user.email
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.flush()
+    refresh_token = issue_refresh_token(db, new_user.id)
+    await db.commit()
 
-    access_token = create_access_token(data={"sub": str(new_user.id)})
-    return {"access_token": access_token, "token_type": "bearer"}
+    access_token = create_access_token(data={"sub": str(new_user.id), **role_claims(new_user)})
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
 
 
 
 # 🔐 Login using OAuth2PasswordRequestForm (using phone number and password)
 @router.post("/token", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     # Look up user by phone number
-    user = db.query(User).filter(User.phone == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await db.scalar(select(User).where(User.phone == form_data.username))
+    # Hand the connection back while bcrypt runs; user stays loaded (expire_on_commit=False)
+    await db.commit()
+    valid, new_hash = (await password_workers.run(verify_and_update, form_data.password, user.hashed_password)
+                       if user else (False, None))
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect phone number or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # BCRYPT_ROUNDS changed since this hash was stored; upgrade it now that we know the password
+    if new_hash:
+        user.hashed_password = new_hash
+    refresh_token = issue_refresh_token(db, user.id)
+    await db.commit()
+
     # Generate JWT token
-    access_token = create_access_token(data={"sub": str(user.id)})
-    return {"access_token": access_token, "token_type": "bearer"}
+    access_token = create_access_token(data={"sub": str(user.id), **role_claims(user)})
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+# 🔄 Swap a refresh token for a new access token and a new refresh token (no password check)
+@router.post("/refresh", response_model=Token)
+async def refresh(data: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    rotated = await rotate_refresh_token(db, data.refresh_token)
+    if rotated is None:
+        # Commit anyway: a replayed token has just revoked its family
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user_id, refresh_token = rotated
+
+    claims = {}
+    if settings.AUTH_ROLE_CLAIMS:
+        principal = principal_cache.get(user_id)
+        if principal is None:
+            user = await db.get(User, user_id)
+            if user is None:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired refresh token")
+            principal = Principal.from_user(user)
+            principal_cache.set(user_id, principal)
+        claims = role_claims(principal)
+    await db.commit()
+
+    access_token = create_access_token(data={"sub": str(user_id), **claims})
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/logout", response_model=MessageOut)
+async def logout(data: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    await revoke_refresh_token(db, data.refresh_token)
+    await db.commit()
+    return {"message": "Logged out."}
 
 
 # 🔍 Helper for dependency injection to get the current user
 from jose import JWTError, jwt
-from app.config import settings
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate token",
@@ -83,7 +127,7 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = await db.scalar(select(User).where(User.id == int(user_id)))
     if user is None:
         raise credentials_exception
     return user
@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import Column, Integer, ForeignKey, String, Text
-from sqlalchemy.orm import Session
+from sqlalchemy import Column, Integer, ForeignKey, String, Text, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from datetime import datetime
-from app.core.db import SessionLocal, Base
+from app.core.db import get_db, Base
 from app.models.complaint import Complaint
 from app.models.ride import Ride
 from app.models.user import User
 from app.models.payment import Payment
 from app.routers.ride import is_customer
+from app.schemas.user import ComplaintCreatedOut
 from dependencies.auth import get_current_user
 
 
@@ -19,15 +20,8 @@ class ComplaintCreate(BaseModel):
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-@router.post("/complaints")
-def submit_complaint(data: ComplaintCreate, db: Session = Depends(get_db),current_user: User = Depends(get_current_user)):
+@router.post("/complaints", response_model=ComplaintCreatedOut)
+async def submit_complaint(data: ComplaintCreate, db: AsyncSession = Depends(get_db),current_user: User = Depends(get_current_user)):
     if not is_customer(current_user):
         raise HTTPException(status_code=403, detail="This collects only customers complaints, Drivers can complain to 'saimeghana.cd22@bmsce.ac.in'.")
     complaint = Complaint(
@@ -35,12 +29,12 @@ def submit_complaint(data: ComplaintCreate, db: Session = Depends(get_db),curren
         ride_id=data.ride_id,
         description=data.description
     )
-    ride = db.query(Ride).filter(Ride.id == data.ride_id).first()
+    ride = await db.scalar(select(Ride).where(Ride.id == data.ride_id))
     if not ride:
         raise HTTPException(status_code=403, detail="Ride not found to complain.")
     db.add(complaint)
-    db.commit()
-    db.refresh(complaint)
+    await db.commit()
+    await db.refresh(complaint)
     return {"message": "Complaint submitted successfully.", "complaint_id": complaint.id}
 
 
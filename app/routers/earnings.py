@@ -1,34 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from datetime import datetime
-from app.core.db import SessionLocal
+from app.core.earnings import PERIODS
+from app.core.pagination import PageParams, columns_for, fetch_page
+from app.core.replicas import get_read_db
+from app.models.earnings import DriverEarnings, DriverEarningsRollup
 from app.models.ride import Ride
 from app.models.user import User
 from app.models.payment import Payment
+from app.schemas.user import EarningsOut, EarningsRollupOut, PaymentOut
 from dependencies.auth import get_current_user
 
 router = APIRouter()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-@router.get("/driver/{driver_id}/earnings")
-def get_driver_earnings(driver_id: int, db: Session = Depends(get_db),current_user: User = Depends(get_current_user)):
+def check_driver_access(current_user, driver_id: int):
     if not current_user.is_driver :
         raise HTTPException(status_code=403, detail="Unauthorized access to driver rides.")
     if current_user.is_driver and current_user.id != driver_id:
         raise HTTPException(status_code=403, detail="Drivers can only access their own rides.")
-    earnings = db.query(Payment).filter(Payment.recipient_id == driver_id, Payment.status == "paid").all()
-    total_earnings = sum(payment.amount for payment in earnings)
+
+
+@router.get("/driver/{driver_id}/earnings", response_model=EarningsOut)
+async def get_driver_earnings(driver_id: int, response: Response, page: PageParams = Depends(),
+                              db: AsyncSession = Depends(get_read_db),current_user: User = Depends(get_current_user)):
+    check_driver_access(current_user, driver_id)
+    # Totals come from the ledger row; payments is one page of history (see X-Next-Cursor)
+    summary = await db.get(DriverEarnings, driver_id)
+    stmt = select(*columns_for(Payment, PaymentOut)).where(Payment.recipient_id == driver_id, Payment.status == "paid")
+    payments = await fetch_page(db, stmt, [Payment.id], page, response)
     return {
         "driver_id": driver_id,
-        "total_earnings": total_earnings,
-        "payments": earnings
+        "total_earnings": summary.total_amount if summary else 0,
+        "payment_count": summary.payment_count if summary else 0,
+        "last_paid_at": summary.last_paid_at if summary else None,
+        "payments": payments
     }
+
+
+@router.get("/driver/{driver_id}/earnings/summary", response_model=List[EarningsRollupOut])
+async def get_driver_earnings_summary(
+    driver_id: int,
+    period: str = Query("day", pattern=f"^({'|'.join(PERIODS)})$"),
+    limit: int = Query(30, ge=1, le=366),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Most recent day/week/month buckets first; periods without payouts are omitted."""
+    check_driver_access(current_user, driver_id)
+    stmt = (
+        select(*columns_for(DriverEarningsRollup, EarningsRollupOut))
+        .where(DriverEarningsRollup.driver_id == driver_id, DriverEarningsRollup.period == period)
+        .order_by(DriverEarningsRollup.period_start.desc())
+        .limit(limit)
+    )
+    return (await db.execute(stmt)).mappings().all()
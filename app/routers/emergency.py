@@ -1,43 +1,42 @@
 # routers/emergency.py
+from typing import List
+
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from app.models.emergency import EmergencyContact
 from app.models.user import User
-from app.core.db import SessionLocal
+from app.core.db import get_db
+from app.core.pagination import columns_for
+from app.core.replicas import get_read_db
+from app.schemas.user import EmergencyContactOut, MessageOut
 from dependencies.auth import get_current_user
 
 router = APIRouter()
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 class ContactCreate(BaseModel):
     name: str
     phone: str
 
 
-@router.post("/add_emergency_contact")
-def add_contact(
+@router.post("/add_emergency_contact", response_model=MessageOut)
+async def add_contact(
     data: ContactCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     contact = EmergencyContact(user_id=current_user.id, **data.dict())
     db.add(contact)
-    db.commit()
+    await db.commit()
     return {"message": "Emergency contact added."}
 
 
 
-@router.get("/emergency_contacts")
-def get_contacts(
-    db: Session = Depends(get_db),
+@router.get("/emergency_contacts", response_model=List[EmergencyContactOut])
+async def get_contacts(
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    contacts = db.query(EmergencyContact).filter(EmergencyContact.user_id == current_user.id).all()
-    return contacts
+    stmt = select(*columns_for(EmergencyContact, EmergencyContactOut)).where(EmergencyContact.user_id == current_user.id)
+    return (await db.execute(stmt)).all()
 
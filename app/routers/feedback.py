@@ -1,31 +1,28 @@
 # routers/feedback.py
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field
+from app.core.dispatch import dispatcher
+from app.core.ratings import record_rating
 from app.models.feedback import Feedback
 from app.models.ride import Ride
-from app.core.db import SessionLocal
+from app.core.db import dialect_insert, get_db
 from app.models.user import User  # Assuming your User model is here
+from app.schemas.user import MessageOut
 from dependencies.auth import get_current_user  # Update with actual path
 
 router = APIRouter()
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 class FeedbackCreate(BaseModel):
     ride_id: int
-    rating: int
+    rating: int = Field(..., ge=1, le=5)
     comment: str
 
 
-@router.post("/submit_feedback")
-def submit_feedback(
+@router.post("/submit_feedback", response_model=MessageOut)
+async def submit_feedback(
     data: FeedbackCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # ✅ Authorization check: only drivers can submit feedback
@@ -33,17 +30,33 @@ def submit_feedback(
         raise HTTPException(status_code=403, detail="Only users can submit feedback.")
 
     # ✅ Ride must exist
-    ride = db.query(Ride).filter(Ride.id == data.ride_id).first()
+    ride = await db.scalar(select(Ride).where(Ride.id == data.ride_id))
     if not ride:
         raise HTTPException(status_code=404, detail="Ride not found.")
 
+    # ✅ Only the rider who took the ride can rate it
+    if ride.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="You can only submit feedback for your own rides.")
+
     # ✅ Ride must be completed
     if ride.status != "completed":
         raise HTTPException(status_code=400, detail="Feedback can only be submitted for completed rides.")
 
-    # ✅ Submit feedback
-    feedback = Feedback(**data.dict())
-    db.add(feedback)
-    db.commit()
+    # ✅ Submit feedback once per ride: the unique index on feedback.ride_id
+    # turns a second submission (or a concurrent one) into no row; the
+    # driver's rating aggregates change in the same transaction
+    feedback_id = await db.scalar(
+        dialect_insert(db)(Feedback)
+        .values(**data.dict())
+        .on_conflict_do_nothing(index_elements=[Feedback.ride_id])
+        .returning(Feedback.id)
+    )
+    if feedback_id is None:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Feedback already submitted for this ride.")
+    score = await record_rating(db, ride.driver_id, data.rating) if ride.driver_id is not None else None
+    await db.commit()
+    if score is not None:
+        dispatcher.update_rating(ride.driver_id, score)
 
     return {"message": "Feedback submitted successfully."}
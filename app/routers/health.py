@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Response
+
+from app.core.warmup import warmup
+from app.schemas.user import HealthOut
+
+router = APIRouter()
+
+
+@router.get("/health/live", response_model=HealthOut)
+async def live():
+    """The process is up and serving; restart it only if this stops answering."""
+    return {"status": "ok"}
+
+
+@router.get("/health/ready", response_model=HealthOut)
+async def ready(response: Response):
+    """503 until startup warmup is done (and again while shutting down); route traffic here only on 200."""
+    if not warmup.ready:
+        response.status_code = 503
+        return {"status": "warming up"}
+    return {"status": "ready", "warmup_seconds": warmup.seconds}
@@ -0,0 +1,13 @@
+# app/routers/metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint; keep it off the public ingress."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,79 +1,54 @@
-from datetime import datetime
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.dependencies import models
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
-from app.models.payment import Payment
-from app.models.ride import Ride
 from app.models.user import User
-from app.core.db import SessionLocal
+from app.core.db import get_db
+from app.core.idempotency import IDEMPOTENCY_HEADER, commit_once, fingerprint, replay
+from app.core.settlement import charge_error, settle_charge
+from app.schemas.user import PaymentReceiptOut
 from pydantic import BaseModel
 from dependencies.auth import get_current_user
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 class PaymentCreate(BaseModel):
     ride_id: int
     method: str  # e.g., cash, UPI, card
 
-@router.post("/make_payment")
-def make_payment(
+@router.post("/make_payment", response_model=PaymentReceiptOut)
+async def make_payment(
     data: PaymentCreate,
-    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # 1. Check if ride exists and is completed
-    ride = db.query(Ride).filter(Ride.id == data.ride_id).first()
-    if not ride or ride.status != "completed":
-        raise HTTPException(status_code=400, detail="Payment can only be made after ride completion.")
-
-    # 2. Authorization check
-    if ride.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="You are not authorized to make payment for this ride.")
-
-    # 3. Look for existing pending payment
-    existing_payment = db.query(Payment).filter(
-        Payment.ride_id == data.ride_id
-    ).first()
-
-    if not existing_payment:
-        raise HTTPException(status_code=400, detail="No pending payment found for this ride.")
-
-    if existing_payment.status == "paid":
-        raise HTTPException(status_code=400, detail="Payment has already been completed for this ride.")
-
-    if not ride.fare:  # Ensure fare is set before payment
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                            detail="Ride fare not set. Cannot process payment.")
-
-    new_payment = models.Payment(
-        ride_id=data.ride_id,
-        user_id=current_user.id,
-        amount_paid=ride.fare,
-        payment_method=data.method,
-        payment_date=datetime.utcnow(),
-        status="paid"  # Or "pending" if you have a multi-step process
-    )
-    db.add(new_payment)
-
-    # Update ride payment status
-    ride.payment_status = "paid"
-    db.add(ride)  # Add the updated ride to session
-    db.commit()
-    db.refresh(new_payment)
-    db.refresh(ride)  # Refresh ride to reflect updated status
-
-    return new_payment
-
-
-
-
+    """
+    Pay for a completed ride: flips the ride's pending charge to paid. Send
+    an Idempotency-Key header so a retry gets the original response back
+    instead of a 409.
+    """
+    scope = f"make_payment:{current_user.id}"
+    request_hash = fingerprint(data)
+
+    # Happy path is this one UPDATE; the key is only looked up when it fails
+    payment = await settle_charge(db, data.ride_id, current_user.id, data.method)
+    if payment is None:
+        stored = await replay(db, scope, idempotency_key, request_hash)
+        if stored is not None:
+            return stored
+        raise await charge_error(db, data.ride_id, current_user.id)
+
+    response = jsonable_encoder({
+        "message": "Payment successful.",
+        "payment_id": payment.id,
+        "ride_id": payment.ride_id,
+        "amount": payment.amount,
+        "method": payment.method,
+        "status": payment.status,
+        "paid_at": payment.paid_at,
+    })
+    return await commit_once(db, scope, idempotency_key, request_hash, response)
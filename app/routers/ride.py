@@ -1,23 +1,38 @@
 # app/routers/ride.py
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from datetime import datetime
-from app.core.db import SessionLocal
-from app.models.ride import Ride
+from app.config import settings
+from app.core.cache import LoadingCache
+from app.core.db import get_db, new_session
+from app.core.dispatch import dispatcher
+from app.core.events import broker, driver_channel, ride_channel
+from app.core.fare import fare_engine
+from app.core.pagination import PageParams, columns_for, fetch_page
+from app.core.ratings import rating_score
+from app.core.replicas import get_read_db
+from app.core.ride_state import ACTIVE_STATUSES, STATE_COLUMNS, STATUS_RANK, advance_ride, ride_states
+from app.core.ride_stats import record_ride_event
+from app.core.settlement import open_charge
+from app.core.matching import matching_engine, DEFAULT_RADIUS_KM, DEFAULT_LIMIT, MAX_LIMIT
+from app.models.ride import Ride, OPEN_REQUEST
 from app.models.user import User
-from app.models.payment import Payment
-from dependencies.auth import get_current_user
+from app.models.rating import DriverRating
+from app.schemas.user import (
+    FareQuoteOut, MessageOut, RideCompleteOut, RideNotifyOut, RideOut, RideRequestOut, RideStatusOut
+)
+from dependencies.auth import get_current_user, resolve_principal
+from dependencies.ratelimit import RateLimit
 
 router = APIRouter() # This is correct, no prefix here
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 def is_admin(user: User) -> bool:
     return user.email == "saimeghana.cd22@bmsce.ac.in"
 
@@ -27,20 +42,54 @@ def is_driver(user: User) -> bool:
 def is_customer(user: User) -> bool:
     return not user.is_driver
 
+def can_view_ride(user: User, ride: Ride) -> bool:
+    return is_admin(user) or user.id in [ride.user_id, ride.driver_id]
+
+TERMINAL_STATUSES = ("completed", "cancelled")
+STREAM_HEARTBEAT_SECONDS = 15
+
+def ride_event(ride: Ride) -> dict:
+    return {"ride_id": ride.id, "status": ride.status, "driver_id": ride.driver_id, "fare": ride.fare}
+
+async def publish_ride_status(ride: Ride):
+    # Every transition ends here once committed
+    ride_states.apply(ride)
+    ride_status_cache.invalidate(ride.id)
+    await broker.publish(ride_channel(ride.id), ride_event(ride))
+
+async def load_ride_status(ride_id: int):
+    # Own session: the load is shared by every request waiting on this ride
+    # and may outlive the request that started it, so callers release their
+    # request session first (cached_ride_status). From the primary, not a
+    # replica: a transition invalidates the entry and the next load must see
+    # it, or a lagging replica's status would be cached for the whole TTL.
+    async with new_session() as db:
+        return (await db.execute(select(*columns_for(Ride, RideStatusOut)).where(Ride.id == ride_id))).first()
+
+# Mobile clients poll these; concurrent polls of one ride share a single query
+ride_status_cache = LoadingCache(load_ride_status, settings.RIDE_STATUS_CACHE_SIZE,
+                                 settings.RIDE_STATUS_CACHE_TTL_SECONDS)
+async def cached_ride_status(db: AsyncSession, ride_id: int):
+    # The request session may hold a pool slot since authentication; give it
+    # back before waiting on the shared load, which needs a slot of its own
+    await db.close()
+    return await ride_status_cache.get(ride_id)
+
+status_rate_limit = RateLimit("ride_status", settings.RATE_LIMIT_STATUS_PER_SECOND, settings.RATE_LIMIT_STATUS_BURST)
+
 def calculate_fare(pickup: str, drop: str) -> float:
-    base_fare = 50
-    per_km_rate = 10
-    estimated_distance_km = 5
-    return base_fare + per_km_rate * estimated_distance_km
+    return fare_engine.quote(pickup, drop)
 
 class RideRequest(BaseModel):
     pickup_location: str
     drop_location: str
+    pickup_lat: Optional[float] = None
+    pickup_lng: Optional[float] = None
 
-@router.post("/request_ride")
-def request_ride(
+@router.post("/request_ride", response_model=RideRequestOut)
+async def request_ride(
     data: RideRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if not is_customer(current_user):
@@ -49,18 +98,29 @@ def request_ride(
         raise HTTPException(status_code=400, detail="pickup and dropoff cant be same")
 
     fare = calculate_fare(data.pickup_location, data.drop_location)
+    pickup_lat, pickup_lng = data.pickup_lat, data.pickup_lng
+    if pickup_lat is None or pickup_lng is None:
+        pickup_lat, pickup_lng = fare_engine.geocode(data.pickup_location) or (None, None)
     ride = Ride(
         user_id=current_user.id,
         driver_id=None,
         pickup_location=data.pickup_location,
         drop_location=data.drop_location,
+        pickup_lat=pickup_lat,
+        pickup_lng=pickup_lng,
         status="requested",
         fare=fare,
         timestamp=datetime.utcnow()
     )
     db.add(ride)
-    db.commit()
-    db.refresh(ride)
+    await db.flush()
+    record_ride_event(db, ride.id, "requested", fare=ride.fare)
+    await db.commit()
+    await db.refresh(ride)
+    matching_engine.add_ride(ride)
+    if settings.DISPATCH_ENABLED and ride.pickup_lat is not None and ride.pickup_lng is not None:
+        dispatcher.add_ride(ride.id, ride.pickup_lat, ride.pickup_lng)
+    await publish_ride_status(ride)
 
     return {
         "ride_id": ride.id,
@@ -68,127 +128,190 @@ def request_ride(
         "estimated_fare": fare
     }
 
+class FareQuoteRequest(BaseModel):
+    pickup_location: str
+    drop_location: str
+
+class FareQuoteBatch(BaseModel):
+    quotes: List[FareQuoteRequest]
+
+@router.post("/fare_quotes", response_model=List[FareQuoteOut])
+async def get_fare_quotes(data: FareQuoteBatch, current_user: User = Depends(get_current_user)):
+    if len(data.quotes) > 1000:
+        raise HTTPException(status_code=400, detail="At most 1000 quotes per request.")
+    fares = fare_engine.quote_many([(q.pickup_location, q.drop_location) for q in data.quotes])
+    return [
+        {"pickup_location": q.pickup_location, "drop_location": q.drop_location, "estimated_fare": fare}
+        for q, fare in zip(data.quotes, fares)
+    ]
+
 class RideAccept(BaseModel):
     ride_id: int
 
-@router.post("/accept_ride")
-def accept_ride(
+async def load_ride(db: AsyncSession, ride_id: int):
+    # The store couldn't settle it: read the ride for the exact error, refreshing its entry
+    ride = (await db.execute(select(*STATE_COLUMNS).where(Ride.id == ride_id))).first()
+    if ride is not None:
+        ride_states.apply(ride)
+    return ride
+
+DRIVER_BUSY = "Driver already has an active ride."
+
+async def assign_driver(db: AsyncSession, ride_id: int, driver_id: int):
+    known = ride_states.get(ride_id)
+    if known is not None and known.status != "requested":
+        raise HTTPException(status_code=400, detail="Ride not available for acceptance.")
+    # The driver's ride may have ended on another worker; check before a write that would fail
+    active = ride_states.active_ride(driver_id)
+    if active is not None and active != ride_id:
+        ride = await load_ride(db, active)
+        if ride is not None and ride.driver_id == driver_id and ride.status in ("accepted", "ongoing"):
+            raise HTTPException(status_code=400, detail=DRIVER_BUSY)
+
+    # One conditional UPDATE: only the first driver to flip the ride out of
+    # "requested" gets a row back. The partial unique index
+    # ux_rides_driver_active rejects a second active ride for the same driver.
+    try:
+        ride = await advance_ride(db, ride_id, ("requested",), driver_id=driver_id, status="accepted")
+        if ride is None:
+            await db.rollback()
+            ride_states.forget(ride_id)
+            raise HTTPException(status_code=400, detail="Ride not available for acceptance.")
+        record_ride_event(db, ride.id, "accepted", driver_id=driver_id)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=DRIVER_BUSY)
+    matching_engine.remove_ride(ride.id)
+    dispatcher.accept(ride.id, driver_id)
+    await publish_ride_status(ride)
+    return ride
+
+@router.post("/accept_ride", response_model=MessageOut)
+async def accept_ride(
     data: RideAccept,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if not is_driver(current_user) or not current_user.is_approved:
         raise HTTPException(status_code=403, detail="Only approved drivers can accept rides.")
 
-    active_ride = db.query(Ride).filter(
-        Ride.driver_id == current_user.id,
-        Ride.status.in_(["accepted", "ongoing"])
-    ).first()
-    if active_ride:
-        raise HTTPException(status_code=400, detail="Driver already has an active ride.")
-
-    ride = db.query(Ride).filter(Ride.id == data.ride_id).first()
-    if not ride or ride.status != "requested":
-        raise HTTPException(status_code=400, detail="Ride not available for acceptance.")
-
-    ride.driver_id = current_user.id
-    ride.status = "accepted"
-    db.commit()
-
+    await assign_driver(db, data.ride_id, current_user.id)
     return {"message": "Ride accepted by driver."}
 
-@router.post("/start_ride")
-def start_ride(
+def refuse_driver_step(ride, driver_id: int, needed: str, detail: str, lagging: bool = False):
+    # For a store entry (lagging=True) only refuse what a lagging entry can't
+    # get wrong: another driver already assigned, or a status already past needed
+    if ride is None or (ride.driver_id != driver_id and not (lagging and ride.driver_id is None)):
+        raise HTTPException(status_code=403, detail="Unauthorized or ride not found.")
+    if ride.status != needed and not (lagging and STATUS_RANK[ride.status] < STATUS_RANK[needed]):
+        raise HTTPException(status_code=400, detail=detail)
+
+async def advance_driver_step(db: AsyncSession, ride_id: int, driver_id: int, needed: str, new_status: str,
+                              detail: str):
+    known = ride_states.get(ride_id)
+    if known is not None:
+        refuse_driver_step(known, driver_id, needed, detail, lagging=True)
+    ride = await advance_ride(db, ride_id, (needed,), Ride.driver_id == driver_id, status=new_status)
+    if ride is None:
+        refuse_driver_step(await load_ride(db, ride_id), driver_id, needed, detail)
+        # Valid on a fresh read: the UPDATE raced another transition, so try it once more
+        ride = await advance_ride(db, ride_id, (needed,), Ride.driver_id == driver_id, status=new_status)
+        if ride is None:
+            raise HTTPException(status_code=409, detail="Ride changed, try again.")
+    return ride
+
+@router.post("/start_ride", response_model=MessageOut)
+async def start_ride(
     ride_id: int = Query(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    ride = db.query(Ride).filter(Ride.id == ride_id).first()
-    if not ride or ride.driver_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Unauthorized or ride not found.")
-    if ride.status != "accepted":
-        raise HTTPException(status_code=400, detail="Ride must be accepted first.")
-
-    ride.status = "ongoing"
-    db.commit()
+    ride = await advance_driver_step(db, ride_id, current_user.id, "accepted", "ongoing",
+                                     "Ride must be accepted first.")
+    record_ride_event(db, ride.id, "ongoing", driver_id=ride.driver_id)
+    await db.commit()
+    await publish_ride_status(ride)
     return {"message": "Ride status set to ongoing."}
 
 class RideComplete(BaseModel):
     ride_id: int
 
-@router.post("/complete_ride")
-def complete_ride(
+@router.post("/complete_ride", response_model=RideCompleteOut)
+async def complete_ride(
     data: RideComplete,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    ride = db.query(Ride).filter(Ride.id == data.ride_id).first()
-    if not ride or ride.driver_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Unauthorized or ride not found.")
-    if ride.status != "ongoing":
-        raise HTTPException(status_code=400, detail="Only ongoing rides can be completed.")
-
-    ride.status = "completed"
-    payment = Payment(
-        ride_id=ride.id,
-        amount=ride.fare,
-        method="cash",
-        status="pending"
-    )
-    db.add(payment)
-    db.commit()
+    ride = await advance_driver_step(db, data.ride_id, current_user.id, "ongoing", "completed",
+                                     "Only ongoing rides can be completed.")
+    open_charge(db, ride.id, ride.fare)
+    record_ride_event(db, ride.id, "completed", driver_id=ride.driver_id, fare=ride.fare)
+    await db.commit()
+    await publish_ride_status(ride)
 
     return {
         "message": "Ride marked as completed. Payment pending.",
         "fare": ride.fare
     }
 
-@router.get("/ride_status") # <-- CHANGE THIS
-def get_ride_status(
+@router.get("/ride_status", response_model=RideStatusOut, dependencies=[Depends(status_rate_limit)]) # <-- CHANGE THIS
+async def get_ride_status(
     ride_id: int = Query(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    ride = db.query(Ride).filter(Ride.id == ride_id).first()
+    ride = await cached_ride_status(db, ride_id)
     if not ride:
         raise HTTPException(status_code=404, detail="Ride not found.")
-    if not is_admin(current_user) and current_user.id not in [ride.user_id, ride.driver_id]:
+    if not can_view_ride(current_user, ride):
         raise HTTPException(status_code=403, detail="Not authorized.")
 
     return ride
 
-@router.post("/cancel_ride") # <-- CHANGE THIS
-def cancel_ride(
-    ride_id: int,
-    cancelled_by: str = Query(..., regex="^(user|driver)$"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    ride = db.query(Ride).filter(Ride.id == ride_id).first()
+def refuse_cancel(ride, user_id: int, cancelled_by: str, lagging: bool = False):
     if not ride:
         raise HTTPException(status_code=404, detail="Ride not found.")
-
-    if cancelled_by == "user" and current_user.id != ride.user_id:
-        raise HTTPException(status_code=403, detail="Unauthorized.")
-    if cancelled_by == "driver" and current_user.id != ride.driver_id:
+    owner = ride.user_id if cancelled_by == "user" else ride.driver_id
+    if owner != user_id and not (lagging and owner is None):
         raise HTTPException(status_code=403, detail="Unauthorized.")
-
-    if ride.status in ["completed", "cancelled"]:
+    if ride.status in TERMINAL_STATUSES:
         raise HTTPException(status_code=400, detail="Ride cannot be cancelled.")
 
-    ride.status = "cancelled"
-    db.commit()
+@router.post("/cancel_ride", response_model=MessageOut) # <-- CHANGE THIS
+async def cancel_ride(
+    ride_id: int,
+    cancelled_by: str = Query(..., regex="^(user|driver)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    known = ride_states.get(ride_id)
+    if known is not None:
+        refuse_cancel(known, current_user.id, cancelled_by, lagging=True)
+    owner = Ride.user_id if cancelled_by == "user" else Ride.driver_id
+    ride = await advance_ride(db, ride_id, ACTIVE_STATUSES, owner == current_user.id, status="cancelled")
+    if ride is None:
+        refuse_cancel(await load_ride(db, ride_id), current_user.id, cancelled_by)
+        ride = await advance_ride(db, ride_id, ACTIVE_STATUSES, owner == current_user.id, status="cancelled")
+        if ride is None:
+            raise HTTPException(status_code=409, detail="Ride changed, try again.")
+
+    record_ride_event(db, ride.id, "cancelled", driver_id=ride.driver_id)
+    await db.commit()
+    matching_engine.remove_ride(ride.id)
+    dispatcher.remove_ride(ride.id)
+    await publish_ride_status(ride)
 
     return {"message": f"Ride cancelled by {cancelled_by}."}
 
-@router.get("/notify_status_change") # <-- CHANGE THIS
-def notify_status_change(
+@router.get("/notify_status_change", response_model=RideNotifyOut, dependencies=[Depends(status_rate_limit)]) # <-- CHANGE THIS
+async def notify_status_change(
     ride_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    ride = db.query(Ride).filter(Ride.id == ride_id).first()
-    if not ride or current_user.id not in [ride.user_id, ride.driver_id] and not is_admin(current_user):
+    ride = await cached_ride_status(db, ride_id)
+    if not ride or not can_view_ride(current_user, ride):
         raise HTTPException(status_code=403, detail="Unauthorized or ride not found.")
 
     return {
@@ -198,8 +321,105 @@ def notify_status_change(
     }
 
 
-@router.get("/user/{user_id}/rides") # <-- CHANGE THIS
-def get_user_rides(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.get("/{ride_id}/events")
+async def stream_ride_status(
+    ride_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Server-Sent Events stream of status changes for one ride, starting with
+    the current status and ending once the ride is completed or cancelled.
+    """
+    # Subscribe before reading so no transition slips in between
+    subscription = broker.subscribe(ride_channel(ride_id))
+    ride = await db.scalar(select(Ride).where(Ride.id == ride_id))
+    if not ride or not can_view_ride(current_user, ride):
+        subscription.close()
+        raise HTTPException(status_code=403, detail="Unauthorized or ride not found.")
+    snapshot = ride_event(ride)
+    # The stream can stay open for the whole ride; don't hold a connection for it
+    await db.close()
+
+    async def event_stream():
+        with subscription:
+            message = snapshot
+            while True:
+                if message is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: status\ndata: {json.dumps(message)}\n\n"
+                    if message["status"] in TERMINAL_STATUSES:
+                        return
+                message = await subscription.get(timeout=STREAM_HEARTBEAT_SECONDS)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.websocket("/ws/{ride_id}")
+async def ride_status_socket(
+    websocket: WebSocket,
+    ride_id: int,
+    token: str = Query(...),
+    db: AsyncSession = Depends(get_db)
+):
+    # Browsers can't set headers on WebSockets, so the token comes in the query string
+    try:
+        current_user = await resolve_principal(token, db)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    subscription = broker.subscribe(ride_channel(ride_id))
+    ride = await db.scalar(select(Ride).where(Ride.id == ride_id))
+    if not ride or not can_view_ride(current_user, ride):
+        subscription.close()
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    snapshot = ride_event(ride)
+    await db.close()
+
+    await websocket.accept()
+    with subscription:
+        message = snapshot
+        try:
+            while True:
+                if message is None:
+                    await websocket.send_json({"event": "heartbeat"})
+                else:
+                    await websocket.send_json(message)
+                    if message["status"] in TERMINAL_STATUSES:
+                        break
+                message = await subscription.get(timeout=STREAM_HEARTBEAT_SECONDS)
+        except WebSocketDisconnect:
+            return
+    await websocket.close()
+
+
+def ride_filters(stmt, status: Optional[str], date_from: Optional[datetime], date_to: Optional[datetime]):
+    if status:
+        stmt = stmt.where(Ride.status == status)
+    if date_from:
+        stmt = stmt.where(Ride.timestamp >= date_from)
+    if date_to:
+        stmt = stmt.where(Ride.timestamp < date_to)
+    return stmt
+
+# Newest first, keyset on (timestamp, id)
+RIDE_PAGE_KEYS = [Ride.timestamp, Ride.id]
+
+
+@router.get("/user/{user_id}/rides", response_model=List[RideOut]) # <-- CHANGE THIS
+async def get_user_rides(
+    user_id: int,
+    response: Response,
+    status: Optional[str] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
     # Allow access if current user is not a driver and is requesting their own rides or if admin
     if current_user.is_driver:
         raise HTTPException(status_code=403, detail="Drivers cannot access user rides.")
@@ -207,12 +427,21 @@ def get_user_rides(user_id: int, db: Session = Depends(get_db), current_user: Us
     if current_user.id != user_id and not is_admin(current_user):
         raise HTTPException(status_code=403, detail="Unauthorized access to user rides.")
 
-    rides = db.query(Ride).filter(Ride.user_id == user_id).all()
-    return rides
+    stmt = ride_filters(select(*columns_for(Ride, RideOut)).where(Ride.user_id == user_id), status, date_from, date_to)
+    return await fetch_page(db, stmt, RIDE_PAGE_KEYS, page, response)
 
 
-@router.get("/driver/{driver_id}/rides") # <-- CHANGE THIS
-def get_driver_rides(driver_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.get("/driver/{driver_id}/rides", response_model=List[RideOut]) # <-- CHANGE THIS
+async def get_driver_rides(
+    driver_id: int,
+    response: Response,
+    status: Optional[str] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
     # Allow access if current user is the driver or if admin
     if not current_user.is_driver and not is_admin(current_user):
         raise HTTPException(status_code=403, detail="Unauthorized access to driver rides.")
@@ -222,18 +451,135 @@ def get_driver_rides(driver_id: int, db: Session = Depends(get_db), current_user
     if current_user.is_driver and current_user.id != driver_id:
         raise HTTPException(status_code=403, detail="Drivers can only access their own rides.")
 
-    rides = db.query(Ride).filter(Ride.driver_id == driver_id).all()
-    return rides
+    stmt = ride_filters(select(*columns_for(Ride, RideOut)).where(Ride.driver_id == driver_id), status, date_from, date_to)
+    return await fetch_page(db, stmt, RIDE_PAGE_KEYS, page, response)
+
 
+class DriverLocation(BaseModel):
+    lat: float
+    lng: float
 
-@router.get("/driver/requested", status_code=200) # <-- THIS IS THE KEY CHANGE FOR /rides/requested
-def get_all_requested_rides(
-        db: Session = Depends(get_db),
+@router.post("/driver/location", response_model=MessageOut)
+async def update_driver_location(
+    data: DriverLocation,
+    current_user: User = Depends(get_current_user)
+):
+    if not (current_user.is_driver and current_user.is_approved):
+        raise HTTPException(status_code=403, detail="Only approved drivers can report their location.")
+    matching_engine.update_driver(current_user.id, data.lat, data.lng)
+    return {"message": "Location updated."}
+
+
+@router.get("/driver/requested", response_model=List[RideOut], status_code=200) # <-- THIS IS THE KEY CHANGE FOR /rides/requested
+async def get_all_requested_rides(
+        response: Response,
+        lat: Optional[float] = Query(None),
+        lng: Optional[float] = Query(None),
+        radius_km: float = Query(DEFAULT_RADIUS_KM, gt=0, le=100),
+        limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+        cursor: Optional[str] = Query(None),
+        db: AsyncSession = Depends(get_db),
+        read_db: AsyncSession = Depends(get_read_db),
         current_user: User = Depends(get_current_user)
 ):
     # Allow only admin or approved drivers to access
     if not (is_admin(current_user) or (current_user.is_driver and current_user.is_approved)):
         raise HTTPException(status_code=403, detail="Only approved drivers or admin can view requested rides.")
 
-    requested_rides = db.query(Ride).filter(Ride.status == "requested").all()
-    return requested_rides
\ No newline at end of file
+    # Use the position sent with the poll, else the driver's last reported one
+    if lat is not None and lng is not None:
+        if current_user.is_driver:
+            matching_engine.update_driver(current_user.id, lat, lng)
+        position = (lat, lng)
+    else:
+        position = matching_engine.driver_position(current_user.id)
+
+    if position is not None:
+        return await matching_engine.nearest_rides(db, position[0], position[1], radius_km, limit, read_db=read_db)
+
+    # No known position: oldest open requests first, one page at a time
+    stmt = select(*columns_for(Ride, RideOut)).where(OPEN_REQUEST)
+    return await fetch_page(read_db, stmt, RIDE_PAGE_KEYS, PageParams(cursor, limit), response, descending=False)
+
+
+def require_dispatch(current_user: User):
+    if not settings.DISPATCH_ENABLED:
+        raise HTTPException(status_code=404, detail="Dispatch is not enabled.")
+    if not (current_user.is_driver and current_user.is_approved):
+        raise HTTPException(status_code=403, detail="Only approved drivers can take dispatched rides.")
+
+
+class DriverAvailability(BaseModel):
+    available: bool
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+
+@router.post("/driver/availability", response_model=MessageOut)
+async def set_driver_availability(
+    data: DriverAvailability,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Join or leave the pool of idle drivers that receive ride offers."""
+    require_dispatch(current_user)
+    if not data.available:
+        dispatcher.driver_unavailable(current_user.id)
+        return {"message": "Driver is offline for offers."}
+    if data.lat is None or data.lng is None:
+        raise HTTPException(status_code=400, detail="lat and lng are required to receive offers.")
+    matching_engine.update_driver(current_user.id, data.lat, data.lng)
+    rating = None
+    if dispatcher.km_per_star:
+        row = await db.get(DriverRating, current_user.id)
+        rating = rating_score(row.rating_count, row.rating_sum) if row else rating_score(0, 0)
+    dispatcher.driver_available(current_user.id, data.lat, data.lng, rating)
+    return {"message": "Driver is available for offers."}
+
+
+@router.get("/driver/offers")
+async def stream_driver_offers(current_user: User = Depends(get_current_user)):
+    """Server-Sent Events stream of ride offers (and their expiry) for the calling driver."""
+    require_dispatch(current_user)
+    subscription = broker.subscribe(driver_channel(current_user.id))
+
+    async def event_stream():
+        with subscription:
+            while True:
+                message = await subscription.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                if message is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: {message['event']}\ndata: {json.dumps(message)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.post("/offers/{ride_id}/accept", response_model=MessageOut)
+async def accept_offer(
+    ride_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    require_dispatch(current_user)
+    if dispatcher.offer_for(ride_id, current_user.id) is None:
+        raise HTTPException(status_code=409, detail="No open offer for this ride.")
+    try:
+        await assign_driver(db, ride_id, current_user.id)
+    except HTTPException as exc:
+        if exc.detail == DRIVER_BUSY:
+            # The driver's conflict, not the ride's: take the driver out of
+            # dispatch and offer the ride to the next one
+            dispatcher.driver_unavailable(current_user.id)
+        else:
+            # Taken, cancelled or gone through another path; stop offering it
+            dispatcher.remove_ride(ride_id)
+        raise
+    return {"message": "Ride accepted by driver."}
+
+
+@router.post("/offers/{ride_id}/decline", response_model=MessageOut)
+async def decline_offer(ride_id: int, current_user: User = Depends(get_current_user)):
+    require_dispatch(current_user)
+    if not dispatcher.decline(ride_id, current_user.id):
+        raise HTTPException(status_code=409, detail="No open offer for this ride.")
+    return {"message": "Offer declined."}
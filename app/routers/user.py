@@ -1,25 +1,44 @@
 # app/routers/user.py
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.db import SessionLocal
-from dependencies.auth import get_current_user
-from app.schemas.user import UserOut # Import your UserOut schema
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.db import get_db
+from app.core.ratings import rating_summary
+from app.core.replicas import get_read_db
+from dependencies.auth import get_current_user, Principal
+from app.schemas.user import UserOut, DriverProfileOut # Import your UserOut schema
 from app.models.user import User # Import your User model
+from app.models.rating import DriverRating
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/me", response_model=UserOut)
-def read_users_me(
-    current_user: User = Depends(get_current_user)
+async def read_users_me(
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Get current authenticated user's details.
     """
-    return current_user
\ No newline at end of file
+    if current_user.from_token:
+        # Role-claim tokens carry no profile fields
+        user = await db.get(User, current_user.id)
+        if user is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
+        return user
+    return current_user
+
+
+@router.get("/drivers/{driver_id}", response_model=DriverProfileOut)
+async def read_driver_profile(
+    driver_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Public profile of a driver with their rating aggregates (two primary-key lookups).
+    """
+    driver = await db.get(User, driver_id)
+    if driver is None or not driver.is_driver:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Driver not found.")
+    rating = await db.get(DriverRating, driver_id)
+    return {"id": driver.id, "name": driver.name, "gender": driver.gender, "rating": rating_summary(rating)}
@@ -1,5 +1,7 @@
+from datetime import date, datetime
+
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Dict, List, Optional
 
 class UserCreate(BaseModel):
     name: str
@@ -12,6 +14,11 @@ class UserCreate(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class UserOut(BaseModel):
@@ -33,9 +40,16 @@ class RideOut(BaseModel):
     pickup_location: str
     drop_location: str
     status: str
+    fare: Optional[float] = None
+    timestamp: Optional[datetime] = None
 
     class Config:
-        orm_mode = True
+        from_attributes = True
+
+
+class RideStatusOut(RideOut):
+    pickup_lat: Optional[float] = None
+    pickup_lng: Optional[float] = None
 
 
 class PaymentOut(BaseModel):
@@ -45,6 +59,166 @@ class PaymentOut(BaseModel):
     method: str
     status: str
     recipient_id: int | None = None  # optional for admin to driver
+    paid_at: Optional[datetime] = None
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        from_attributes = True
+
+
+class EarningsRollupOut(BaseModel):
+    period_start: date
+    amount: float
+    payment_count: int
+
+
+class RatingOut(BaseModel):
+    count: int
+    average: Optional[float] = None
+    score: float  # average pulled towards the prior while count is small; rank drivers by this
+    histogram: Dict[int, int]
+    recent: List[int]
+    recent_average: Optional[float] = None
+
+
+class DriverProfileOut(BaseModel):
+    id: int
+    name: Optional[str] = None
+    gender: Optional[str] = None
+    rating: RatingOut
+
+
+class ComplaintOut(BaseModel):
+    id: int
+    user_id: Optional[int] = None
+    ride_id: Optional[int] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class MessageOut(BaseModel):
+    message: str
+
+
+class RideRequestOut(BaseModel):
+    ride_id: int
+    message: str
+    estimated_fare: float
+
+
+class FareQuoteOut(BaseModel):
+    pickup_location: str
+    drop_location: str
+    estimated_fare: float
+
+
+class RideCompleteOut(BaseModel):
+    message: str
+    fare: Optional[float] = None
+
+
+class RideNotifyOut(BaseModel):
+    message: str
+    ride_id: int
+    status: str
+
+
+class EarningsOut(BaseModel):
+    driver_id: int
+    total_earnings: float
+    payment_count: int
+    last_paid_at: Optional[datetime] = None
+    payments: List[PaymentOut]  # one page, see X-Next-Cursor
+
+
+class EmergencyContactOut(BaseModel):
+    id: int
+    user_id: Optional[int] = None
+    name: str
+    phone: str
+
+    class Config:
+        from_attributes = True
+
+
+class ComplaintCreatedOut(BaseModel):
+    message: str
+    complaint_id: int
+
+
+class PaymentReceiptOut(BaseModel):
+    message: str
+    payment_id: int
+    ride_id: int
+    amount: float
+    method: str
+    status: str
+    paid_at: Optional[datetime] = None
+
+
+class DriverPaymentOut(BaseModel):
+    message: str
+    payment_id: int
+    status: str
+
+
+class BulkApprovalResult(BaseModel):
+    driver_id: int
+    status: str  # approved or not_found
+
+
+class BulkApprovalOut(BaseModel):
+    approved: int
+    results: List[BulkApprovalResult]
+
+
+class BulkPayoutResult(BaseModel):
+    ride_id: int
+    driver_id: int
+    status: str  # paid, invalid_ride, duplicate or already_paid
+    payment_id: Optional[int] = None  # only set when paid
+
+
+class BulkPayoutOut(BaseModel):
+    paid: int
+    total_amount: float
+    results: List[BulkPayoutResult]
+
+
+class RideStatsHourOut(BaseModel):
+    hour: datetime
+    requests: int
+    accepts: int
+    starts: int
+    completions: int
+    cancels: int
+    cancel_rate: Optional[float] = None
+    revenue: float
+    avg_accept_seconds: Optional[float] = None
+    median_accept_seconds: Optional[float] = None
+
+
+class RideStatsRefreshOut(BaseModel):
+    events: int
+
+
+class PoolStatsOut(BaseModel):
+    connects: int
+    checkouts: int
+    checkins: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+    wait_seconds_avg: float
+    timeouts: int
+    status: str
+    size: Optional[int] = None
+    checkedout: Optional[int] = None
+    overflow: Optional[int] = None
+    checkedin: Optional[int] = None
+
+
+class HealthOut(BaseModel):
+    status: str
+    warmup_seconds: Optional[float] = None
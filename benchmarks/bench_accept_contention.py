@@ -0,0 +1,127 @@
+"""
+Many approved drivers racing to accept the same few rides.
+
+    python -m benchmarks.bench_accept_contention [--drivers 200] [--rides 20] [--rounds 3]
+
+Every driver tries every open ride at once, so each ride sees --drivers
+concurrent accepts. Reports accept throughput and fails if any ride was
+handed to more than one driver or any driver ended up with more than one
+active ride. DATABASE_URL defaults to a throwaway SQLite file; use Postgres
+to exercise real row-level contention. Needs httpx.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+import httpx  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from app.core.auth import create_access_token  # noqa: E402
+from app.core.db import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.ride import Ride  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+def seed_drivers(count):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    customer = User(name="c", phone="c", email="c@bench.local", is_driver=False)
+    drivers = [User(name=f"d{i}", phone=f"d{i}", email=f"d{i}@bench.local", is_driver=True, is_approved=True)
+               for i in range(count)]
+    db.add_all([customer] + drivers)
+    db.commit()
+    headers = [{"Authorization": "Bearer " + create_access_token({"sub": str(d.id)})} for d in drivers]
+    customer_id = customer.id
+    db.close()
+    return customer_id, headers
+
+
+def seed_rides(customer_id, count):
+    db = SessionLocal()
+    rides = [Ride(user_id=customer_id, pickup_location="MG Road", drop_location="Koramangala", fare=100, status="requested")
+             for _ in range(count)]
+    db.add_all(rides)
+    db.commit()
+    ids = [r.id for r in rides]
+    db.close()
+    return ids
+
+
+def release_drivers():
+    # Finish every accepted ride so all drivers can compete again next round
+    db = SessionLocal()
+    db.query(Ride).filter(Ride.status == "accepted").update({"status": "completed"})
+    db.commit()
+    db.close()
+
+
+async def race(client, headers, ride_ids):
+    async def attempt(driver, ride_id):
+        r = await client.post("/rides/accept_ride", json={"ride_id": ride_id}, headers=driver)
+        return ride_id, r.status_code
+
+    attempts = [(driver, ride_id) for driver in headers for ride_id in ride_ids]
+    random.shuffle(attempts)
+    return await asyncio.gather(*(attempt(d, r) for d, r in attempts))
+
+
+def check_invariants(ride_ids, results):
+    wins = Counter(ride_id for ride_id, code in results if code == 200)
+    double = {ride_id: n for ride_id, n in wins.items() if n > 1}
+    errors = Counter(code for _, code in results if code not in (200, 400))
+
+    db = SessionLocal()
+    per_driver = db.execute(
+        select(Ride.driver_id, func.count())
+        .where(Ride.status.in_(["accepted", "ongoing"]))
+        .group_by(Ride.driver_id)
+        .having(func.count() > 1)
+    ).all()
+    db.close()
+    return double, per_driver, errors, len(wins)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--drivers", type=int, default=200)
+    parser.add_argument("--rides", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    customer_id, headers = seed_drivers(args.drivers)
+    print(f"{args.drivers} drivers x {args.rides} rides per round against {os.environ['DATABASE_URL']}")
+
+    failed = False
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for round_no in range(1, args.rounds + 1):
+            ride_ids = seed_rides(customer_id, args.rides)
+            start = time.perf_counter()
+            results = await race(client, headers, ride_ids)
+            elapsed = time.perf_counter() - start
+
+            double, per_driver, errors, accepted = check_invariants(ride_ids, results)
+            print(f"round {round_no}: {len(results)} attempts in {elapsed:.2f}s -> {len(results) / elapsed:.0f} req/s, "
+                  f"{accepted}/{len(ride_ids)} rides accepted, double assignments: {len(double)}, "
+                  f"drivers with >1 active ride: {len(per_driver)}, errors: {dict(errors) or 0}")
+            failed = failed or bool(double or per_driver or errors)
+            release_drivers()
+
+    if failed:
+        raise SystemExit("invariant violated")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""
+Per-request cost of resolving the authenticated user.
+
+    python -m benchmarks.bench_auth [--requests 2000]
+
+Compares a users lookup on every call (cache cleared each time), the
+principal cache, and tokens carrying signed role claims. DATABASE_URL
+defaults to a throwaway SQLite file.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+from app.config import settings
+from app.core.auth import create_access_token
+from app.core.db import Base, SessionLocal, engine, new_session
+from app.models.user import User
+import app.models.ride  # noqa: F401  (registers the Ride mapper used by User relationships)
+from dependencies.auth import get_current_user, principal_cache
+
+
+def seed():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(name="bench", phone="bench", email="bench@bench.local", is_driver=True, is_approved=True)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    db.close()
+    return user
+
+
+async def measure(token, requests, clear_cache):
+    start = time.perf_counter()
+    for _ in range(requests):
+        if clear_cache:
+            principal_cache.clear()
+        # A fresh session per request, as get_db provides
+        async with new_session() as db:
+            await get_current_user(token=token, db=db)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(requests):
+    user = seed()
+    token = create_access_token({"sub": str(user.id)})
+    claims_token = create_access_token({"sub": str(user.id), "drv": True, "apr": True, "email": user.email})
+
+    uncached = await measure(token, requests, clear_cache=True)
+    cached = await measure(token, requests, clear_cache=False)
+    settings.AUTH_ROLE_CLAIMS = True
+    claims = await measure(claims_token, requests, clear_cache=True)
+
+    print(f"users lookup per request: {uncached:8.1f} us")
+    print(f"principal cache:          {cached:8.1f} us")
+    print(f"role claims in token:     {claims:8.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    asyncio.run(main(parser.parse_args().requests))
@@ -0,0 +1,103 @@
+"""
+Ride lifecycle throughput with the sync (threadpool) and async DB layers.
+
+    python -m benchmarks.bench_db_modes [--pairs 50] [--rounds 5]
+
+Each mode runs in a fresh interpreter because DB_ASYNC is read at import
+time. DATABASE_URL defaults to a throwaway SQLite file; point it at Postgres
+for numbers that reflect production. Needs httpx.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ["sync", "async"]
+
+
+def seed(pairs):
+    from app.core.auth import create_access_token
+    from app.core.db import Base, SessionLocal, engine
+    from app.models.user import User
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    customers, drivers = [], []
+    for i in range(pairs):
+        customers.append(User(name=f"c{i}", phone=f"c{i}", email=f"c{i}@bench.local", is_driver=False))
+        drivers.append(User(name=f"d{i}", phone=f"d{i}", email=f"d{i}@bench.local", is_driver=True, is_approved=True))
+    db.add_all(customers + drivers)
+    db.commit()
+    tokens = [
+        ({"Authorization": "Bearer " + create_access_token({"sub": str(c.id)})},
+         {"Authorization": "Bearer " + create_access_token({"sub": str(d.id)})})
+        for c, d in zip(customers, drivers)
+    ]
+    db.close()
+    return tokens
+
+
+async def lifecycle(client, customer, driver, rounds):
+    count = 0
+    for _ in range(rounds):
+        r = await client.post("/rides/request_ride", json={"pickup_location": "MG Road", "drop_location": "Koramangala"}, headers=customer)
+        ride_id = r.json()["ride_id"]
+        await client.post("/rides/accept_ride", json={"ride_id": ride_id}, headers=driver)
+        await client.post("/rides/start_ride", params={"ride_id": ride_id}, headers=driver)
+        await client.get("/rides/ride_status", params={"ride_id": ride_id}, headers=customer)
+        await client.post("/rides/complete_ride", json={"ride_id": ride_id}, headers=driver)
+        count += 5
+    return count
+
+
+async def run_child(pairs, rounds):
+    import httpx
+    from app.main import app
+
+    tokens = seed(pairs)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        counts = await asyncio.gather(*(lifecycle(client, c, d, rounds) for c, d in tokens))
+        elapsed = time.perf_counter() - start
+    requests = sum(counts)
+    print(json.dumps({"requests": requests, "seconds": elapsed, "rps": requests / elapsed}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=50, help="concurrent customer/driver pairs")
+    parser.add_argument("--rounds", type=int, default=5, help="lifecycles per pair")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        asyncio.run(run_child(args.pairs, args.rounds))
+        return
+
+    env = dict(os.environ)
+    if not env.get("DATABASE_URL"):
+        env["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    env.setdefault("SECRET_KEY", "bench")
+    env.setdefault("ALGORITHM", "HS256")
+    env.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+    print(f"{args.pairs} pairs x {args.rounds} lifecycles against {env['DATABASE_URL']}")
+    for mode in MODES:
+        env["DB_ASYNC"] = "true" if mode == "async" else "false"
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_db_modes", "--mode", mode,
+             "--pairs", str(args.pairs), "--rounds", str(args.rounds)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(f"{mode:>5}: {result['requests']} requests in {result['seconds']:.2f}s -> {result['rps']:.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Peak memory of the streaming ride export vs. loading the whole table.
+
+    python -m benchmarks.bench_export [--sizes 20000,200000]
+
+For each table size, a fresh interpreter either drains the body of
+/admin/admin/export/rides (NDJSON) or does what the unpaginated list
+endpoint used to: load every row as an ORM object and dump one JSON
+document. Reports rows/s and peak RSS growth. DATABASE_URL defaults to a
+throwaway SQLite file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+MODES = ["stream", "materialize"]
+
+
+def seed(count):
+    from sqlalchemy import insert
+    from app.core.db import Base, engine
+    from app.models.ride import Ride
+    from app.models.user import User
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    start = datetime(2026, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "name": "c", "phone": "c", "email": "c@bench.local", "is_driver": False}])
+        for offset in range(0, count, 10000):
+            conn.execute(insert(Ride), [
+                {"user_id": 1, "pickup_location": "MG Road", "drop_location": "Koramangala", "fare": 120.5,
+                 "status": "completed", "timestamp": start + timedelta(seconds=i)}
+                for i in range(offset, min(offset + 10000, count))
+            ])
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run_child(mode):
+    from sqlalchemy import select
+    from app.core.db import SessionLocal
+    from app.models.ride import Ride
+    from app.routers.admin import ADMIN_EMAIL, export_rides
+    from app.schemas.user import RideOut
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "stream":
+        # Drain the endpoint's body iterator directly: httpx's ASGITransport
+        # buffers whole responses, which would hide what the server holds.
+        response = await export_rides(admin_email=ADMIN_EMAIL, status=None, driver_id=None, user_id=None,
+                                      date_from=None, date_to=None, format="ndjson")
+        rows = 0
+        async for chunk in response.body_iterator:
+            rows += chunk.count("\n")
+    else:
+        db = SessionLocal()
+        rides = db.scalars(select(Ride)).all()
+        body = json.dumps([RideOut.model_validate(ride, from_attributes=True).model_dump(mode="json") for ride in rides])
+        rows = len(rides)
+        db.close()
+        del body
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"rows": rows, "seconds": elapsed, "rss_growth_mb": peak_rss_mb() - baseline}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="20000,200000")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--seed", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.seed)
+        return
+    if args.mode:
+        asyncio.run(run_child(args.mode))
+        return
+
+    env = dict(os.environ)
+    if not env.get("DATABASE_URL"):
+        env["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    env.setdefault("SECRET_KEY", "bench")
+    env.setdefault("ALGORITHM", "HS256")
+    env.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+    def child(*extra):
+        out = subprocess.run([sys.executable, "-m", "benchmarks.bench_export", *extra],
+                             env=env, capture_output=True, text=True, check=True).stdout
+        return out.strip().splitlines()[-1] if out.strip() else None
+
+    print(f"against {env['DATABASE_URL']}")
+    for size in args.sizes.split(","):
+        child("--seed", size)
+        for mode in MODES:
+            r = json.loads(child("--mode", mode))
+            print(f"{int(size):>8} rides  {mode:>11}: {r['rows'] / r['seconds']:9.0f} rows/s  "
+                  f"peak RSS +{r['rss_growth_mb']:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Fare quote latency: cold vs. warm cache, and batch quoting.
+
+    python -m benchmarks.bench_fare
+"""
+import random
+import time
+
+from app.core.cache import TTLCache
+from app.core.fare import FareEngine, Gazetteer, HaversineDistance, Tariff
+from app.config import settings
+
+BATCH_SIZES = [100, 1_000, 10_000]
+
+
+def make_engine(gazetteer):
+    return FareEngine(
+        gazetteer=gazetteer,
+        distance=HaversineDistance(road_factor=settings.FARE_ROAD_FACTOR),
+        tariff=Tariff(),
+        cache=TTLCache(maxsize=100_000, ttl=3600),
+    )
+
+
+def main():
+    rng = random.Random(7)
+    engine = make_engine(Gazetteer.from_csv(settings.GAZETTEER_PATH))
+    places = [name for name in engine.gazetteer._places]
+    pairs = [tuple(rng.sample(places, 2)) for _ in range(2_000)]
+
+    start = time.perf_counter()
+    for pickup, drop in pairs:
+        engine.quote(pickup, drop)
+    cold = (time.perf_counter() - start) / len(pairs) * 1e6
+
+    start = time.perf_counter()
+    for pickup, drop in pairs:
+        engine.quote(pickup, drop)
+    warm = (time.perf_counter() - start) / len(pairs) * 1e6
+    print(f"single quote: cold {cold:.1f} us, warm {warm:.1f} us")
+
+    # A large synthetic gazetteer so batch pairs are mostly distinct
+    synthetic = Gazetteer({
+        f"place {i}": (rng.uniform(12.8, 13.2), rng.uniform(77.4, 77.8)) for i in range(5_000)
+    })
+    places = [f"place {i}" for i in range(5_000)]
+    for size in BATCH_SIZES:
+        batch = [tuple(rng.sample(places, 2)) for _ in range(size)]
+
+        engine = make_engine(synthetic)
+        start = time.perf_counter()
+        for pickup, drop in batch:
+            engine.quote(pickup, drop)
+        loop = (time.perf_counter() - start) * 1000
+
+        engine = make_engine(synthetic)
+        start = time.perf_counter()
+        engine.quote_many(batch)
+        vectorized = (time.perf_counter() - start) * 1000
+        print(f"batch of {size:>6}: loop {loop:8.2f} ms, quote_many {vectorized:8.2f} ms (cold cache)")
+
+
+if __name__ == "__main__":
+    main()
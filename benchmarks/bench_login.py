@@ -0,0 +1,131 @@
+"""
+Login throughput at several bcrypt costs, and what a login storm does to
+an unrelated ride endpoint.
+
+    python -m benchmarks.bench_login [--costs 4,8,10,12] [--logins 100] [--concurrency 50]
+
+Each cost runs in a fresh interpreter because BCRYPT_ROUNDS is read at
+import time. While the logins run, a probe keeps listing a customer's rides
+and reports its latency. Logins rejected with 429 (password pool full) are
+counted separately. DATABASE_URL defaults to a throwaway SQLite file.
+Needs httpx.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def seed(count):
+    from app.core.auth import create_access_token, hash_password
+    from app.core.db import Base, SessionLocal, engine
+    from app.models.user import User
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    hashed = hash_password("secret")  # same password for everyone; one hash at the configured cost
+    db = SessionLocal()
+    users = [User(name=f"u{i}", phone=f"p{i}", email=f"u{i}@bench.local", is_driver=False, hashed_password=hashed)
+             for i in range(count + 1)]
+    db.add_all(users)
+    db.commit()
+    probe = users[-1]
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": str(probe.id)})}
+    probe_id = probe.id
+    db.close()
+    return probe_id, headers
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run_child(logins, concurrency):
+    import httpx
+    from app.main import app
+
+    probe_id, probe_headers = seed(logins)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        gate = asyncio.Semaphore(concurrency)
+        latencies, codes, probe_latencies = [], [], []
+        done = asyncio.Event()
+
+        async def login(i):
+            async with gate:
+                start = time.perf_counter()
+                r = await client.post("/auth/token", data={"username": f"p{i}", "password": "secret"})
+                latencies.append(time.perf_counter() - start)
+                codes.append(r.status_code)
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get(f"/rides/user/{probe_id}/rides", headers=probe_headers)
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+
+    ok = codes.count(200)
+    print(json.dumps({
+        "ok": ok,
+        "rejected": codes.count(429),
+        "other": len(codes) - ok - codes.count(429),
+        "seconds": elapsed,
+        "logins_per_s": ok / elapsed,
+        "login_p50_ms": statistics.median(latencies) * 1000,
+        "login_p95_ms": percentile(latencies, 0.95) * 1000,
+        "probe_p50_ms": statistics.median(probe_latencies) * 1000 if probe_latencies else 0.0,
+        "probe_p95_ms": percentile(probe_latencies, 0.95) * 1000,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--costs", default="4,8,10,12", help="comma-separated BCRYPT_ROUNDS values")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(run_child(args.logins, args.concurrency))
+        return
+
+    env = dict(os.environ)
+    if not env.get("DATABASE_URL"):
+        env["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    env.setdefault("SECRET_KEY", "bench")
+    env.setdefault("ALGORITHM", "HS256")
+    env.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+    print(f"{args.logins} logins, {args.concurrency} concurrent, against {env['DATABASE_URL']}")
+    for cost in args.costs.split(","):
+        env["BCRYPT_ROUNDS"] = cost
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_login", "--child",
+             "--logins", str(args.logins), "--concurrency", str(args.concurrency)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"cost {cost:>2}: {r['logins_per_s']:7.1f} logins/s  p50 {r['login_p50_ms']:7.1f} ms  "
+              f"p95 {r['login_p95_ms']:7.1f} ms  429s {r['rejected']:>3}  other {r['other']}  |  "
+              f"ride listing p50 {r['probe_p50_ms']:.1f} ms  p95 {r['probe_p95_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Nearest-open-request lookup latency as the number of open requests grows.
+
+    python -m benchmarks.bench_matching
+
+Compares the grid index used by /rides/driver/requested with a linear scan
+over every open request (what the endpoint used to do).
+"""
+import random
+import statistics
+import time
+
+from app.core.geo import GeoIndex, haversine_km
+
+# Roughly the Bengaluru metro area
+LAT_RANGE = (12.80, 13.20)
+LNG_RANGE = (77.40, 77.80)
+SIZES = [1_000, 10_000, 100_000]
+QUERIES = 500
+RADIUS_KM = 5.0
+K = 20
+
+
+def random_point(rng):
+    return rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)
+
+
+def linear_scan(points, lat, lng):
+    found = []
+    for key, (plat, plng) in points.items():
+        distance = haversine_km(lat, lng, plat, plng)
+        if distance <= RADIUS_KM:
+            found.append((key, distance))
+    found.sort(key=lambda item: item[1])
+    return found[:K]
+
+
+def timed(fn, queries):
+    samples = []
+    for lat, lng in queries:
+        start = time.perf_counter()
+        fn(lat, lng)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95)]
+
+
+def main():
+    rng = random.Random(42)
+    queries = [random_point(rng) for _ in range(QUERIES)]
+    print(f"{'open rides':>10} {'index p50':>10} {'index p95':>10} {'scan p50':>10} {'scan p95':>10}  (ms)")
+    for size in SIZES:
+        index = GeoIndex()
+        points = {}
+        for ride_id in range(size):
+            lat, lng = random_point(rng)
+            index.upsert(ride_id, lat, lng)
+            points[ride_id] = (lat, lng)
+
+        idx_p50, idx_p95 = timed(lambda lat, lng: index.nearest(lat, lng, RADIUS_KM, K), queries)
+        # The scan is slow at 100k; a sample of queries is enough to show the trend.
+        scan_p50, scan_p95 = timed(lambda lat, lng: linear_scan(points, lat, lng), queries[:50])
+        print(f"{size:>10} {idx_p50:>10.3f} {idx_p95:>10.3f} {scan_p50:>10.3f} {scan_p95:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Payment retry storm: many concurrent retries of the same payment.
+
+    python -m benchmarks.bench_payment_retries [--customers 200] [--retries 10]
+
+Every customer has a completed ride with a pending charge and fires
+--retries concurrent /make_payment calls with one Idempotency-Key, as a
+client on a flaky network would. All of them must get 200 with the same
+payment id, and each ride must end up with exactly one charge, paid. A
+second round without a key checks that a duplicate payment is refused
+(409) rather than recorded. Reports DB queries per request from the
+/metrics counters. DATABASE_URL defaults to a throwaway SQLite file.
+Needs httpx.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+import httpx  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from app.core.auth import create_access_token  # noqa: E402
+from app.core.db import Base, SessionLocal, engine  # noqa: E402
+from app.core.metrics import db_queries  # noqa: E402
+from app.core.settlement import open_charge  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.payment import Payment  # noqa: E402
+from app.models.ride import Ride  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+def seed(customers):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    driver = User(name="d", phone="d", email="d@example.com", is_driver=True, is_approved=True)
+    users = [User(name=f"c{i}", phone=f"c{i}", email=f"c{i}@example.com", is_driver=False) for i in range(customers)]
+    db.add_all([driver] + users)
+    db.flush()
+    rides = [Ride(user_id=u.id, driver_id=driver.id, pickup_location="MG Road", drop_location="Koramangala",
+                  fare=100, status="completed") for u in users]
+    db.add_all(rides)
+    db.flush()
+    for ride in rides:
+        open_charge(db, ride.id, ride.fare)
+    db.commit()
+    payers = [({"Authorization": "Bearer " + create_access_token({"sub": str(u.id)})}, r.id)
+              for u, r in zip(users, rides)]
+    db.close()
+    return payers
+
+
+def check_charges():
+    db = SessionLocal()
+    rows = db.execute(
+        select(Payment.ride_id, func.count(), func.sum(Payment.status == "paid"))
+        .where(Payment.recipient_id.is_(None))
+        .group_by(Payment.ride_id)
+    ).all()
+    db.close()
+    return rows
+
+
+def queries():
+    return sum(value for *_, value in db_queries.samples())
+
+
+async def storm(client, payers, retries, key):
+    latencies, responses = [], {}
+
+    async def pay(headers, ride_id):
+        if key:
+            headers = {**headers, "Idempotency-Key": f"{key}-{ride_id}"}
+        start = time.perf_counter()
+        r = await client.post("/make_payment", json={"ride_id": ride_id, "method": "upi"}, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        responses.setdefault(ride_id, []).append(r)
+
+    before = queries()
+    start = time.perf_counter()
+    await asyncio.gather(*(pay(h, ride_id) for h, ride_id in payers for _ in range(retries)))
+    elapsed = time.perf_counter() - start
+    per_request = (queries() - before) / len(latencies)
+    latencies.sort()
+    return responses, elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)], per_request
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--retries", type=int, default=10, help="concurrent attempts per payment")
+    args = parser.parse_args()
+
+    payers = seed(args.customers)
+    print(f"{args.customers} payments x {args.retries} concurrent attempts against {os.environ['DATABASE_URL']}")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Warm the principal cache so only payment work is counted
+        await asyncio.gather(*(client.get("/users/me", headers=h) for h, _ in payers))
+        keyed, elapsed, p50, p95, per_request = await storm(client, payers, args.retries, "pay")
+        print(f"with key:    {len(payers) * args.retries / elapsed:6.0f} req/s  p50 {p50 * 1000:6.1f} ms  "
+              f"p95 {p95 * 1000:6.1f} ms  {per_request:.2f} queries/request")
+        unkeyed, elapsed, p50, p95, per_request = await storm(client, payers, args.retries, None)
+        print(f"without key: {len(payers) * args.retries / elapsed:6.0f} req/s  p50 {p50 * 1000:6.1f} ms  "
+              f"p95 {p95 * 1000:6.1f} ms  {per_request:.2f} queries/request")
+
+    failures = []
+    for ride_id, responses in keyed.items():
+        if {r.status_code for r in responses} != {200} or len({r.json()["payment_id"] for r in responses}) != 1:
+            failures.append(f"ride {ride_id}: keyed retries got {sorted(r.status_code for r in responses)}")
+    for ride_id, responses in unkeyed.items():
+        if {r.status_code for r in responses} != {409}:
+            failures.append(f"ride {ride_id}: unkeyed repeat got {sorted({r.status_code for r in responses})}")
+    charges = check_charges()
+    bad = [row for row in charges if row[1] != 1 or row[2] != 1]
+    print(f"rides {len(charges)}, with exactly one paid charge {len(charges) - len(bad)}")
+    if failures or bad or len(charges) != args.customers:
+        raise SystemExit("\n".join(failures[:10]) or "duplicate or missing charges")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
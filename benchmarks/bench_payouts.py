@@ -0,0 +1,111 @@
+"""
+Weekly payout run: one request per item vs. the bulk admin endpoints.
+
+    python -m benchmarks.bench_payouts [--items 2000]
+
+Approves --items drivers and pays --items rides through approve_driver /
+pay_driver one call at a time, then does the same for another --items
+through approve_drivers / pay_drivers in one call each. The bulk payout is
+then retried with the same Idempotency-Key, which must return the stored
+response without paying anyone twice. DATABASE_URL defaults to a throwaway
+SQLite file. Needs httpx.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+import httpx  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from app.core.db import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.earnings import DriverEarnings  # noqa: E402
+from app.models.payment import Payment  # noqa: E402
+from app.models.ride import Ride  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.routers.admin import ADMIN_EMAIL  # noqa: E402
+
+
+def seed(count):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    customer = User(name="c", phone="c", email="c@bench.local", is_driver=False)
+    drivers = [User(name=f"d{i}", phone=f"d{i}", email=f"d{i}@bench.local", is_driver=True, is_approved=False)
+               for i in range(count)]
+    db.add_all([customer] + drivers)
+    db.flush()
+    rides = [Ride(user_id=customer.id, driver_id=d.id, pickup_location="MG Road", drop_location="Koramangala",
+                  fare=100, status="completed") for d in drivers]
+    db.add_all(rides)
+    db.commit()
+    pairs = [(r.id, r.driver_id) for r in rides]
+    db.close()
+    return pairs
+
+
+def check_ledger():
+    db = SessionLocal()
+    paid = db.scalar(select(func.coalesce(func.sum(Payment.amount), 0)).where(Payment.status == "paid"))
+    count = db.scalar(select(func.count()).select_from(Payment).where(Payment.status == "paid"))
+    ledger = db.scalar(select(func.coalesce(func.sum(DriverEarnings.total_amount), 0)))
+    db.close()
+    return count, paid, ledger
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=2000)
+    args = parser.parse_args()
+
+    pairs = seed(args.items * 2)
+    single, bulk = pairs[:args.items], pairs[args.items:]
+    print(f"{args.items} drivers approved and paid each way against {os.environ['DATABASE_URL']}")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        for _, driver_id in single:
+            await client.post("/admin/admin/approve_driver", json={"admin_email": ADMIN_EMAIL, "driver_id": driver_id})
+        for ride_id, driver_id in single:
+            await client.post("/admin/admin/pay_driver",
+                              json={"ride_id": ride_id, "driver_id": driver_id, "amount": 90, "method": "upi"})
+        one_by_one = time.perf_counter() - start
+
+        payload = {"admin_email": ADMIN_EMAIL,
+                   "payouts": [{"ride_id": r, "driver_id": d, "amount": 90, "method": "upi"} for r, d in bulk]}
+        headers = {"Idempotency-Key": "payout-run-1"}
+        start = time.perf_counter()
+        approved = await client.post("/admin/admin/approve_drivers",
+                                     json={"admin_email": ADMIN_EMAIL, "driver_ids": [d for _, d in bulk]})
+        paid = await client.post("/admin/admin/pay_drivers", json=payload, headers=headers)
+        batched = time.perf_counter() - start
+
+        start = time.perf_counter()
+        retried = await client.post("/admin/admin/pay_drivers", json=payload, headers=headers)
+        replay_seconds = time.perf_counter() - start
+        rerun = await client.post("/admin/admin/pay_drivers", json=payload)
+
+    print(f"one at a time: {one_by_one:.2f}s ({2 * args.items} requests)")
+    print(f"bulk:          {batched:.2f}s (2 requests; approved {approved.json()['approved']}, "
+          f"paid {paid.json()['paid']})")
+    print(f"retry with same key: {replay_seconds * 1000:.0f} ms, identical response: {retried.json() == paid.json()}")
+    statuses = {r['status'] for r in rerun.json()['results']}
+    print(f"rerun without key: paid {rerun.json()['paid']}, item statuses {sorted(statuses)}")
+
+    count, total, ledger = check_ledger()
+    print(f"paid payments {count}, sum {total:.0f}, earnings ledger total {ledger:.0f}")
+    if count != 2 * args.items or abs(total - ledger) > 1e-6 or retried.json() != paid.json():
+        raise SystemExit("payout run produced duplicate or missing payments")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""
+Response serialization cost per 1k rides.
+
+    python -m benchmarks.bench_serialization [--rides 1000] [--repeat 20]
+
+Loads --rides rides and turns them into a JSON body three ways:
+
+* ORM objects through jsonable_encoder and JSONResponse, which is what an
+  endpoint without a response model gets
+* the same, rendered with orjson instead of json (skipped when orjson is
+  not installed)
+* a columns-only select validated and dumped by the RideOut response model,
+  which is what FastAPI does for endpoints with a response_model and the
+  default response class
+
+Load and serialization are timed separately. DATABASE_URL defaults to a
+throwaway SQLite file.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import List
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.core.db import Base, SessionLocal, engine  # noqa: E402
+from app.core.pagination import columns_for  # noqa: E402
+from app.models.ride import Ride  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas.user import RideOut  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RIDES = TypeAdapter(List[RideOut])
+
+
+def seed(count):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(name="c", phone="c", email="c@example.com", is_driver=False)
+    db.add(user)
+    db.flush()
+    db.add_all([Ride(user_id=user.id, driver_id=None, pickup_location=f"Stop {i}", drop_location="Koramangala",
+                     pickup_lat=12.9, pickup_lng=77.6, status="requested", fare=100 + i % 50,
+                     timestamp=datetime(2026, 1, 1)) for i in range(count)])
+    db.commit()
+    db.close()
+
+
+def load_objects(db):
+    db.expunge_all()
+    return db.scalars(select(Ride)).all()
+
+
+def load_rows(db):
+    return db.execute(select(*columns_for(Ride, RideOut))).all()
+
+
+def encoder_json(rides):
+    return JSONResponse(jsonable_encoder(rides)).body
+
+
+def encoder_orjson(rides):
+    return orjson.dumps(jsonable_encoder(rides))
+
+
+def response_model(rows):
+    return RIDES.dump_json(RIDES.validate_python(rows))
+
+
+def timed(fn, arg, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rides", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20, help="runs per variant; the best one is reported")
+    args = parser.parse_args()
+
+    seed(args.rides)
+    variants = [("ORM + jsonable_encoder + json", load_objects, encoder_json)]
+    if orjson is not None:
+        variants.append(("ORM + jsonable_encoder + orjson", load_objects, encoder_orjson))
+    variants.append(("columns + response_model", load_rows, response_model))
+
+    per_1k = 1000 / args.rides * 1000
+    print(f"{args.rides} rides, best of {args.repeat}; ms per 1k rides")
+    db = SessionLocal()
+    for label, load, serialize in variants:
+        load_seconds, rides = timed(lambda _: load(db), None, args.repeat)
+        serialize_seconds, body = timed(serialize, rides, args.repeat)
+        print(f"{label:>32}: load {load_seconds * per_1k:7.2f}  serialize {serialize_seconds * per_1k:7.2f}  "
+              f"total {(load_seconds + serialize_seconds) * per_1k:7.2f}  ({len(body)} bytes)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
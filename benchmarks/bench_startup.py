@@ -0,0 +1,136 @@
+"""
+Startup: time to live, time to ready and the first requests, with and without warmup.
+
+    python -m benchmarks.bench_startup [--open-rides 20000] [--workers 1] [--runs 3]
+
+Seeds --open-rides open ride requests (the matching index a worker rebuilds
+on first use), then launches `uvicorn app.main:app --workers N` on a free
+port for each setting and polls until /health/live and /health/ready answer
+200. As soon as it is ready, an approved driver asks for nearby requests
+and a customer asks for a fare quote; both are timed, then timed again warm.
+Times are from process launch and are the median of --runs launches. With
+several workers each probe reaches whichever worker accepts it, so "ready"
+is the first worker to finish warming up.
+DATABASE_URL defaults to a throwaway SQLite file. Needs httpx.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+import httpx  # noqa: E402
+
+from app.core.auth import create_access_token  # noqa: E402
+from app.core.db import Base, SessionLocal, engine  # noqa: E402
+from app.models.ride import Ride  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+SETTINGS = {
+    "no warmup": {"WARMUP_ENABLED": "false"},
+    "warmup": {"WARMUP_ENABLED": "true"},
+}
+POLL_SECONDS = 0.01
+TIMEOUT_SECONDS = 60
+
+
+def seed(open_rides):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    customer = User(name="c", phone="c", email="c@example.com", is_driver=False)
+    driver = User(name="d", phone="d", email="d@example.com", is_driver=True, is_approved=True)
+    db.add_all([customer, driver])
+    db.flush()
+    db.add_all([Ride(user_id=customer.id, pickup_location=f"Stop {i % 500}", drop_location=f"Stop {i % 37}",
+                     pickup_lat=12.8 + (i % 400) * 0.001, pickup_lng=77.5 + (i // 400 % 400) * 0.001,
+                     status="requested", fare=100) for i in range(open_rides)])
+    db.commit()
+    tokens = {name: {"Authorization": "Bearer " + create_access_token({"sub": str(user.id)})}
+              for name, user in (("customer", customer), ("driver", driver))}
+    db.close()
+    return tokens
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(client, path, start):
+    deadline = start + TIMEOUT_SECONDS
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.TransportError:
+            pass
+        time.sleep(POLL_SECONDS)
+    raise SystemExit(f"{path} did not answer 200 within {TIMEOUT_SECONDS}s")
+
+
+def first_requests(client, tokens):
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        nearby = client.get("/rides/driver/requested", params={"lat": 12.9, "lng": 77.6, "limit": 20},
+                            headers=tokens["driver"])
+        quote = client.post("/rides/fare_quotes", json={"quotes": [{"pickup_location": "Stop 1",
+                                                                    "drop_location": "Stop 2"}]},
+                            headers=tokens["customer"])
+        timings.append(time.perf_counter() - start)
+        if nearby.status_code != 200 or quote.status_code != 200:
+            raise SystemExit(f"first requests failed: {nearby.status_code} {quote.status_code}")
+    return timings
+
+
+def launch(env, workers, tokens):
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=TIMEOUT_SECONDS) as client:
+            live = wait_for(client, "/health/live", start)
+            ready = wait_for(client, "/health/ready", start)
+            cold, warm = first_requests(client, tokens)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"live": live, "ready": ready, "cold": cold, "warm": warm, "first_response": ready + cold}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--open-rides", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    tokens = seed(args.open_rides)
+    print(f"{args.open_rides} open rides, {args.workers} worker(s), median of {args.runs} launches "
+          f"against {os.environ['DATABASE_URL']}")
+    for label, overrides in SETTINGS.items():
+        env = {**os.environ, **overrides}
+        runs = [launch(env, args.workers, tokens) for _ in range(args.runs)]
+        r = {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+        print(f"{label:>10}: live {r['live'] * 1000:6.0f} ms  ready {r['ready'] * 1000:6.0f} ms  "
+              f"first requests {r['cold'] * 1000:6.1f} ms (warm {r['warm'] * 1000:5.1f} ms)  "
+              f"launch to first response {r['first_response'] * 1000:6.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Ride status polling: DB queries and latency with and without the status cache,
+and how much of an aggressive poller the rate limiter turns away.
+
+    python -m benchmarks.bench_status_polling [--riders 200] [--polls 20]
+
+Every rider polls /rides/ride_status for their own ride as fast as it can;
+all riders poll concurrently. Each setting runs in a fresh interpreter because
+the cache TTL and limits are read at import time. Concurrent polls of the
+same ride share one query even with the TTL at 0. DATABASE_URL defaults to a
+throwaway SQLite file. Needs httpx.
+
+The "cold auth" setting skips warming the principal cache, so the first poll
+of every rider loads its user from the database while the status loads run;
+with more riders than pool connections, a poll that held its auth connection
+across the shared load would hang. A setting that doesn't finish within
+--timeout seconds fails the run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SETTINGS = {
+    "no cache, no limit": {"RIDE_STATUS_CACHE_TTL_SECONDS": "0", "RATE_LIMIT_ENABLED": "false"},
+    "2s cache, no limit": {"RIDE_STATUS_CACHE_TTL_SECONDS": "2", "RATE_LIMIT_ENABLED": "false"},
+    "2s cache, 2/s per user": {"RIDE_STATUS_CACHE_TTL_SECONDS": "2", "RATE_LIMIT_ENABLED": "true"},
+    "2s cache, cold auth": {"RIDE_STATUS_CACHE_TTL_SECONDS": "2", "RATE_LIMIT_ENABLED": "false"},
+}
+# Settings that start with an empty principal cache
+COLD_AUTH = {"2s cache, cold auth"}
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def seed(riders):
+    from app.core.auth import create_access_token
+    from app.core.db import Base, SessionLocal, engine
+    from app.models.ride import Ride
+    from app.models.user import User
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    users = [User(name=f"c{i}", phone=f"c{i}", email=f"c{i}@example.com", is_driver=False) for i in range(riders)]
+    db.add_all(users)
+    db.flush()
+    rides = [Ride(user_id=u.id, pickup_location="MG Road", drop_location="Koramangala", status="requested")
+             for u in users]
+    db.add_all(rides)
+    db.commit()
+    pollers = [({"Authorization": "Bearer " + create_access_token({"sub": str(u.id)})}, r.id)
+               for u, r in zip(users, rides)]
+    db.close()
+    return pollers
+
+
+async def run_child(riders, polls, cold_auth):
+    import httpx
+    from app.core.metrics import db_queries
+    from app.main import app
+
+    pollers = seed(riders)
+    latencies, limited, failed = [], 0, 0
+
+    async def poll(client, headers, ride_id):
+        nonlocal limited, failed
+        for _ in range(polls):
+            start = time.perf_counter()
+            r = await client.get("/rides/ride_status", params={"ride_id": ride_id}, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            limited += r.status_code == 429
+            failed += r.status_code not in (200, 429)
+
+    def queries():
+        return sum(value for *_, value in db_queries.samples())
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        if not cold_auth:
+            # Warm the principal cache so only status reads are counted
+            await asyncio.gather(*(client.get("/users/me", headers=h) for h, _ in pollers))
+        before = queries()
+        start = time.perf_counter()
+        await asyncio.gather(*(poll(client, h, ride_id) for h, ride_id in pollers))
+        elapsed = time.perf_counter() - start
+    requests = len(latencies)
+    print(json.dumps({
+        "rps": requests / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "queries_per_poll": (queries() - before) / requests,
+        "limited": limited / requests,
+        "failed": failed / requests,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--riders", type=int, default=200, help="concurrent pollers, one ride each")
+    parser.add_argument("--polls", type=int, default=20, help="back-to-back polls per rider")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds before a setting counts as hung")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--cold-auth", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(run_child(args.riders, args.polls, args.cold_auth))
+        return
+
+    env = dict(os.environ)
+    if not env.get("DATABASE_URL"):
+        env["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    env.setdefault("SECRET_KEY", "bench")
+    env.setdefault("ALGORITHM", "HS256")
+    env.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+    print(f"{args.riders} riders x {args.polls} polls against {env['DATABASE_URL']}")
+    ok = True
+    for label, overrides in SETTINGS.items():
+        command = [sys.executable, "-m", "benchmarks.bench_status_polling", "--child",
+                   "--riders", str(args.riders), "--polls", str(args.polls)]
+        if label in COLD_AUTH:
+            command.append("--cold-auth")
+        try:
+            out = subprocess.run(command, env={**env, **overrides}, capture_output=True, text=True, check=True,
+                                 timeout=args.timeout).stdout
+        except subprocess.TimeoutExpired:
+            print(f"{label:>24}: hung for {args.timeout:.0f} s")
+            ok = False
+            continue
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{label:>24}: {r['rps']:6.0f} req/s  p50 {r['p50'] * 1000:6.1f} ms  p95 {r['p95'] * 1000:6.1f} ms  "
+              f"{r['queries_per_poll']:.3f} queries/poll  {r['limited']:.0%} rate limited  {r['failed']:.0%} failed")
+        ok = ok and r["failed"] == 0
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
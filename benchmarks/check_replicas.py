@@ -0,0 +1,136 @@
+"""
+Check read-replica routing locally, with two SQLite files as primary and replica.
+
+    python -m benchmarks.check_replicas
+
+The replica is a snapshot of the primary taken with SQLite's backup API, so
+it lags until the next snapshot, like a replica behind on replication. The
+script checks that:
+
+* read-only endpoints are served by the replica (a client that hasn't
+  written doesn't see a ride until it is replicated)
+* a client that just wrote reads its own write from the primary, until
+  REPLICA_STICKY_SECONDS pass; the last_write cookie carries this, so it
+  holds whichever worker the next request reaches
+* ride status is read from the primary, so a transition is never cached
+  from a lagging replica
+* when the replica goes away, reads fall back to the primary and the replica
+  is skipped for REPLICA_RETRY_SECONDS
+
+Exits non-zero if any check fails. Set DB_ASYNC=true to check the async
+engine.
+"""
+import asyncio
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+DIRECTORY = tempfile.mkdtemp()
+PRIMARY = os.path.join(DIRECTORY, "primary.db")
+REPLICA_DIRECTORY = os.path.join(DIRECTORY, "replica")
+REPLICA = os.path.join(REPLICA_DIRECTORY, "replica.db")
+STICKY_SECONDS = 0.5
+os.makedirs(REPLICA_DIRECTORY)
+os.environ["DATABASE_URL"] = "sqlite:///" + PRIMARY
+os.environ["DATABASE_REPLICA_URLS"] = "sqlite:///" + REPLICA
+os.environ["REPLICA_STICKY_SECONDS"] = str(STICKY_SECONDS)
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+import httpx  # noqa: E402
+
+from app.core.auth import create_access_token  # noqa: E402
+from app.core.db import Base, SessionLocal, engine  # noqa: E402
+from app.core.replicas import LAST_WRITE_COOKIE, replica_router  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.routers.admin import ADMIN_EMAIL  # noqa: E402
+
+
+def replicate():
+    source, target = sqlite3.connect(PRIMARY), sqlite3.connect(REPLICA)
+    source.backup(target)
+    source.close()
+    target.close()
+
+
+def seed():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    customer = User(name="c", phone="c", email="c@example.com", is_driver=False)
+    db.add(customer)
+    db.commit()
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": str(customer.id)})}
+    customer_id = customer.id
+    db.close()
+    replicate()
+    return customer_id, headers
+
+
+async def drop_replica():
+    # A stopped replica: its file is gone and pooled connections are closed
+    replica = replica_router.replicas[0]
+    if replica.async_engine is not None:
+        await replica.async_engine.dispose()
+    else:
+        replica.sync_engine.dispose()
+    shutil.rmtree(REPLICA_DIRECTORY)
+
+
+async def main():
+    customer_id, headers = seed()
+    results = []
+
+    def check(name, ok):
+        results.append(ok)
+        print(f"[{'ok' if ok else 'FAIL'}] {name}")
+
+    transport = httpx.ASGITransport(app=app)
+    # Separate clients, so each has its own cookies
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as client, \
+            httpx.AsyncClient(transport=transport, base_url="http://check") as admin, \
+            httpx.AsyncClient(transport=transport, base_url="http://check") as other_worker:
+        async def customer_rides(via=client):
+            r = await via.get(f"/rides/user/{customer_id}/rides", headers=headers)
+            r.raise_for_status()
+            return r.json()
+
+        async def admin_rides():
+            r = await admin.get("/admin/admin/all_rides", params={"admin_email": ADMIN_EMAIL})
+            r.raise_for_status()
+            return r.json()
+
+        r = await client.post("/rides/request_ride", json={"pickup_location": "MG Road",
+                                                            "drop_location": "Koramangala"}, headers=headers)
+        ride_id = r.json()["ride_id"]
+        check("a write sets the last_write cookie", LAST_WRITE_COOKIE in r.cookies)
+        check("writer reads its own write right away (primary)", [ride["id"] for ride in await customer_rides()]
+              == [ride_id])
+        other_worker.cookies.set(LAST_WRITE_COOKIE, r.cookies[LAST_WRITE_COOKIE])
+        check("the cookie alone keeps the writer on the primary, as on another worker",
+              [ride["id"] for ride in await customer_rides(other_worker)] == [ride_id])
+        check("other clients read from the lagging replica", await admin_rides() == [])
+
+        time.sleep(STICKY_SECONDS)
+        check("writer is back on the replica after the sticky window", await customer_rides() == [])
+        r = await client.get("/rides/ride_status", params={"ride_id": ride_id}, headers=headers)
+        check("ride status comes from the primary", r.status_code == 200 and r.json()["status"] == "requested")
+        replicate()
+        check("replica serves the ride once replicated", [ride["id"] for ride in await admin_rides()] == [ride_id])
+
+        await drop_replica()
+        r = await client.post("/rides/request_ride", json={"pickup_location": "Indiranagar",
+                                                            "drop_location": "Whitefield"}, headers=headers)
+        check("reads fall back to the primary when the replica is down", len(await admin_rides()) == 2)
+        check("failed replica is skipped until the retry interval passes",
+              replica_router.pick() is None and replica_router.replicas[0].down_until > time.monotonic())
+
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Check that every hot query shape is answered from an index.
+
+    python -m benchmarks.explain_hot_queries
+
+Builds the schema with `alembic upgrade head` on DATABASE_URL (a throwaway
+SQLite file by default), EXPLAINs each query and exits non-zero if any of
+them falls back to a full table scan. On Postgres sequential scans are
+disabled for the check so the answer doesn't depend on table statistics.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "explain.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import select
+
+from app.core.db import engine
+from app.core.pagination import columns_for
+from app.core.ride_state import ACTIVE_STATUSES, STATE_COLUMNS
+from app.core.settlement import settle_statement
+from app.models.emergency import EmergencyContact
+from app.models.feedback import Feedback
+from app.models.payment import Payment
+from app.models.ride import Ride, OPEN_REQUEST
+from app.schemas.user import RideOut
+
+RIDE_COLUMNS = columns_for(Ride, RideOut)
+
+# (endpoint, statement, index names any of which may serve it)
+HOT_QUERIES = [
+    ("/rides/driver/requested",
+     select(*RIDE_COLUMNS).where(OPEN_REQUEST).order_by(Ride.timestamp, Ride.id).limit(51),
+     ("ix_rides_requested", "ix_rides_status_timestamp")),
+    ("/rides/accept_ride (active ride check)",
+     select(Ride).where(Ride.driver_id == 1, Ride.status.in_(["accepted", "ongoing"])),
+     ("ix_rides_driver_id_status",)),
+    ("startup (ride state rebuild)",
+     select(*STATE_COLUMNS).where(Ride.status.in_(ACTIVE_STATUSES)),
+     ("ix_rides_status_timestamp",)),
+    ("/rides/ride_status",
+     select(Ride).where(Ride.id == 1),
+     None),
+    ("/rides/user/{id}/rides",
+     select(*RIDE_COLUMNS).where(Ride.user_id == 1).order_by(Ride.timestamp.desc(), Ride.id.desc()).limit(51),
+     ("ix_rides_user_id_timestamp",)),
+    ("/rides/driver/{id}/rides",
+     select(*RIDE_COLUMNS).where(Ride.driver_id == 1).order_by(Ride.timestamp.desc(), Ride.id.desc()).limit(51),
+     ("ix_rides_driver_id_status",)),
+    ("/admin/admin/all_rides?status=",
+     select(*RIDE_COLUMNS).where(Ride.status == "completed").order_by(Ride.timestamp.desc(), Ride.id.desc()).limit(51),
+     ("ix_rides_status_timestamp",)),
+    ("/driver/{id}/earnings",
+     select(Payment).where(Payment.recipient_id == 1, Payment.status == "paid"),
+     ("ix_payments_recipient_id_status",)),
+    ("/make_payment",
+     settle_statement(1, 1, "cash", datetime(2026, 1, 1)),
+     ("ix_payments_ride_id",)),
+    ("/emergency_contacts",
+     select(EmergencyContact).where(EmergencyContact.user_id == 1),
+     ("ix_emergency_contacts_user_id",)),
+    ("/submit_feedback (by ride)",
+     select(Feedback).where(Feedback.ride_id == 1),
+     ("ix_feedback_ride_id",)),
+]
+
+
+def explain(conn, stmt):
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    rows = conn.exec_driver_sql(prefix + str(compiled), params).fetchall()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def uses_index(plan, dialect, expected):
+    if dialect == "sqlite":
+        scans = [line for line in plan.splitlines() if line.startswith("SCAN") and "USING" not in line]
+        ok = not scans
+    else:
+        ok = "Seq Scan" not in plan
+    if expected:
+        ok = ok and any(name in plan for name in expected)
+    return ok
+
+
+def main():
+    command.upgrade(Config("alembic.ini"), "head")
+    failures = 0
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        for name, stmt, expected in HOT_QUERIES:
+            plan = explain(conn, stmt)
+            ok = uses_index(plan, conn.dialect.name, expected)
+            failures += not ok
+            print(f"[{'ok' if ok else 'FAIL'}] {name}")
+            for line in plan.splitlines():
+                print(f"       {line}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
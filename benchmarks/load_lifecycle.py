@@ -0,0 +1,285 @@
+"""
+Load test of the whole ride lifecycle, with per-endpoint results as JSON.
+
+    python -m benchmarks.load_lifecycle [--pairs 50] [--rides 3] [--concurrency 50]
+                                        [--output results.json] [--compare baseline.json]
+    python -m benchmarks.load_lifecycle --url http://localhost:8000 ...
+
+Every customer/driver pair registers, the drivers are approved in one admin
+call, both log in, then each pair runs request_ride -> driver/requested ->
+accept_ride -> start_ride -> complete_ride -> make_payment -> submit_feedback
+the given number of times. At most --concurrency pairs are in flight.
+
+For every endpoint the report has request count, non-2xx count, throughput,
+p50/p95/p99 latency and DB queries per request. Query counts come from the
+app's /metrics (diffed before and after the run), so they are missing when
+METRICS_ENABLED is off.
+
+Without --url the app runs in-process against DATABASE_URL, which defaults to
+a throwaway SQLite file whose tables are recreated; BCRYPT_ROUNDS defaults to
+4 so registration does not swamp the rest (see bench_login for password cost).
+With --url the server's database must already be migrated. --compare prints
+the change against an earlier --output file and, with --max-regression, exits
+non-zero if any endpoint's p95 got worse by more than that percentage.
+Needs httpx.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+if not os.environ.get("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+ADMIN_EMAIL = "saimeghana.cd22@bmsce.ac.in"
+QUERY_METRIC = "http_request_db_queries"
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Recorder:
+    """Latencies and status codes per endpoint, keyed like the /metrics route label."""
+
+    def __init__(self, client):
+        self.client = client
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.spans = {}
+
+    async def call(self, method, route, **kwargs):
+        start = time.perf_counter()
+        response = await self.client.request(method, route, **kwargs)
+        end = time.perf_counter()
+        key = f"{method} {route}"
+        self.latencies[key].append(end - start)
+        if response.status_code >= 300:
+            self.errors[key] += 1
+        first, last = self.spans.get(key, (start, end))
+        self.spans[key] = (min(first, start), max(last, end))
+        return response
+
+
+QUERY_SAMPLE = re.compile(QUERY_METRIC + r'_(sum|count)\{method="([^"]*)",route="([^"]*)"\} (\S+)')
+
+
+def scrape_queries(text):
+    """{"METHOD /route": [sum, count]} from the Prometheus text of /metrics."""
+    totals = defaultdict(lambda: [0.0, 0])
+    for kind, method, route, value in QUERY_SAMPLE.findall(text):
+        totals[f"{method} {route}"][kind == "count"] += float(value)
+    return totals
+
+
+async def metrics_snapshot(client):
+    r = await client.get("/metrics")
+    return scrape_queries(r.text) if r.status_code == 200 else None
+
+
+def auth(token):
+    return {"Authorization": "Bearer " + token}
+
+
+async def signup(rec, run_id, i, gate):
+    async with gate:
+        tokens = []
+        for role, is_driver in (("c", False), ("d", True)):
+            r = await rec.call("POST", "/auth/register", json={
+                "name": f"{role}{i}", "phone": f"{run_id}-{role}{i}", "email": f"{role}{i}.{run_id}@example.com",
+                "password": "secret", "is_driver": is_driver,
+            })
+            r.raise_for_status()
+            tokens.append(r.json()["access_token"])
+        # Not part of the lifecycle; only needed to find the id to approve
+        driver = await rec.client.get("/users/me", headers=auth(tokens[1]))
+        driver.raise_for_status()
+        return driver.json()["id"]
+
+
+async def login(rec, run_id, i, gate):
+    async with gate:
+        headers = []
+        for role in ("c", "d"):
+            r = await rec.call("POST", "/auth/token", data={"username": f"{run_id}-{role}{i}", "password": "secret"})
+            r.raise_for_status()
+            headers.append(auth(r.json()["access_token"]))
+        return headers
+
+
+async def lifecycle(rec, customer, driver, rides, gate):
+    async with gate:
+        for n in range(rides):
+            r = await rec.call("POST", "/rides/request_ride", headers=customer,
+                               json={"pickup_location": "MG Road", "drop_location": "Koramangala"})
+            if r.status_code != 200:
+                continue
+            ride_id = r.json()["ride_id"]
+            await rec.call("GET", "/rides/driver/requested", headers=driver)
+            # Each driver takes its own customer's ride, so accepts never race
+            await rec.call("POST", "/rides/accept_ride", headers=driver, json={"ride_id": ride_id})
+            await rec.call("POST", "/rides/start_ride", headers=driver, params={"ride_id": ride_id})
+            await rec.call("POST", "/rides/complete_ride", headers=driver, json={"ride_id": ride_id})
+            await rec.call("POST", "/make_payment", headers=customer, json={"ride_id": ride_id, "method": "cash"})
+            await rec.call("POST", "/submit_feedback", headers=customer,
+                           json={"ride_id": ride_id, "rating": 1 + n % 5, "comment": "bench"})
+
+
+def reset_schema():
+    from app.core.db import Base, engine
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+async def run(args):
+    import httpx
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        from app.main import app
+
+        reset_schema()
+        # Count a handler that raises as a 500 instead of aborting the run
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench")
+
+    run_id = uuid.uuid4().hex[:8]
+    gate = asyncio.Semaphore(args.concurrency)
+    async with client:
+        rec = Recorder(client)
+        before = await metrics_snapshot(client)
+        start = time.perf_counter()
+
+        driver_ids = await asyncio.gather(*(signup(rec, run_id, i, gate) for i in range(args.pairs)))
+        r = await client.post("/admin/admin/approve_drivers", json={"admin_email": ADMIN_EMAIL, "driver_ids": driver_ids})
+        r.raise_for_status()
+        # Log in after approval so tokens carrying role claims say approved
+        pairs = await asyncio.gather(*(login(rec, run_id, i, gate) for i in range(args.pairs)))
+        await asyncio.gather(*(lifecycle(rec, c, d, args.rides, gate) for c, d in pairs))
+
+        elapsed = time.perf_counter() - start
+        after = await metrics_snapshot(client)
+
+    endpoints = {}
+    for key, latencies in rec.latencies.items():
+        first, last = rec.spans[key]
+        queries = None
+        if before is not None and after is not None:
+            total, count = after.get(key, (0.0, 0))
+            total0, count0 = before.get(key, (0.0, 0))
+            if count > count0:
+                queries = round((total - total0) / (count - count0), 2)
+        endpoints[key] = {
+            "requests": len(latencies),
+            "errors": rec.errors[key],
+            "rps": round(len(latencies) / (last - first), 1) if last > first else None,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "queries_per_request": queries,
+        }
+    requests = sum(e["requests"] for e in endpoints.values())
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "target": args.url or os.environ["DATABASE_URL"].split("://", 1)[0],
+            "db_async": os.getenv("DB_ASYNC", "false") if not args.url else None,
+            "python": platform.python_version(),
+            "pairs": args.pairs,
+            "rides": args.rides,
+            "concurrency": args.concurrency,
+        },
+        "total": {
+            "requests": requests,
+            "errors": sum(e["errors"] for e in endpoints.values()),
+            "seconds": round(elapsed, 3),
+            "rps": round(requests / elapsed, 1),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def fmt(value, spec):
+    return "-" if value is None else format(value, spec)
+
+
+def report(result):
+    total = result["total"]
+    print(f"{total['requests']} requests ({total['errors']} non-2xx) in {total['seconds']:.2f}s "
+          f"-> {total['rps']:.0f} req/s")
+    print(f"{'endpoint':<32} {'reqs':>6} {'errs':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>7}")
+    for key, e in result["endpoints"].items():
+        print(f"{key:<32} {e['requests']:>6} {e['errors']:>5} {fmt(e['rps'], '8.0f')} {e['p50_ms']:>8.1f} "
+              f"{e['p95_ms']:>8.1f} {e['p99_ms']:>8.1f} {fmt(e['queries_per_request'], '7.1f')}")
+
+
+def compare(result, baseline, max_regression):
+    """Print p95 / throughput / query changes against baseline; return the endpoints over max_regression."""
+    print(f"\nvs. {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')})")
+    print(f"{'endpoint':<32} {'p95 ms':>17} {'req/s':>15} {'queries':>11}")
+    regressed = []
+    for key, e in result["endpoints"].items():
+        old = baseline["endpoints"].get(key)
+        if old is None:
+            continue
+        change = (e["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+        if max_regression is not None and change > max_regression:
+            regressed.append(key)
+        print(f"{key:<32} {old['p95_ms']:>6.1f} -> {e['p95_ms']:>6.1f} "
+              f"{fmt(old['rps'], '6.0f')} -> {fmt(e['rps'], '6.0f')} "
+              f"{fmt(old['queries_per_request'], '4.1f')} -> {fmt(e['queries_per_request'], '4.1f')}"
+              f"{'  REGRESSED' if key in regressed else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=50, help="customer/driver pairs")
+    parser.add_argument("--rides", type=int, default=3, help="lifecycles per pair")
+    parser.add_argument("--concurrency", type=int, default=50, help="pairs in flight at once")
+    parser.add_argument("--url", help="load a running server instead of the app in-process")
+    parser.add_argument("--output", help="write the results as JSON here")
+    parser.add_argument("--compare", help="results JSON of an earlier run")
+    parser.add_argument("--max-regression", type=float, help="fail if any p95 grew by more than this percent")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    report(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressed = compare(result, json.load(f), args.max_regression)
+        if regressed:
+            sys.exit(f"p95 regressed by more than {args.max_regression}%: {', '.join(regressed)}")
+
+
+if __name__ == "__main__":
+    main()
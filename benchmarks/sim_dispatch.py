@@ -0,0 +1,158 @@
+"""
+Replay synthetic demand through the dispatch scheduler in virtual time.
+
+    python -m benchmarks.sim_dispatch [--rides-per-minute 2000] [--drivers 20000] [--minutes 15]
+
+Rides arrive as a Poisson stream at random pickups around Bengaluru.
+Drivers answer an offer after a few seconds: most accept, some decline and
+some never answer (the offer times out). An accepted driver drives to the
+pickup, does the trip and becomes idle again at the drop-off. The scheduler
+ticks on the same virtual clock, so a long run finishes in seconds.
+
+Reports match latency (request to accepted offer) percentiles, offers per
+matched ride, driver utilization (share of driver time spent on pickups and
+trips) and how long the scheduler's ticks took in wall time. No database
+is involved.
+"""
+import argparse
+import heapq
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# Importing the app builds the engine; the simulation itself never touches it
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+from app.core.dispatch import DispatchScheduler  # noqa: E402
+
+# Roughly the Bengaluru metro area
+LAT_RANGE = (12.80, 13.20)
+LNG_RANGE = (77.40, 77.80)
+SPEED_KMH = 25.0
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    clock = VirtualClock()
+    scheduler = DispatchScheduler(args.offer_timeout, args.radius_km, clock=clock)
+
+    def random_point():
+        return rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)
+
+    for driver_id in range(args.drivers):
+        scheduler.driver_available(driver_id, *random_point())
+
+    events = []  # (time, seq, kind, payload)
+    seq = 0
+
+    def schedule(at, kind, payload):
+        nonlocal seq
+        seq += 1
+        heapq.heappush(events, (at, seq, kind, payload))
+
+    duration = args.minutes * 60.0
+    rate = args.rides_per_minute / 60.0
+    t, ride_id = 0.0, 0
+    while True:
+        t += rng.expovariate(rate)
+        if t >= duration:
+            break
+        ride_id += 1
+        schedule(t, "request", ride_id)
+
+    requested_at, latencies, offers_per_ride = {}, [], []
+    busy_seconds = 0.0
+    expired_total = declined_total = 0
+    tick_wall = []
+
+    while clock.now < duration:
+        clock.now += args.tick
+        while events and events[0][0] <= clock.now:
+            at, _, kind, payload = heapq.heappop(events)
+            if kind == "request":
+                lat, lng = random_point()
+                scheduler.add_ride(payload, lat, lng, requested_at=at)
+                requested_at[payload] = at
+            elif kind == "answer":
+                offer, accepts = payload
+                if scheduler.offer_for(offer.ride_id, offer.driver_id) is not offer:
+                    continue  # expired before the driver answered
+                if accepts:
+                    ride = scheduler.rides[offer.ride_id]
+                    offers_per_ride.append(ride.offers)
+                    latencies.append(at - requested_at[offer.ride_id])
+                    scheduler.accept(offer.ride_id, offer.driver_id)
+                    pickup = offer.distance_km / SPEED_KMH * 3600
+                    trip = rng.uniform(args.trip_min_minutes, args.trip_max_minutes) * 60
+                    busy_seconds += min(pickup + trip, duration - at)
+                    schedule(at + pickup + trip, "dropoff", offer.driver_id)
+                else:
+                    declined_total += 1
+                    scheduler.decline(offer.ride_id, offer.driver_id)
+            elif kind == "dropoff":
+                scheduler.driver_available(payload, *random_point())
+
+        start = time.perf_counter()
+        made, expired = scheduler.tick()
+        tick_wall.append(time.perf_counter() - start)
+        expired_total += len(expired)
+        for offer in made:
+            roll = rng.random()
+            if roll < args.ignore_prob:
+                continue  # never answers; the offer will time out
+            schedule(clock.now + rng.uniform(1.0, args.answer_max_seconds), "answer",
+                     (offer, roll < args.ignore_prob + args.accept_prob))
+
+    requested = len(requested_at)
+    matched = len(latencies)
+    print(f"{args.rides_per_minute} rides/min for {args.minutes} min, {args.drivers} drivers, "
+          f"offer timeout {args.offer_timeout:.0f}s, radius {args.radius_km:.0f} km")
+    print(f"requested {requested}, matched {matched} ({matched / requested:.1%}), still open {len(scheduler.rides)}")
+    print(f"match latency p50 {percentile(latencies, 0.50):.1f}s  p95 {percentile(latencies, 0.95):.1f}s  "
+          f"p99 {percentile(latencies, 0.99):.1f}s")
+    print(f"offers per matched ride: mean {statistics.mean(offers_per_ride):.2f}  max {max(offers_per_ride)}; "
+          f"declined {declined_total}, timed out {expired_total}")
+    print(f"driver utilization {busy_seconds / (args.drivers * duration):.1%}")
+    print(f"scheduler tick wall time: mean {statistics.mean(tick_wall) * 1000:.2f} ms  "
+          f"p99 {percentile(tick_wall, 0.99) * 1000:.2f} ms  max {max(tick_wall) * 1000:.2f} ms "
+          f"over {len(tick_wall)} ticks of {args.tick}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rides-per-minute", type=int, default=2000)
+    parser.add_argument("--drivers", type=int, default=20000)
+    parser.add_argument("--minutes", type=float, default=15)
+    parser.add_argument("--tick", type=float, default=0.5, help="scheduler tick in virtual seconds")
+    parser.add_argument("--offer-timeout", type=float, default=15.0)
+    parser.add_argument("--radius-km", type=float, default=10.0)
+    parser.add_argument("--accept-prob", type=float, default=0.8)
+    parser.add_argument("--ignore-prob", type=float, default=0.05)
+    parser.add_argument("--answer-max-seconds", type=float, default=8.0)
+    parser.add_argument("--trip-min-minutes", type=float, default=4.0)
+    parser.add_argument("--trip-max-minutes", type=float, default=12.0)
+    parser.add_argument("--seed", type=int, default=7)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,100 @@
+from dataclasses import dataclass
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
-from app.core.db import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.db import get_db
 from app.models.user import User
 from app.config import settings
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Detached snapshot of the user columns handlers read, safe to cache across requests."""
+    id: int
+    email: Optional[str] = None
+    is_driver: bool = False
+    is_approved: bool = False
+    name: Optional[str] = None
+    phone: Optional[str] = None
+    gender: Optional[str] = None
+    driver_license: Optional[str] = None
+    # True when built from token claims only; profile fields are then None
+    from_token: bool = False
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            is_driver=bool(user.is_driver),
+            is_approved=bool(user.is_approved),
+            name=user.name,
+            phone=user.phone,
+            gender=user.gender,
+            driver_license=user.driver_license,
+        )
+
+
+principal_cache = TTLCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def invalidate_principal(user_id: int):
+    """Call after changing a user's row so the next request reloads it."""
+    principal_cache.pop(user_id)
+
+
+def token_subject(authorization: Optional[str]) -> Optional[str]:
+    """User id from a valid "Bearer <jwt>" header, without touching the database."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    return await resolve_principal(token, db)
+
+
+async def resolve_principal(token: str, db: AsyncSession) -> Principal:
+    """Token -> Principal; also used where there is no Authorization header (WebSockets)."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-        user = db.query(User).get(user_id)
+    except JWTError:
+        raise credentials_exception
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise credentials_exception
+    user_id = int(user_id)
+
+    # Signed role claims (see app.core.auth.role_claims) need no lookup at all
+    if settings.AUTH_ROLE_CLAIMS and "drv" in payload:
+        return Principal(
+            id=user_id,
+            email=payload.get("email"),
+            is_driver=payload["drv"],
+            is_approved=payload.get("apr", False),
+            from_token=True,
+        )
+
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        user = await db.get(User, user_id)
         if user is None:
             raise credentials_exception
-        return user
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+        principal = Principal.from_user(user)
+        principal_cache.set(user_id, principal)
+    return principal